@@ -4,23 +4,16 @@ Sistema de Análisis Inteligente - MVP with Advanced Features
 """
 import os
 import logging
-from flask import Flask, jsonify, render_template
-from flask_cors import CORS
+import importlib
+import orjson
+from flask import Flask, Response, render_template
 from config import Config
 
-# Import all route blueprints
-from app.routes import (
-    analysis_routes,
-    image_routes,
-    similarity_routes,
-    ai_detector_routes,
-    chat_routes,
-    auth_routes
-)
-
 # Import middleware
 from app.middleware.error_handler import register_error_handlers
-from app.middleware.auth_middleware import require_api_key
+from app.middleware.auth_middleware import require_api_key, init_auth
+from app.middleware.cors import init_cors
+from app.middleware.fast_path import init_fast_paths
 
 # Import new features
 from app.auth import init_jwt_manager, init_user_store
@@ -31,6 +24,7 @@ from app.model_versioning import init_model_registry
 from app.swagger_docs import init_swagger
 from app.metrics import init_metrics_middleware, metrics_endpoint
 from app.utils.cache import cache
+from app.utils.json_provider import OrJSONProvider
 
 # Configure logging
 logging.basicConfig(
@@ -39,24 +33,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Route blueprints: (module path, attribute, url prefix), imported lazily
+_BLUEPRINTS = (
+    ('app.routes.auth_routes', 'bp', '/api/auth'),
+    ('app.routes.analysis_routes', 'bp', '/api/analysis'),
+    ('app.routes.image_routes', 'bp', '/api/images'),
+    ('app.routes.similarity_routes', 'bp', '/api/similarity'),
+    ('app.routes.ai_detector_routes', 'bp', '/api/ai-detect'),
+    ('app.routes.chat_routes', 'bp', '/api/chat'),
+)
+
 
 def create_app(config_class=Config):
     """Application factory pattern"""
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = OrJSONProvider(app)
     
     # Initialize configuration
     Config.init_app()
     
     # Enable CORS
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    init_cors(app)
     
     # Initialize cache
     cache.init_app(app)
     
-    # Initialize JWT authentication
+    # Initialize API key and JWT authentication
+    init_auth(app)
     init_jwt_manager(app)
-    init_user_store(cache.client)
+    init_user_store(
+        cache.client,
+        seed_defaults=not app.config.get('SKIP_DEFAULT_USERS')
+    )
     
     # Initialize WebSocket
     socketio = init_socketio(app)
@@ -77,34 +86,66 @@ def create_app(config_class=Config):
     init_metrics_middleware(app)
     
     # Register blueprints
-    app.register_blueprint(auth_routes.bp, url_prefix='/api/auth')
-    app.register_blueprint(analysis_routes.bp, url_prefix='/api/analysis')
-    app.register_blueprint(image_routes.bp, url_prefix='/api/images')
-    app.register_blueprint(similarity_routes.bp, url_prefix='/api/similarity')
-    app.register_blueprint(ai_detector_routes.bp, url_prefix='/api/ai-detect')
-    app.register_blueprint(chat_routes.bp, url_prefix='/api/chat')
+    for module_path, attr, url_prefix in _BLUEPRINTS:
+        bp = getattr(importlib.import_module(module_path), attr)
+        app.register_blueprint(bp, url_prefix=url_prefix)
     
     # Register error handlers
     register_error_handlers(app)
     
+    # Static info payloads, serialized once
+    health_bytes = orjson.dumps({
+        'status': 'healthy',
+        'service': 'intelligent-analysis-system',
+        'version': '2.0.0',
+        'features': {
+            'jwt_auth': True,
+            'websocket': True,
+            'celery': True,
+            'rate_limiting': True,
+            'ragas': True,
+            'prometheus': True,
+            'swagger': True
+        }
+    })
+    
+    api_info_bytes = orjson.dumps({
+        'service': 'Intelligent Analysis System API',
+        'version': '2.0.0',
+        'endpoints': {
+            'health': '/health',
+            'metrics': '/metrics',
+            'docs': '/api/docs',
+            'auth': '/api/auth/*',
+            'analysis': '/api/analysis/*',
+            'images': '/api/images/*',
+            'similarity': '/api/similarity/*',
+            'ai_detect': '/api/ai-detect/*',
+            'chat': '/api/chat/*'
+        },
+        'features': [
+            'JWT Authentication',
+            'WebSocket Real-time Updates',
+            'Celery Task Queue',
+            'Rate Limiting per User',
+            'RAGAS RAG Evaluation',
+            'Prometheus Monitoring',
+            'Model Versioning',
+            'Swagger Documentation',
+            'SSE Streaming'
+        ],
+        'documentation': '/api/docs'
+    })
+    
     # Health check endpoint
     @app.route('/health', methods=['GET'])
     def health_check():
         """Health check endpoint"""
-        return jsonify({
-            'status': 'healthy',
-            'service': 'intelligent-analysis-system',
-            'version': '2.0.0',
-            'features': {
-                'jwt_auth': True,
-                'websocket': True,
-                'celery': True,
-                'rate_limiting': True,
-                'ragas': True,
-                'prometheus': True,
-                'swagger': True
-            }
-        }), 200
+        return Response(
+            health_bytes,
+            mimetype='application/json',
+            headers={'Cache-Control': 'no-cache'}
+        )
     
     # Metrics endpoint for Prometheus
     @app.route('/metrics', methods=['GET'])
@@ -122,33 +163,12 @@ def create_app(config_class=Config):
     @app.route('/api', methods=['GET'])
     def api_info():
         """API information endpoint"""
-        return jsonify({
-            'service': 'Intelligent Analysis System API',
-            'version': '2.0.0',
-            'endpoints': {
-                'health': '/health',
-                'metrics': '/metrics',
-                'docs': '/api/docs',
-                'auth': '/api/auth/*',
-                'analysis': '/api/analysis/*',
-                'images': '/api/images/*',
-                'similarity': '/api/similarity/*',
-                'ai_detect': '/api/ai-detect/*',
-                'chat': '/api/chat/*'
-            },
-            'features': [
-                'JWT Authentication',
-                'WebSocket Real-time Updates',
-                'Celery Task Queue',
-                'Rate Limiting per User',
-                'RAGAS RAG Evaluation',
-                'Prometheus Monitoring',
-                'Model Versioning',
-                'Swagger Documentation',
-                'SSE Streaming'
-            ],
-            'documentation': '/api/docs'
-        }), 200
+        return Response(api_info_bytes, mimetype='application/json')
+    
+    # Serve health probes before Flask dispatch
+    init_fast_paths(app, {
+        '/health': lambda: (health_bytes, 'application/json')
+    })
     
     logger.info(f"Application initialized in {app.config['FLASK_ENV']} mode")
     logger.info("✅ JWT Authentication enabled")
@@ -0,0 +1,3 @@
+"""
+Intelligent Analysis System application package
+"""
@@ -0,0 +1,4 @@
+"""
+Authentication package
+"""
+from app.auth.jwt_manager import init_jwt_manager, init_user_store
@@ -2,16 +2,109 @@
 JWT Authentication System
 Token-based authentication with refresh tokens
 """
+import os
+import sys
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor
 import jwt
+import orjson
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from cachetools import TTLCache
 from functools import wraps
-from flask import request, jsonify, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import request, current_app
 
 logger = logging.getLogger(__name__)
 
+# Token lifetimes in seconds
+ACCESS_TOKEN_TTL = 15 * 60
+REFRESH_TOKEN_TTL = 7 * 24 * 3600
+
+# Redis key prefix marking a revoked token ID (jti)
+REVOKED_TOKEN_KEY_PREFIX = 'token_revocations:'
+
+# Decoded payloads of recently verified tokens, keyed by token digest.
+# Only successful verifications are cached.
+_verify_cache = TTLCache(maxsize=10_000, ttl=10)
+_verify_lock = threading.RLock()
+
+# Digests of tokens that recently failed verification
+_rejected_cache = TTLCache(maxsize=50_000, ttl=60)
+
+# Revoked token IDs when Redis is unavailable (per process)
+_revoked_local = TTLCache(maxsize=100_000, ttl=REFRESH_TOKEN_TTL)
+
+# Static 401 bodies for require_jwt_token, serialized once
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_ERR_NO_AUTH = orjson.dumps({
+    'error': 'No authorization token provided',
+    'status': 'error'
+})
+_ERR_BAD_SCHEME = orjson.dumps({
+    'error': 'Invalid authorization scheme',
+    'status': 'error'
+})
+_ERR_BAD_FORMAT = orjson.dumps({
+    'error': 'Invalid authorization header format',
+    'status': 'error'
+})
+_ERR_INVALID_TOKEN = orjson.dumps({
+    'error': 'Invalid or expired token',
+    'status': 'error'
+})
+
+# Shared codec and signing key, resolved once at app init
+_jwt = jwt.PyJWT()
+_secret: Optional[bytes] = None
+
+
+def init_jwt_manager(app):
+    """Configure the signing key and token verification cache from app config"""
+    global _verify_cache, _secret
+    
+    _secret = app.config['SECRET_KEY'].encode()
+    
+    with _verify_lock:
+        _verify_cache = TTLCache(
+            maxsize=app.config.get('JWT_CACHE_SIZE', 10_000),
+            ttl=app.config.get('JWT_CACHE_TTL', 10)
+        )
+    
+    logger.info("JWT manager initialized")
+
+
+def _secret_key() -> bytes:
+    """Signing key, falling back to app config when init was skipped"""
+    if _secret is not None:
+        return _secret
+    return current_app.config.get('SECRET_KEY').encode()
+
+
+def _run_blocking(fn, *args):
+    """
+    Run a call that holds the thread without yielding (C-level CPU work)
+    
+    Under eventlet green threads such a call stalls every connection on the
+    hub, so it goes to eventlet's native thread pool instead; otherwise it
+    runs inline.
+    """
+    eventlet = sys.modules.get('eventlet')
+    if eventlet is not None and eventlet.patcher.is_monkey_patched('thread'):
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    return fn(*args)
+
+
+def _token_digest(token: str) -> bytes:
+    """Short digest used as the verification cache key"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
 
 class JWTManager:
     """JWT token management"""
@@ -28,14 +121,16 @@ class JWTManager:
         Returns:
             Dictionary with access_token and refresh_token
         """
-        secret_key = current_app.config.get('SECRET_KEY')
+        secret_key = _secret_key()
+        now = int(time.time())
         
         # Access token (15 minutes)
         access_payload = {
             'user_id': user_id,
             'type': 'access',
-            'exp': datetime.utcnow() + timedelta(minutes=15),
-            'iat': datetime.utcnow(),
+            'exp': now + ACCESS_TOKEN_TTL,
+            'iat': now,
+            'jti': uuid.uuid4().hex,
             **(user_data or {})
         }
         
@@ -43,18 +138,19 @@ class JWTManager:
         refresh_payload = {
             'user_id': user_id,
             'type': 'refresh',
-            'exp': datetime.utcnow() + timedelta(days=7),
-            'iat': datetime.utcnow()
+            'exp': now + REFRESH_TOKEN_TTL,
+            'iat': now,
+            'jti': uuid.uuid4().hex
         }
         
-        access_token = jwt.encode(access_payload, secret_key, algorithm='HS256')
-        refresh_token = jwt.encode(refresh_payload, secret_key, algorithm='HS256')
+        access_token = _jwt.encode(access_payload, secret_key, algorithm='HS256')
+        refresh_token = _jwt.encode(refresh_payload, secret_key, algorithm='HS256')
         
         return {
             'access_token': access_token,
             'refresh_token': refresh_token,
             'token_type': 'Bearer',
-            'expires_in': 900  # 15 minutes in seconds
+            'expires_in': ACCESS_TOKEN_TTL
         }
     
     @staticmethod
@@ -69,9 +165,22 @@ class JWTManager:
         Returns:
             Decoded token payload or None if invalid
         """
+        key = _token_digest(token)
+        
+        with _verify_lock:
+            if key in _rejected_cache:
+                return None
+            payload = _verify_cache.get(key)
+        
+        if payload is not None and payload.get('exp', 0) <= time.time():
+            payload = None
+        
         try:
-            secret_key = current_app.config.get('SECRET_KEY')
-            payload = jwt.decode(token, secret_key, algorithms=['HS256'])
+            if payload is None:
+                payload = _jwt.decode(token, _secret_key(), algorithms=['HS256'])
+                
+                with _verify_lock:
+                    _verify_cache[key] = payload
             
             # Verify token type
             if payload.get('type') != token_type:
@@ -82,11 +191,92 @@ class JWTManager:
             
         except jwt.ExpiredSignatureError:
             logger.warning("Token has expired")
+            with _verify_lock:
+                _rejected_cache[key] = True
             return None
         except jwt.InvalidTokenError as e:
             logger.warning(f"Invalid token: {e}")
+            with _verify_lock:
+                _rejected_cache[key] = True
             return None
     
+    @staticmethod
+    def verify_and_load(token: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Verify access token and load its user in one store round-trip
+        
+        Args:
+            token: JWT access token string
+        
+        Returns:
+            (payload, user) or (None, None) if the token is invalid,
+            revoked, or its user no longer exists
+        """
+        payload = JWTManager.verify_token(token, token_type='access')
+        
+        if not payload:
+            return None, None
+        
+        user_id = payload.get('user_id')
+        redis_client = UserManager._redis
+        
+        if redis_client is not None:
+            pipe = redis_client.pipeline()
+            pipe.hget(UserManager.USERS_BY_ID_KEY, user_id)
+            pipe.exists(f"{REVOKED_TOKEN_KEY_PREFIX}{payload.get('jti')}")
+            raw_user, revoked = pipe.execute()
+            
+            if revoked:
+                return None, None
+            user = orjson.loads(raw_user) if raw_user else None
+        else:
+            if JWTManager.is_revoked(payload.get('jti')):
+                return None, None
+            user = UserManager._load_user('id', user_id)
+        
+        if not user:
+            return None, None
+        
+        return payload, UserManager._to_public(user)
+    
+    @staticmethod
+    def revoke_token(payload: Dict[str, Any]) -> bool:
+        """
+        Revoke a verified token until it would have expired
+        
+        Args:
+            payload: Decoded token payload (needs 'jti' and 'exp')
+        
+        Returns:
+            True if the token was revoked, False if it had no ID or already expired
+        """
+        jti = payload.get('jti')
+        ttl = int(payload.get('exp', 0) - time.time())
+        if not jti or ttl <= 0:
+            return False
+        
+        redis_client = UserManager._redis
+        if redis_client is not None:
+            redis_client.set(f"{REVOKED_TOKEN_KEY_PREFIX}{jti}", 1, ex=ttl)
+        else:
+            with _verify_lock:
+                _revoked_local[jti] = True
+        
+        return True
+    
+    @staticmethod
+    def is_revoked(jti: Optional[str]) -> bool:
+        """Check whether a token ID has been revoked"""
+        if not jti:
+            return False
+        
+        redis_client = UserManager._redis
+        if redis_client is not None:
+            return bool(redis_client.exists(f"{REVOKED_TOKEN_KEY_PREFIX}{jti}"))
+        
+        with _verify_lock:
+            return jti in _revoked_local
+    
     @staticmethod
     def refresh_access_token(refresh_token: str) -> Optional[Dict[str, str]]:
         """
@@ -100,7 +290,7 @@ class JWTManager:
         """
         payload = JWTManager.verify_token(refresh_token, token_type='refresh')
         
-        if not payload:
+        if not payload or JWTManager.is_revoked(payload.get('jti')):
             return None
         
         user_id = payload.get('user_id')
@@ -120,40 +310,30 @@ def require_jwt_token(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         # Get token from Authorization header
-        auth_header = request.headers.get('Authorization')
+        auth_header = request.headers.get('Authorization', '')
         
         if not auth_header:
-            return jsonify({
-                'error': 'No authorization token provided',
-                'status': 'error'
-            }), 401
+            return _ERR_NO_AUTH, 401, _JSON_HEADERS
         
         # Extract token
-        try:
-            scheme, token = auth_header.split()
-            if scheme.lower() != 'bearer':
-                return jsonify({
-                    'error': 'Invalid authorization scheme',
-                    'status': 'error'
-                }), 401
-        except ValueError:
-            return jsonify({
-                'error': 'Invalid authorization header format',
-                'status': 'error'
-            }), 401
-        
-        # Verify token
-        payload = JWTManager.verify_token(token, token_type='access')
+        # Scheme is case-insensitive; surrounding whitespace is ignored
+        if auth_header[:7].lower() != 'bearer ':
+            return _ERR_BAD_SCHEME, 401, _JSON_HEADERS
+        
+        token = auth_header[7:].strip()
+        if not token or ' ' in token:
+            return _ERR_BAD_FORMAT, 401, _JSON_HEADERS
+        
+        # Verify token, revocation and user existence
+        payload, user = JWTManager.verify_and_load(token)
         
         if not payload:
-            return jsonify({
-                'error': 'Invalid or expired token',
-                'status': 'error'
-            }), 401
+            return _ERR_INVALID_TOKEN, 401, _JSON_HEADERS
         
         # Add user info to request
         request.user_id = payload.get('user_id')
         request.user_data = payload
+        request.user = user
         
         return f(*args, **kwargs)
     
@@ -167,18 +347,15 @@ def optional_jwt_token(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
+        auth_header = request.headers.get('Authorization', '')
         
-        if auth_header:
-            try:
-                scheme, token = auth_header.split()
-                if scheme.lower() == 'bearer':
-                    payload = JWTManager.verify_token(token, token_type='access')
-                    if payload:
-                        request.user_id = payload.get('user_id')
-                        request.user_data = payload
-            except (ValueError, AttributeError):
-                pass
+        if auth_header[:7].lower() == 'bearer ':
+            # Same revocation and user checks as require_jwt_token
+            payload, user = JWTManager.verify_and_load(auth_header[7:].strip())
+            if payload:
+                request.user_id = payload.get('user_id')
+                request.user_data = payload
+                request.user = user
         
         # Set default if no valid token
         if not hasattr(request, 'user_id'):
@@ -191,29 +368,145 @@ def optional_jwt_token(f):
 
 
 class UserManager:
-    """Simple user management (for demo - use proper DB in production)"""
+    """
+    User management backed by Redis hashes
+    Falls back to in-process dicts when Redis is unavailable
+    """
+    
+    # Redis keys
+    USERS_BY_ID_KEY = 'users:by_id'
+    USERS_BY_USERNAME_KEY = 'users:by_username'
+    USER_ID_SEQ_KEY = 'users:next_id'
+    
+    # Shared store, set by init_user_store
+    _redis = None
+    
+    # In-memory fallback store
+    _by_id: Dict[str, Dict[str, Any]] = {}
+    _by_username: Dict[str, Dict[str, Any]] = {}
+    
+    # Per-worker read cache so hot users skip the Redis round-trip
+    _local = TTLCache(maxsize=1024, ttl=30)
+    _local_lock = threading.RLock()
     
-    # In-memory user store (replace with database in production)
-    users_db = {}
+    # Argon2id hasher (C-backed)
+    _hasher = PasswordHasher()
+    
+    # Recently verified logins, keyed by a per-process MAC of the password so
+    # repeat logins skip Argon2. The stored hash is part of the key, so a
+    # password change invalidates entries as soon as the record is reloaded.
+    _verified = TTLCache(maxsize=4096, ttl=60)
+    _verified_key = os.urandom(32)
+    
+    @staticmethod
+    def _next_user_ids(count: int = 1) -> List[str]:
+        """Allocate a block of new user IDs"""
+        if UserManager._redis is not None:
+            last = UserManager._redis.incrby(UserManager.USER_ID_SEQ_KEY, count)
+        else:
+            last = len(UserManager._by_id) + count
+        return [f"user_{n}" for n in range(last - count + 1, last + 1)]
+    
+    @staticmethod
+    def _store_users(users: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Persist new users under both indexes, never replacing an existing username
+        
+        The username index is claimed first (HSETNX), so concurrent
+        registrations in any worker cannot overwrite each other.
+        
+        Returns:
+            The users actually stored (those whose username was free)
+        """
+        if UserManager._redis is not None:
+            serialized = [orjson.dumps(user) for user in users]
+            pipe = UserManager._redis.pipeline()
+            for user, data in zip(users, serialized):
+                pipe.hsetnx(UserManager.USERS_BY_USERNAME_KEY, user['username'], data)
+            claimed = pipe.execute()
+            
+            stored = [(user, data) for user, data, ok in zip(users, serialized, claimed) if ok]
+            if stored:
+                pipe = UserManager._redis.pipeline()
+                for user, data in stored:
+                    pipe.hset(UserManager.USERS_BY_ID_KEY, user['user_id'], data)
+                pipe.execute()
+            stored = [user for user, _ in stored]
+        else:
+            stored = []
+            with UserManager._local_lock:
+                for user in users:
+                    if user['username'] in UserManager._by_username:
+                        continue
+                    UserManager._by_id[user['user_id']] = user
+                    UserManager._by_username[user['username']] = user
+                    stored.append(user)
+        
+        # Drop stale local copies (e.g. a cached miss for the username)
+        with UserManager._local_lock:
+            for user in stored:
+                UserManager._local.pop(('id', user['user_id']), None)
+                UserManager._local.pop(('username', user['username']), None)
+        
+        return stored
+    
+    @staticmethod
+    def _load_user(index: str, value: str) -> Optional[Dict[str, Any]]:
+        """Load user record from the given index ('id' or 'username')"""
+        cache_key = (index, value)
+        
+        with UserManager._local_lock:
+            user = UserManager._local.get(cache_key)
+        if user is not None:
+            return user
+        
+        if UserManager._redis is not None:
+            redis_key = (UserManager.USERS_BY_ID_KEY if index == 'id'
+                         else UserManager.USERS_BY_USERNAME_KEY)
+            raw = UserManager._redis.hget(redis_key, value)
+            user = orjson.loads(raw) if raw else None
+        else:
+            store = UserManager._by_id if index == 'id' else UserManager._by_username
+            user = store.get(value)
+        
+        if user is not None:
+            with UserManager._local_lock:
+                UserManager._local[cache_key] = user
+        
+        return user
+    
+    @staticmethod
+    def _to_public(user: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a user record"""
+        return {
+            'user_id': user['user_id'],
+            'username': user['username'],
+            'email': user['email'],
+            'created_at': user['created_at']
+        }
     
     @staticmethod
     def create_user(username: str, password: str, email: str, 
-                   **kwargs) -> Dict[str, Any]:
-        """Create new user"""
-        user_id = f"user_{len(UserManager.users_db) + 1}"
+                   **kwargs) -> Optional[Dict[str, Any]]:
+        """Create new user; None if the username is already taken"""
+        # Cheap early exit before hashing; _store_users settles races
+        if UserManager._load_user('username', username) is not None:
+            return None
+        
+        user_id = UserManager._next_user_ids()[0]
         
         user = {
             'user_id': user_id,
             'username': username,
             'email': email,
-            'password_hash': generate_password_hash(password),
+            'password_hash': _run_blocking(UserManager._hasher.hash, password),
             'created_at': datetime.utcnow().isoformat(),
             'is_active': True,
             **kwargs
         }
         
-        UserManager.users_db[user_id] = user
-        UserManager.users_db[username] = user  # Also index by username
+        if not UserManager._store_users([user]):
+            return None
         
         return {
             'user_id': user_id,
@@ -221,16 +514,74 @@ class UserManager:
             'email': email
         }
     
+    @staticmethod
+    def create_users_bulk(users: List[Dict[str, Any]],
+                          executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+        """
+        Create many users with one ID allocation and one store write
+        
+        Args:
+            users: Dicts with username, password, email and extra fields
+            executor: Optional executor to hash passwords in parallel
+                (a ProcessPoolExecutor spreads Argon2 across CPUs)
+        
+        Returns:
+            Created users (user_id, username, email); taken usernames are skipped
+        """
+        if not users:
+            return []
+        
+        passwords = [u['password'] for u in users]
+        if executor is not None:
+            hashes = list(executor.map(_hash_password, passwords))
+        else:
+            hashes = [_hash_password(p) for p in passwords]
+        
+        created_at = datetime.utcnow().isoformat()
+        user_ids = UserManager._next_user_ids(len(users))
+        
+        records = []
+        for user_id, password_hash, data in zip(user_ids, hashes, users):
+            extra = {k: v for k, v in data.items() if k != 'password'}
+            records.append({
+                **extra,
+                'user_id': user_id,
+                'password_hash': password_hash,
+                'created_at': created_at,
+                'is_active': extra.get('is_active', True)
+            })
+        
+        stored = UserManager._store_users(records)
+        
+        return [
+            {'user_id': r['user_id'], 'username': r['username'], 'email': r['email']}
+            for r in stored
+        ]
+    
     @staticmethod
     def authenticate(username: str, password: str) -> Optional[Dict[str, Any]]:
         """Authenticate user"""
-        user = UserManager.users_db.get(username)
+        user = UserManager._load_user('username', username)
         
         if not user:
             return None
         
-        if not check_password_hash(user['password_hash'], password):
-            return None
+        password_mac = hashlib.blake2b(
+            password.encode(), key=UserManager._verified_key, digest_size=32
+        ).digest()
+        verified_key = (username, user['password_hash'], password_mac)
+        
+        with UserManager._local_lock:
+            verified = verified_key in UserManager._verified
+        
+        if not verified:
+            try:
+                _run_blocking(UserManager._hasher.verify, user['password_hash'], password)
+            except (VerificationError, InvalidHashError):
+                return None
+            
+            with UserManager._local_lock:
+                UserManager._verified[verified_key] = True
         
         if not user.get('is_active', True):
             return None
@@ -244,30 +595,64 @@ class UserManager:
     @staticmethod
     def get_user(user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
-        user = UserManager.users_db.get(user_id)
+        user = UserManager._load_user('id', user_id)
         
         if not user:
             return None
         
-        return {
-            'user_id': user['user_id'],
-            'username': user['username'],
-            'email': user['email'],
-            'created_at': user['created_at']
-        }
+        return UserManager._to_public(user)
+
+
+def _hash_password(password: str) -> str:
+    """Hash a password (module-level so worker processes can pickle it)"""
+    return UserManager._hasher.hash(password)
 
 
-# Create default admin user for testing
-UserManager.create_user(
-    username='admin',
-    password='admin123',
-    email='admin@example.com',
-    role='admin'
+# Demo accounts, created on first store initialization
+_DEFAULT_USERS = (
+    {'username': 'admin', 'password': 'admin123', 'email': 'admin@example.com', 'role': 'admin'},
+    {'username': 'demo', 'password': 'demo123', 'email': 'demo@example.com', 'role': 'user'},
 )
+_seeded = False
 
-UserManager.create_user(
-    username='demo',
-    password='demo123',
-    email='demo@example.com',
-    role='user'
-)
\ No newline at end of file
+
+def _seed_default_users():
+    """Create the demo accounts once, skipping any that already exist"""
+    global _seeded
+    
+    if _seeded:
+        return
+    
+    missing = [
+        user for user in _DEFAULT_USERS
+        if UserManager._load_user('username', user['username']) is None
+    ]
+    
+    # Startup only: hash the accounts in parallel, one process per account
+    if len(missing) > 1:
+        workers = min(os.cpu_count() or 1, len(missing))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            UserManager.create_users_bulk(missing, pool)
+    else:
+        UserManager.create_users_bulk(missing)
+    
+    _seeded = True
+
+
+def init_user_store(redis_client=None, seed_defaults: bool = True):
+    """
+    Attach the shared Redis user store
+    
+    Args:
+        redis_client: Redis client, or None to keep the in-process store
+        seed_defaults: Create the demo admin/demo accounts if missing
+    """
+    if redis_client is None:
+        logger.warning("Redis unavailable, using in-process user store")
+    else:
+        UserManager._redis = redis_client
+    
+    if seed_defaults:
+        _seed_default_users()
+    
+    logger.info("User store initialized")
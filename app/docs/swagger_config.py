@@ -3,10 +3,18 @@ Swagger/OpenAPI Documentation
 Interactive API documentation
 """
 import logging
-from flask import Blueprint
+import gzip
+import hashlib
+import orjson
+from flask import Blueprint, Response, request
 from flask_swagger_ui import get_swaggerui_blueprint
 from typing import Dict, Any
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 logger = logging.getLogger(__name__)
 
 # Swagger UI configuration
@@ -25,334 +33,354 @@ swagger_blueprint = get_swaggerui_blueprint(
 )
 
 
-def generate_openapi_spec() -> Dict[str, Any]:
-    """
-    Generate OpenAPI 3.0 specification
-    
-    Returns:
-        OpenAPI specification dictionary
-    """
-    spec = {
-        "openapi": "3.0.0",
-        "info": {
-            "title": "Intelligent Analysis System API",
-            "version": "2.0.0",
-            "description": "Enterprise-level document and image analysis system with RAG, AI Agents, and real-time updates",
-            "contact": {
-                "name": "API Support",
-                "email": "support@example.com"
-            },
-            "license": {
-                "name": "Proprietary",
-                "url": "https://example.com/license"
+# OpenAPI 3.0 specification (static, built once at import)
+_OPENAPI_SPEC = {
+    "openapi": "3.0.0",
+    "info": {
+        "title": "Intelligent Analysis System API",
+        "version": "2.0.0",
+        "description": "Enterprise-level document and image analysis system with RAG, AI Agents, and real-time updates",
+        "contact": {
+            "name": "API Support",
+            "email": "support@example.com"
+        },
+        "license": {
+            "name": "Proprietary",
+            "url": "https://example.com/license"
+        }
+    },
+    "servers": [
+        {
+            "url": "http://localhost:5000",
+            "description": "Development server"
+        },
+        {
+            "url": "https://api.example.com",
+            "description": "Production server"
+        }
+    ],
+    "components": {
+        "securitySchemes": {
+            "BearerAuth": {
+                "type": "http",
+                "scheme": "bearer",
+                "bearerFormat": "JWT",
+                "description": "JWT token obtained from /api/auth/login"
             }
         },
-        "servers": [
-            {
-                "url": "http://localhost:5000",
-                "description": "Development server"
+        "schemas": {
+            "Error": {
+                "type": "object",
+                "properties": {
+                    "error": {"type": "string"},
+                    "status": {"type": "string"},
+                    "message": {"type": "string"}
+                }
             },
-            {
-                "url": "https://api.example.com",
-                "description": "Production server"
-            }
-        ],
-        "components": {
-            "securitySchemes": {
-                "BearerAuth": {
-                    "type": "http",
-                    "scheme": "bearer",
-                    "bearerFormat": "JWT",
-                    "description": "JWT token obtained from /api/auth/login"
+            "AnalysisResult": {
+                "type": "object",
+                "properties": {
+                    "document_structure": {"type": "array"},
+                    "text_similarity_results": {"type": "array"},
+                    "ai_text_detection": {"type": "array"},
+                    "image_similarity": {"type": "array"},
+                    "rag_contextual_results": {"type": "array"},
+                    "observations_llm": {"type": "string"},
+                    "insights": {"type": "string"},
+                    "memory_id": {"type": "string"}
                 }
             },
-            "schemas": {
-                "Error": {
-                    "type": "object",
-                    "properties": {
-                        "error": {"type": "string"},
-                        "status": {"type": "string"},
-                        "message": {"type": "string"}
-                    }
-                },
-                "AnalysisResult": {
-                    "type": "object",
-                    "properties": {
-                        "document_structure": {"type": "array"},
-                        "text_similarity_results": {"type": "array"},
-                        "ai_text_detection": {"type": "array"},
-                        "image_similarity": {"type": "array"},
-                        "rag_contextual_results": {"type": "array"},
-                        "observations_llm": {"type": "string"},
-                        "insights": {"type": "string"},
-                        "memory_id": {"type": "string"}
-                    }
-                },
-                "TaskStatus": {
-                    "type": "object",
-                    "properties": {
-                        "task_id": {"type": "string"},
-                        "state": {"type": "string", "enum": ["PENDING", "PROCESSING", "SUCCESS", "FAILURE"]},
-                        "progress": {"type": "integer", "minimum": 0, "maximum": 100},
-                        "status": {"type": "string"},
-                        "result": {"type": "object"}
-                    }
+            "TaskStatus": {
+                "type": "object",
+                "properties": {
+                    "task_id": {"type": "string"},
+                    "state": {"type": "string", "enum": ["PENDING", "PROCESSING", "SUCCESS", "FAILURE"]},
+                    "progress": {"type": "integer", "minimum": 0, "maximum": 100},
+                    "status": {"type": "string"},
+                    "result": {"type": "object"}
                 }
             }
-        },
-        "security": [
-            {"BearerAuth": []}
-        ],
-        "paths": {
-            "/api/auth/login": {
-                "post": {
-                    "tags": ["Authentication"],
-                    "summary": "User login",
-                    "description": "Authenticate user and receive JWT tokens",
-                    "security": [],
-                    "requestBody": {
-                        "required": True,
-                        "content": {
-                            "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "required": ["username", "password"],
-                                    "properties": {
-                                        "username": {"type": "string"},
-                                        "password": {"type": "string", "format": "password"}
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "responses": {
-                        "200": {
-                            "description": "Login successful",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "access_token": {"type": "string"},
-                                            "refresh_token": {"type": "string"},
-                                            "token_type": {"type": "string"},
-                                            "expires_in": {"type": "integer"}
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "401": {
-                            "description": "Invalid credentials",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/Error"}
+        }
+    },
+    "security": [
+        {"BearerAuth": []}
+    ],
+    "paths": {
+        "/api/auth/login": {
+            "post": {
+                "tags": ["Authentication"],
+                "summary": "User login",
+                "description": "Authenticate user and receive JWT tokens",
+                "security": [],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "required": ["username", "password"],
+                                "properties": {
+                                    "username": {"type": "string"},
+                                    "password": {"type": "string", "format": "password"}
                                 }
                             }
                         }
                     }
-                }
-            },
-            "/api/analysis/upload": {
-                "post": {
-                    "tags": ["Analysis"],
-                    "summary": "Upload document",
-                    "description": "Upload document for analysis",
-                    "requestBody": {
-                        "required": True,
+                },
+                "responses": {
+                    "200": {
+                        "description": "Login successful",
                         "content": {
-                            "multipart/form-data": {
+                            "application/json": {
                                 "schema": {
                                     "type": "object",
-                                    "required": ["file"],
                                     "properties": {
-                                        "file": {
-                                            "type": "string",
-                                            "format": "binary"
-                                        }
+                                        "access_token": {"type": "string"},
+                                        "refresh_token": {"type": "string"},
+                                        "token_type": {"type": "string"},
+                                        "expires_in": {"type": "integer"}
                                     }
                                 }
                             }
                         }
                     },
-                    "responses": {
-                        "201": {
-                            "description": "Document uploaded successfully"
-                        },
-                        "400": {
-                            "description": "Invalid file"
-                        }
-                    }
-                }
-            },
-            "/api/analysis/analyze": {
-                "post": {
-                    "tags": ["Analysis"],
-                    "summary": "Analyze document",
-                    "description": "Start asynchronous document analysis",
-                    "requestBody": {
-                        "required": True,
+                    "401": {
+                        "description": "Invalid credentials",
                         "content": {
                             "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "required": ["filepath", "analysis_types"],
-                                    "properties": {
-                                        "filepath": {"type": "string"},
-                                        "analysis_types": {
-                                            "type": "array",
-                                            "items": {
-                                                "type": "string",
-                                                "enum": ["similarity", "ai_detect", "rag_retrieval"]
-                                            }
-                                        }
-                                    }
-                                }
+                                "schema": {"$ref": "#/components/schemas/Error"}
                             }
                         }
-                    },
-                    "responses": {
-                        "200": {
-                            "description": "Analysis started",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "task_id": {"type": "string"},
-                                            "status": {"type": "string"}
-                                        }
+                    }
+                }
+            }
+        },
+        "/api/analysis/upload": {
+            "post": {
+                "tags": ["Analysis"],
+                "summary": "Upload document",
+                "description": "Upload document for analysis",
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "multipart/form-data": {
+                            "schema": {
+                                "type": "object",
+                                "required": ["file"],
+                                "properties": {
+                                    "file": {
+                                        "type": "string",
+                                        "format": "binary"
                                     }
                                 }
                             }
                         }
                     }
+                },
+                "responses": {
+                    "201": {
+                        "description": "Document uploaded successfully"
+                    },
+                    "400": {
+                        "description": "Invalid file"
+                    }
                 }
-            },
-            "/api/tasks/{task_id}": {
-                "get": {
-                    "tags": ["Tasks"],
-                    "summary": "Get task status",
-                    "description": "Get status of async task",
-                    "parameters": [
-                        {
-                            "name": "task_id",
-                            "in": "path",
-                            "required": True,
-                            "schema": {"type": "string"}
-                        }
-                    ],
-                    "responses": {
-                        "200": {
-                            "description": "Task status",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/TaskStatus"}
+            }
+        },
+        "/api/analysis/analyze": {
+            "post": {
+                "tags": ["Analysis"],
+                "summary": "Analyze document",
+                "description": "Start asynchronous document analysis",
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "required": ["filepath", "analysis_types"],
+                                "properties": {
+                                    "filepath": {"type": "string"},
+                                    "analysis_types": {
+                                        "type": "array",
+                                        "items": {
+                                            "type": "string",
+                                            "enum": ["similarity", "ai_detect", "rag_retrieval"]
+                                        }
+                                    }
                                 }
                             }
                         }
                     }
-                }
-            },
-            "/api/chat/message": {
-                "post": {
-                    "tags": ["Chat"],
-                    "summary": "Send chat message",
-                    "description": "Send message in post-analysis chat",
-                    "requestBody": {
-                        "required": True,
+                },
+                "responses": {
+                    "200": {
+                        "description": "Analysis started",
                         "content": {
                             "application/json": {
                                 "schema": {
                                     "type": "object",
-                                    "required": ["memory_id", "question"],
                                     "properties": {
-                                        "memory_id": {"type": "string"},
-                                        "question": {"type": "string"}
+                                        "task_id": {"type": "string"},
+                                        "status": {"type": "string"}
                                     }
                                 }
                             }
                         }
-                    },
-                    "responses": {
-                        "200": {
-                            "description": "Chat response"
-                        }
                     }
                 }
-            },
-            "/api/chat/stream": {
-                "post": {
-                    "tags": ["Chat"],
-                    "summary": "Stream chat response",
-                    "description": "Stream chat response with SSE",
-                    "requestBody": {
+            }
+        },
+        "/api/tasks/{task_id}": {
+            "get": {
+                "tags": ["Tasks"],
+                "summary": "Get task status",
+                "description": "Get status of async task",
+                "parameters": [
+                    {
+                        "name": "task_id",
+                        "in": "path",
                         "required": True,
+                        "schema": {"type": "string"}
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Task status",
                         "content": {
                             "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "required": ["memory_id", "question"],
-                                    "properties": {
-                                        "memory_id": {"type": "string"},
-                                        "question": {"type": "string"}
-                                    }
-                                }
+                                "schema": {"$ref": "#/components/schemas/TaskStatus"}
                             }
                         }
-                    },
-                    "responses": {
-                        "200": {
-                            "description": "Streaming response",
-                            "content": {
-                                "text/event-stream": {
-                                    "schema": {"type": "string"}
+                    }
+                }
+            }
+        },
+        "/api/chat/message": {
+            "post": {
+                "tags": ["Chat"],
+                "summary": "Send chat message",
+                "description": "Send message in post-analysis chat",
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "required": ["memory_id", "question"],
+                                "properties": {
+                                    "memory_id": {"type": "string"},
+                                    "question": {"type": "string"}
                                 }
                             }
                         }
                     }
+                },
+                "responses": {
+                    "200": {
+                        "description": "Chat response"
+                    }
                 }
-            },
-            "/metrics": {
-                "get": {
-                    "tags": ["Monitoring"],
-                    "summary": "Prometheus metrics",
-                    "description": "Get Prometheus metrics",
-                    "security": [],
-                    "responses": {
-                        "200": {
-                            "description": "Metrics in Prometheus format"
+            }
+        },
+        "/api/chat/stream": {
+            "post": {
+                "tags": ["Chat"],
+                "summary": "Stream chat response",
+                "description": "Stream chat response with SSE",
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "required": ["memory_id", "question"],
+                                "properties": {
+                                    "memory_id": {"type": "string"},
+                                    "question": {"type": "string"}
+                                }
+                            }
                         }
                     }
-                }
-            },
-            "/health": {
-                "get": {
-                    "tags": ["System"],
-                    "summary": "Health check",
-                    "description": "Check system health",
-                    "security": [],
-                    "responses": {
-                        "200": {
-                            "description": "System healthy"
+                },
+                "responses": {
+                    "200": {
+                        "description": "Streaming response",
+                        "content": {
+                            "text/event-stream": {
+                                "schema": {"type": "string"}
+                            }
                         }
                     }
                 }
             }
         },
-        "tags": [
-            {"name": "Authentication", "description": "Authentication endpoints"},
-            {"name": "Analysis", "description": "Document analysis operations"},
-            {"name": "Tasks", "description": "Async task management"},
-            {"name": "Chat", "description": "Post-analysis chat"},
-            {"name": "Monitoring", "description": "System monitoring"},
-            {"name": "System", "description": "System utilities"}
-        ]
-    }
+        "/metrics": {
+            "get": {
+                "tags": ["Monitoring"],
+                "summary": "Prometheus metrics",
+                "description": "Get Prometheus metrics",
+                "security": [],
+                "responses": {
+                    "200": {
+                        "description": "Metrics in Prometheus format"
+                    }
+                }
+            }
+        },
+        "/health": {
+            "get": {
+                "tags": ["System"],
+                "summary": "Health check",
+                "description": "Check system health",
+                "security": [],
+                "responses": {
+                    "200": {
+                        "description": "System healthy"
+                    }
+                }
+            }
+        }
+    },
+    "tags": [
+        {"name": "Authentication", "description": "Authentication endpoints"},
+        {"name": "Analysis", "description": "Document analysis operations"},
+        {"name": "Tasks", "description": "Async task management"},
+        {"name": "Chat", "description": "Post-analysis chat"},
+        {"name": "Monitoring", "description": "System monitoring"},
+        {"name": "System", "description": "System utilities"}
+    ]
+}
+
+
+def generate_openapi_spec() -> Dict[str, Any]:
+    """
+    Get OpenAPI 3.0 specification
     
-    return spec
+    Returns:
+        OpenAPI specification dictionary
+    """
+    return _OPENAPI_SPEC
 
 
+# Spec is static: serialize and compress once at import
+_SPEC_JSON = orjson.dumps(generate_openapi_spec())
+_SPEC_GZ = gzip.compress(_SPEC_JSON, 9)
+_SPEC_BR = brotli.compress(_SPEC_JSON, quality=11) if brotli else None
+_ETAG = hashlib.sha256(_SPEC_JSON).hexdigest()[:32]
+
+_SPEC_HEADERS = {
+    'Cache-Control': 'public, max-age=3600',
+    'Vary': 'Accept-Encoding'
+}
+
+# (body, headers) per content-coding; each variant has its own strong ETag
+_SPEC_VARIANTS = {
+    'br': (_SPEC_BR, {**_SPEC_HEADERS, 'ETag': f'"{_ETAG}-br"', 'Content-Encoding': 'br'}),
+    'gzip': (_SPEC_GZ, {**_SPEC_HEADERS, 'ETag': f'"{_ETAG}-gz"', 'Content-Encoding': 'gzip'}),
+    'identity': (_SPEC_JSON, {**_SPEC_HEADERS, 'ETag': f'"{_ETAG}"'}),
+}
+
 # Blueprint for serving OpenAPI spec
 api_spec_blueprint = Blueprint('api_spec', __name__)
 
@@ -360,5 +388,19 @@ api_spec_blueprint = Blueprint('api_spec', __name__)
 @api_spec_blueprint.route('/api/swagger.json')
 def swagger_spec():
     """Serve OpenAPI specification"""
-    from flask import jsonify
-    return jsonify(generate_openapi_spec())
\ No newline at end of file
+    accept_encodings = request.accept_encodings
+    
+    if _SPEC_BR is not None and accept_encodings['br']:
+        encoding = 'br'
+    elif accept_encodings['gzip']:
+        encoding = 'gzip'
+    else:
+        encoding = 'identity'
+    
+    body, headers = _SPEC_VARIANTS[encoding]
+    
+    # Revalidate against the tag of the variant this request would get
+    if request.if_none_match.contains(headers['ETag'].strip('"')):
+        return Response(status=304, headers=headers)
+    
+    return Response(body, mimetype='application/json', headers=headers)
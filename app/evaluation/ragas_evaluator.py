@@ -3,12 +3,31 @@ RAGAS Integration
 RAG quality evaluation metrics
 """
 import logging
-from typing import List, Dict, Any
-from dataclasses import dataclass
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, FrozenSet, Optional, Tuple
+from dataclasses import dataclass, fields
+from operator import attrgetter
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 logger = logging.getLogger(__name__)
 
+# Non-empty sentence spans, split on . ! ?
+_SENT_RE = re.compile(r'[^.!?\s][^.!?]*')
+
+
+@lru_cache(maxsize=4096)
+def _tokset(text: str) -> FrozenSet[str]:
+    """Lowercased word set of text (memoized; contexts repeat across cases)"""
+    return frozenset(text.lower().split())
+
 
 @dataclass
 class RAGMetrics:
@@ -20,6 +39,55 @@ class RAGMetrics:
     overall_score: float
 
 
+# Reads all RAGMetrics fields as a tuple, in declaration order
+_metrics_row = attrgetter(*(f.name for f in fields(RAGMetrics)))
+
+
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def _pairwise_jaccard(sorted_tokens_flat, offsets):
+        """
+        Sum of pairwise Jaccard similarities over sorted int32 token slices
+        
+        Args:
+            sorted_tokens_flat: Concatenated sorted unique token IDs per context
+            offsets: Slice boundaries, context i is flat[offsets[i]:offsets[i+1]]
+        
+        Returns:
+            Sum of Jaccard similarity over all pairs i < j
+        """
+        k = offsets.shape[0] - 1
+        row_sums = np.zeros(k, dtype=np.float64)
+        
+        for i in range(k):
+            a_start, a_end = offsets[i], offsets[i + 1]
+            acc = 0.0
+            for j in range(i + 1, k):
+                b_start, b_end = offsets[j], offsets[j + 1]
+                
+                # Sorted-array merge for the intersection count
+                p, q, inter = a_start, b_start, 0
+                while p < a_end and q < b_end:
+                    a, b = sorted_tokens_flat[p], sorted_tokens_flat[q]
+                    if a == b:
+                        inter += 1
+                        p += 1
+                        q += 1
+                    elif a < b:
+                        p += 1
+                    else:
+                        q += 1
+                
+                union = (a_end - a_start) + (b_end - b_start) - inter
+                if union > 0:
+                    acc += inter / union
+            row_sums[i] = acc
+        
+        return row_sums.sum()
+else:
+    _pairwise_jaccard = None
+
+
 class RAGASEvaluator:
     """
     RAGAS-based RAG evaluation
@@ -37,7 +105,9 @@ class RAGASEvaluator:
         logger.info("RAGAS Evaluator initialized")
     
     def evaluate_retrieval(self, query: str, retrieved_contexts: List[str],
-                          ground_truth: str = None) -> Dict[str, float]:
+                          ground_truth: str = None,
+                          contexts_tok: Optional[List[FrozenSet[str]]] = None,
+                          contexts_ids: Optional[List[np.ndarray]] = None) -> Dict[str, float]:
         """
         Evaluate retrieval quality
         
@@ -45,30 +115,38 @@ class RAGASEvaluator:
             query: User query
             retrieved_contexts: Retrieved context chunks
             ground_truth: Ground truth context (if available)
+            contexts_tok: Precomputed context word sets (optional)
+            contexts_ids: Precomputed sorted int32 token IDs per context (optional)
         
         Returns:
             Retrieval metrics
         """
+        if contexts_tok is None:
+            contexts_tok = [_tokset(c) for c in retrieved_contexts]
+        
         metrics = {}
         
         # Context Precision: How relevant are the retrieved contexts
         metrics['context_precision'] = self._calculate_context_precision(
-            query, retrieved_contexts
+            query, retrieved_contexts, contexts_tok=contexts_tok
         )
         
         # Context Recall: Coverage of relevant information
         if ground_truth:
             metrics['context_recall'] = self._calculate_context_recall(
-                retrieved_contexts, ground_truth
+                retrieved_contexts, ground_truth, contexts_tok=contexts_tok
             )
         
         # Diversity: How diverse are the retrieved contexts
-        metrics['context_diversity'] = self._calculate_diversity(retrieved_contexts)
+        metrics['context_diversity'] = self._calculate_diversity(
+            retrieved_contexts, contexts_tok=contexts_tok, contexts_ids=contexts_ids
+        )
         
         return metrics
     
     def evaluate_generation(self, query: str, answer: str, 
-                           contexts: List[str]) -> Dict[str, float]:
+                           contexts: List[str],
+                           contexts_tok: Optional[List[FrozenSet[str]]] = None) -> Dict[str, float]:
         """
         Evaluate generation quality
         
@@ -76,6 +154,7 @@ class RAGASEvaluator:
             query: User query
             answer: Generated answer
             contexts: Contexts used for generation
+            contexts_tok: Precomputed context word sets (optional)
         
         Returns:
             Generation metrics
@@ -83,7 +162,9 @@ class RAGASEvaluator:
         metrics = {}
         
         # Faithfulness: Is the answer faithful to the contexts
-        metrics['faithfulness'] = self._calculate_faithfulness(answer, contexts)
+        metrics['faithfulness'] = self._calculate_faithfulness(
+            answer, contexts, contexts_tok=contexts_tok
+        )
         
         # Answer Relevancy: How relevant is the answer to the query
         metrics['answer_relevancy'] = self._calculate_answer_relevancy(query, answer)
@@ -95,7 +176,8 @@ class RAGASEvaluator:
     
     def evaluate_end_to_end(self, query: str, answer: str,
                            retrieved_contexts: List[str],
-                           ground_truth_answer: str = None) -> RAGMetrics:
+                           ground_truth_answer: str = None,
+                           contexts_ids: Optional[List[np.ndarray]] = None) -> RAGMetrics:
         """
         Complete end-to-end RAG evaluation
         
@@ -104,15 +186,25 @@ class RAGASEvaluator:
             answer: Generated answer
             retrieved_contexts: Retrieved contexts
             ground_truth_answer: Ground truth answer (if available)
+            contexts_ids: Sorted int32 token IDs per context from a shared
+                vocabulary (optional, see _vectorize_corpus)
         
         Returns:
             Complete RAG metrics
         """
+        # Tokenize contexts once for all metrics
+        contexts_tok = [_tokset(c) for c in retrieved_contexts]
+        
         # Retrieval metrics
-        retrieval = self.evaluate_retrieval(query, retrieved_contexts)
+        retrieval = self.evaluate_retrieval(
+            query, retrieved_contexts,
+            contexts_tok=contexts_tok, contexts_ids=contexts_ids
+        )
         
         # Generation metrics
-        generation = self.evaluate_generation(query, answer, retrieved_contexts)
+        generation = self.evaluate_generation(
+            query, answer, retrieved_contexts, contexts_tok=contexts_tok
+        )
         
         # Calculate overall score
         overall_score = self._calculate_overall_score(retrieval, generation)
@@ -126,7 +218,8 @@ class RAGASEvaluator:
         )
     
     def _calculate_context_precision(self, query: str, 
-                                    contexts: List[str]) -> float:
+                                    contexts: List[str],
+                                    contexts_tok: Optional[List[FrozenSet[str]]] = None) -> float:
         """
         Calculate context precision
         Measures relevance of retrieved contexts to query
@@ -134,12 +227,14 @@ class RAGASEvaluator:
         if not contexts:
             return 0.0
         
+        if contexts_tok is None:
+            contexts_tok = [_tokset(c) for c in contexts]
+        
         # Simple implementation: keyword overlap
-        query_words = set(query.lower().split())
+        query_words = _tokset(query)
         
         relevant_count = 0
-        for context in contexts:
-            context_words = set(context.lower().split())
+        for context_words in contexts_tok:
             overlap = len(query_words.intersection(context_words))
             
             # Consider relevant if significant overlap
@@ -149,7 +244,8 @@ class RAGASEvaluator:
         return relevant_count / len(contexts)
     
     def _calculate_context_recall(self, contexts: List[str], 
-                                  ground_truth: str) -> float:
+                                  ground_truth: str,
+                                  contexts_tok: Optional[List[FrozenSet[str]]] = None) -> float:
         """
         Calculate context recall
         Measures coverage of ground truth in retrieved contexts
@@ -157,33 +253,120 @@ class RAGASEvaluator:
         if not contexts or not ground_truth:
             return 0.0
         
-        ground_truth_words = set(ground_truth.lower().split())
-        retrieved_words = set()
+        ground_truth_words = _tokset(ground_truth)
         
-        for context in contexts:
-            retrieved_words.update(context.lower().split())
+        # One lowercase/split over a joined buffer unless word sets are given
+        if contexts_tok is None:
+            retrieved_words = set(' '.join(contexts).lower().split())
+        else:
+            retrieved_words = frozenset().union(*contexts_tok)
         
         # Calculate coverage
         coverage = len(ground_truth_words.intersection(retrieved_words))
         return coverage / len(ground_truth_words) if ground_truth_words else 0.0
     
-    def _calculate_diversity(self, contexts: List[str]) -> float:
-        """Calculate diversity of retrieved contexts"""
-        if len(contexts) < 2:
+    def _calculate_diversity(self, contexts: List[str],
+                             contexts_tok: Optional[List[FrozenSet[str]]] = None,
+                             contexts_ids: Optional[List[np.ndarray]] = None) -> float:
+        """
+        Calculate diversity of retrieved contexts
+        
+        Contexts are mapped to sorted int32 token IDs; pairwise Jaccard runs in
+        a Numba kernel when available, else as one matrix product over a
+        (contexts x vocabulary) presence matrix.
+        """
+        k = len(contexts)
+        if k < 2:
             return 1.0
         
-        # Calculate pairwise similarity
-        similarities = []
-        for i in range(len(contexts)):
-            for j in range(i + 1, len(contexts)):
-                sim = self._text_similarity(contexts[i], contexts[j])
-                similarities.append(sim)
+        if contexts_ids is None:
+            if contexts_tok is None:
+                contexts_tok = [_tokset(c) for c in contexts]
+            contexts_ids = self._encode_token_sets(contexts_tok)
+        
+        sizes = np.fromiter((len(ids) for ids in contexts_ids), dtype=np.int64, count=k)
+        if not sizes.any():
+            return 1.0
+        
+        flat = np.concatenate(contexts_ids)
+        n_pairs = k * (k - 1) // 2
+        
+        if _pairwise_jaccard is not None:
+            offsets = np.zeros(k + 1, dtype=np.int64)
+            np.cumsum(sizes, out=offsets[1:])
+            mean_similarity = _pairwise_jaccard(flat, offsets) / n_pairs
+        else:
+            # Compact IDs to the columns actually present in this case
+            columns, cols = np.unique(flat, return_inverse=True)
+            rows = np.repeat(np.arange(k), sizes)
+            presence = np.zeros((k, len(columns)), dtype=np.float32)
+            presence[rows, cols] = 1.0
+            
+            # Intersections for all pairs at once; unions from set sizes
+            sizes_f = sizes.astype(np.float64)
+            intersection = presence @ presence.T
+            union = sizes_f[:, None] + sizes_f[None, :] - intersection
+            jaccard = intersection / np.maximum(union, 1.0)
+            mean_similarity = jaccard[np.triu_indices(k, 1)].mean()
         
         # Diversity is inverse of average similarity
-        avg_similarity = np.mean(similarities) if similarities else 0
-        return 1.0 - avg_similarity
+        return 1.0 - float(mean_similarity)
+    
+    def _encode_token_sets(self, token_sets: List[FrozenSet[str]]) -> List[np.ndarray]:
+        """
+        Map word sets to sorted int32 IDs over a vocabulary local to the call
+        
+        Args:
+            token_sets: Word set per context
+        
+        Returns:
+            Sorted unique int32 token IDs per context
+        """
+        sizes = [len(t) for t in token_sets]
+        all_tokens = [tok for toks in token_sets for tok in toks]
+        if not all_tokens:
+            return [np.empty(0, dtype=np.int32) for _ in token_sets]
+        
+        _, token_ids = np.unique(np.array(all_tokens), return_inverse=True)
+        token_ids = token_ids.astype(np.int32)
+        
+        # Sort IDs within each context slice (rows are already contiguous)
+        rows = np.repeat(np.arange(len(token_sets)), sizes)
+        token_ids = token_ids[np.lexsort((token_ids, rows))]
+        return np.split(token_ids, np.cumsum(sizes)[:-1])
     
-    def _calculate_faithfulness(self, answer: str, contexts: List[str]) -> float:
+    def _vectorize_corpus(self, test_cases: List[Dict[str, Any]]
+                          ) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+        """
+        Build one token vocabulary for a batch and encode every context once
+        
+        Args:
+            test_cases: List of test cases with query, answer, contexts
+        
+        Returns:
+            Tuple of (vocabulary, cases with '_contexts_ids' added)
+        """
+        vocab: Dict[str, int] = {}
+        encoded: Dict[str, np.ndarray] = {}
+        
+        def encode(text: str) -> np.ndarray:
+            ids = encoded.get(text)
+            if ids is None:
+                ids = np.array(
+                    sorted(vocab.setdefault(tok, len(vocab)) for tok in _tokset(text)),
+                    dtype=np.int32
+                )
+                encoded[text] = ids
+            return ids
+        
+        vectorized = [
+            {**case, '_contexts_ids': [encode(c) for c in case['contexts']]}
+            for case in test_cases
+        ]
+        return vocab, vectorized
+    
+    def _calculate_faithfulness(self, answer: str, contexts: List[str],
+                                contexts_tok: Optional[List[FrozenSet[str]]] = None) -> float:
         """
         Calculate faithfulness
         Measures if answer is supported by contexts
@@ -191,29 +374,31 @@ class RAGASEvaluator:
         if not contexts:
             return 0.0
         
-        answer_sentences = answer.split('.')
-        supported_count = 0
+        if contexts_tok is None:
+            contexts_tok = [_tokset(c) for c in contexts]
+        
+        answer_sentences = _SENT_RE.findall(answer)
+        if not answer_sentences:
+            return 0.0
         
+        supported_count = 0
         for sentence in answer_sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-            
             # Check if sentence is supported by any context
-            for context in contexts:
-                if self._is_supported(sentence, context):
+            sentence_words = _tokset(sentence)
+            for context_words in contexts_tok:
+                if self._is_supported(sentence_words, context_words):
                     supported_count += 1
                     break
         
-        return supported_count / len(answer_sentences) if answer_sentences else 0.0
+        return supported_count / len(answer_sentences)
     
     def _calculate_answer_relevancy(self, query: str, answer: str) -> float:
         """
         Calculate answer relevancy
         Measures how well answer addresses the query
         """
-        query_words = set(query.lower().split())
-        answer_words = set(answer.lower().split())
+        query_words = _tokset(query)
+        answer_words = _tokset(answer)
         
         overlap = len(query_words.intersection(answer_words))
         
@@ -243,66 +428,71 @@ class RAGASEvaluator:
         else:
             return max(0, 1.0 - (ratio - 0.5))
     
+    # Overall score weights, index-aligned with _WEIGHT_KEYS
+    _WEIGHT_KEYS = ('context_precision', 'faithfulness', 'answer_relevancy', 'completeness')
+    _WEIGHTS = np.array([0.2, 0.3, 0.3, 0.2], dtype=np.float64)
+    
     def _calculate_overall_score(self, retrieval: Dict[str, float],
                                 generation: Dict[str, float]) -> float:
         """Calculate weighted overall score"""
-        weights = {
-            'context_precision': 0.2,
-            'faithfulness': 0.3,
-            'answer_relevancy': 0.3,
-            'completeness': 0.2
-        }
-        
-        score = 0.0
-        for metric, weight in weights.items():
-            if metric in retrieval:
-                score += retrieval[metric] * weight
-            elif metric in generation:
-                score += generation[metric] * weight
-        
-        return score
+        # Retrieval values take precedence on shared keys
+        merged = {**generation, **retrieval}
+        values = np.fromiter(
+            (merged.get(k, 0.0) for k in self._WEIGHT_KEYS),
+            dtype=np.float64, count=len(self._WEIGHT_KEYS)
+        )
+        return float(values @ self._WEIGHTS)
     
     def _text_similarity(self, text1: str, text2: str) -> float:
         """Calculate simple text similarity"""
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
+        words1 = _tokset(text1)
+        words2 = _tokset(text2)
         
         intersection = words1.intersection(words2)
         union = words1.union(words2)
         
         return len(intersection) / len(union) if union else 0.0
     
-    def _is_supported(self, sentence: str, context: str) -> bool:
-        """Check if sentence is supported by context"""
+    def _is_supported(self, sentence_words: FrozenSet[str],
+                      context_words: FrozenSet[str]) -> bool:
+        """Check if sentence word set is supported by context word set"""
         # Simple check: significant word overlap
-        sentence_words = set(sentence.lower().split())
-        context_words = set(context.lower().split())
-        
         overlap = len(sentence_words.intersection(context_words))
         return overlap >= len(sentence_words) * 0.6
     
-    def batch_evaluate(self, test_cases: List[Dict[str, Any]]) -> List[RAGMetrics]:
+    def batch_evaluate(self, test_cases: List[Dict[str, Any]],
+                       max_workers: Optional[int] = None) -> List[RAGMetrics]:
         """
         Evaluate multiple test cases
         
+        Cases are independent and evaluated concurrently; the numeric kernels
+        release the GIL, so threads overlap.
+        
         Args:
             test_cases: List of test cases with query, answer, contexts
+            max_workers: Thread pool size (defaults to CPU count)
         
         Returns:
-            List of evaluation metrics
+            List of evaluation metrics, in input order
         """
-        results = []
-        
-        for case in test_cases:
-            metrics = self.evaluate_end_to_end(
+        def evaluate_case(case: Dict[str, Any]) -> RAGMetrics:
+            return self.evaluate_end_to_end(
                 query=case['query'],
                 answer=case['answer'],
                 retrieved_contexts=case['contexts'],
-                ground_truth_answer=case.get('ground_truth')
+                ground_truth_answer=case.get('ground_truth'),
+                contexts_ids=case['_contexts_ids']
             )
-            results.append(metrics)
         
-        return results
+        # Contexts repeat across cases; hash each distinct one only once
+        _, test_cases = self._vectorize_corpus(test_cases)
+        
+        if len(test_cases) < 2:
+            return [evaluate_case(case) for case in test_cases]
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(test_cases))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(evaluate_case, test_cases))
     
     def generate_report(self, metrics_list: List[RAGMetrics]) -> Dict[str, Any]:
         """
@@ -317,13 +507,18 @@ class RAGASEvaluator:
         if not metrics_list:
             return {}
         
+        # One (N, 5) array in RAGMetrics field order, reduced in one pass
+        scores = np.array([_metrics_row(m) for m in metrics_list], dtype=np.float64)
+        means = scores.mean(axis=0)
+        overall = scores[:, 4]
+        
         return {
             'total_evaluations': len(metrics_list),
-            'average_context_precision': np.mean([m.context_precision for m in metrics_list]),
-            'average_context_recall': np.mean([m.context_recall for m in metrics_list]),
-            'average_faithfulness': np.mean([m.faithfulness for m in metrics_list]),
-            'average_answer_relevancy': np.mean([m.answer_relevancy for m in metrics_list]),
-            'average_overall_score': np.mean([m.overall_score for m in metrics_list]),
-            'min_score': min(m.overall_score for m in metrics_list),
-            'max_score': max(m.overall_score for m in metrics_list)
+            'average_context_precision': means[0],
+            'average_context_recall': means[1],
+            'average_faithfulness': means[2],
+            'average_answer_relevancy': means[3],
+            'average_overall_score': means[4],
+            'min_score': overall.min(),
+            'max_score': overall.max()
         }
\ No newline at end of file
@@ -2,21 +2,107 @@
 LLM Model Loader
 Handles loading and inference with Phi-3 models (GGUF/ONNX)
 """
+import os
 import logging
-from typing import Optional, Dict, Any
+import hashlib
+from functools import lru_cache
+from typing import Optional, Dict, Any, Callable, ClassVar, Iterator, Tuple
 from pathlib import Path
+import numpy as np
+from app.llm.semantic_cache import SemanticCache
+
+try:
+    from xxhash import xxh3_64_hexdigest as _context_digest
+except ImportError:
+    def _context_digest(data: bytes) -> str:
+        return hashlib.md5(data).hexdigest()
 
 logger = logging.getLogger(__name__)
 
 
+# Chat prompt prefix per message role
+_ROLE_PREFIX = {
+    'system': 'System: ',
+    'user': 'User: ',
+    'assistant': 'Assistant: '
+}
+
+# llama-cpp options that may be overridden via LLMService config
+LLAMA_OPTION_KEYS = (
+    'n_batch', 'n_threads', 'n_threads_batch', 'n_gpu_layers', 'use_mmap', 'use_mlock'
+)
+
+
+def _available_cpus() -> int:
+    """CPUs this process may run on (affinity-aware on Linux)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 4
+
+
+def _default_llama_options() -> Dict[str, Any]:
+    """
+    Default llama-cpp load options for this host
+    
+    Returns:
+        Options dict: one thread left free for the server during generation,
+        all CPUs for prompt processing, mmap'd weights shared via page cache
+    """
+    cpus = _available_cpus()
+    return {
+        'n_batch': int(os.getenv('LLAMA_N_BATCH', '512')),
+        'n_threads': max(1, cpus - 1),
+        'n_threads_batch': cpus,
+        'n_gpu_layers': int(os.getenv('LLAMA_GPU_LAYERS', '0')),
+        'use_mmap': True,
+        'use_mlock': False
+    }
+
+
+@lru_cache(maxsize=4)
+def _load_backend(model_path: str, context_length: int,
+                  options: Tuple[Tuple[str, Any], ...] = ()) -> Tuple[Any, Any]:
+    """
+    Load a model file once per process
+    
+    Loaded handles are shared by every Phi3Model with the same path, context
+    length and load options. Failures raise, so they are never cached.
+    
+    Args:
+        model_path: Path to model file (.gguf or .onnx)
+        context_length: Maximum context length
+        options: Backend load options as sorted (key, value) pairs
+    
+    Returns:
+        Tuple of (model, tokenizer); tokenizer is None for GGUF
+    """
+    path = Path(model_path)
+    if not path.exists():
+        raise FileNotFoundError(model_path)
+    
+    extension = path.suffix.lower()
+    loader = Phi3Model._LOADERS.get(extension)
+    if loader is None:
+        raise ValueError(f"Unsupported model format: {extension}")
+    
+    return getattr(Phi3Model, loader)(path, context_length, dict(options))
+
+
 class Phi3Model:
     """
     Phi-3 Model wrapper for GGUF/ONNX formats
     CPU-optimized inference
     """
     
+    # Model file extension -> loader method name
+    _LOADERS: ClassVar[Dict[str, str]] = {
+        '.gguf': '_load_gguf_model',
+        '.onnx': '_load_onnx_model'
+    }
+    
     def __init__(self, model_path: str, max_tokens: int = 2048, 
-                 temperature: float = 0.7, context_length: int = 4096):
+                 temperature: float = 0.7, context_length: int = 4096,
+                 llama_options: Optional[Dict[str, Any]] = None):
         """
         Initialize Phi-3 model
         
@@ -25,11 +111,13 @@ class Phi3Model:
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
             context_length: Maximum context length
+            llama_options: Overrides for _default_llama_options() (GGUF only)
         """
         self.model_path = Path(model_path)
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.context_length = context_length
+        self.llama_options = {**_default_llama_options(), **(llama_options or {})}
         self.model = None
         self.tokenizer = None
         
@@ -38,75 +126,71 @@ class Phi3Model:
     def _load_model(self):
         """Load the model based on file extension"""
         try:
-            if not self.model_path.exists():
-                logger.warning(f"Model file not found: {self.model_path}")
-                logger.info("Running in mock mode for development")
-                self.model = None
-                return
-            
-            extension = self.model_path.suffix.lower()
-            
-            if extension == '.gguf':
-                self._load_gguf_model()
-            elif extension == '.onnx':
-                self._load_onnx_model()
-            else:
-                logger.warning(f"Unsupported model format: {extension}")
-                self.model = None
-            
+            self.model, self.tokenizer = _load_backend(
+                str(self.model_path),
+                self.context_length,
+                tuple(sorted(self.llama_options.items()))
+            )
+        except FileNotFoundError:
+            logger.warning(f"Model file not found: {self.model_path}")
+            logger.info("Running in mock mode for development")
+            self.model = None
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             self.model = None
     
-    def _load_gguf_model(self):
+    @staticmethod
+    def _load_gguf_model(model_path: Path, context_length: int,
+                         options: Dict[str, Any]) -> Tuple[Any, None]:
         """Load GGUF model using llama-cpp-python"""
         try:
             from llama_cpp import Llama
-            
-            logger.info(f"Loading GGUF model from {self.model_path}")
-            
-            self.model = Llama(
-                model_path=str(self.model_path),
-                n_ctx=self.context_length,
-                n_batch=512,
-                n_threads=4,  # CPU threads
-                verbose=False
-            )
-            
-            logger.info("GGUF model loaded successfully")
-            
-        except ImportError:
-            logger.error("llama-cpp-python not installed. Install with: pip install llama-cpp-python")
-            self.model = None
-        except Exception as e:
-            logger.error(f"Error loading GGUF model: {e}")
-            self.model = None
+        except ImportError as e:
+            raise ImportError(
+                "llama-cpp-python not installed. Install with: pip install llama-cpp-python"
+            ) from e
+        
+        logger.info(
+            f"Loading GGUF model from {model_path} "
+            f"(threads={options['n_threads']}/{options['n_threads_batch']}, "
+            f"gpu_layers={options['n_gpu_layers']})"
+        )
+        
+        model = Llama(
+            model_path=str(model_path),
+            n_ctx=context_length,
+            verbose=False,
+            **options
+        )
+        
+        logger.info("GGUF model loaded successfully")
+        return model, None
     
-    def _load_onnx_model(self):
+    @staticmethod
+    def _load_onnx_model(model_path: Path, context_length: int,
+                         options: Dict[str, Any]) -> Tuple[Any, Any]:
         """Load ONNX model using onnxruntime"""
         try:
             import onnxruntime as ort
             from transformers import AutoTokenizer
-            
-            logger.info(f"Loading ONNX model from {self.model_path}")
-            
-            # Initialize ONNX runtime session
-            self.model = ort.InferenceSession(
-                str(self.model_path),
-                providers=['CPUExecutionProvider']
-            )
-            
-            # Load tokenizer
-            self.tokenizer = AutoTokenizer.from_pretrained("microsoft/Phi-3-mini-4k-instruct")
-            
-            logger.info("ONNX model loaded successfully")
-            
-        except ImportError:
-            logger.error("Required packages not installed. Install with: pip install onnxruntime transformers")
-            self.model = None
-        except Exception as e:
-            logger.error(f"Error loading ONNX model: {e}")
-            self.model = None
+        except ImportError as e:
+            raise ImportError(
+                "Required packages not installed. Install with: pip install onnxruntime transformers"
+            ) from e
+        
+        logger.info(f"Loading ONNX model from {model_path}")
+        
+        # Initialize ONNX runtime session
+        model = ort.InferenceSession(
+            str(model_path),
+            providers=['CPUExecutionProvider']
+        )
+        
+        # Load tokenizer
+        tokenizer = AutoTokenizer.from_pretrained("microsoft/Phi-3-mini-4k-instruct")
+        
+        logger.info("ONNX model loaded successfully")
+        return model, tokenizer
     
     def generate(self, prompt: str, max_tokens: Optional[int] = None,
                 temperature: Optional[float] = None, **kwargs) -> str:
@@ -148,6 +232,51 @@ class Phi3Model:
             logger.error(f"Error generating text: {e}")
             return ""
     
+    def stream(self, prompt: str, max_tokens: Optional[int] = None,
+               temperature: Optional[float] = None, **kwargs) -> Iterator[str]:
+        """
+        Generate text from prompt, yielding tokens as they are produced
+        
+        Args:
+            prompt: Input prompt
+            max_tokens: Maximum tokens to generate (overrides default)
+            temperature: Sampling temperature (overrides default)
+            **kwargs: Additional generation parameters
+        
+        Yields:
+            Text fragments; ONNX models yield the whole completion at once
+        
+        Raises:
+            Exception: A generation failure, re-raised so callers can tell a
+                truncated stream from a finished one
+        """
+        if not self.model:
+            # Mock response for development, word by word
+            for word in self._mock_generate(prompt).split():
+                yield word + ' '
+            return
+        
+        if not callable(self.model):
+            yield self.generate(prompt, max_tokens, temperature, **kwargs)
+            return
+        
+        try:
+            chunks = self.model(
+                prompt,
+                max_tokens=max_tokens or self.max_tokens,
+                temperature=temperature or self.temperature,
+                stop=["</s>", "\n\n\n"],
+                stream=True,
+                **kwargs
+            )
+            for chunk in chunks:
+                text = chunk['choices'][0]['text']
+                if text:
+                    yield text
+        except Exception as e:
+            logger.error(f"Error streaming text: {e}")
+            raise
+    
     def _generate_onnx(self, prompt: str, max_tokens: int, temperature: float) -> str:
         """Generate text using ONNX model"""
         try:
@@ -197,19 +326,12 @@ class Phi3Model:
     
     def _format_chat_prompt(self, messages: list) -> str:
         """Format chat messages into prompt"""
-        formatted = []
-        
-        for msg in messages:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            
-            if role == 'system':
-                formatted.append(f"System: {content}")
-            elif role == 'user':
-                formatted.append(f"User: {content}")
-            elif role == 'assistant':
-                formatted.append(f"Assistant: {content}")
-        
+        # Messages with unknown roles are skipped
+        formatted = [
+            f"{_ROLE_PREFIX[role]}{msg.get('content', '')}"
+            for msg in messages
+            if (role := msg.get('role', 'user')) in _ROLE_PREFIX
+        ]
         formatted.append("Assistant:")
         return "\n\n".join(formatted)
     
@@ -224,13 +346,16 @@ class LLMService:
     Manages model lifecycle and provides convenient methods
     """
     
-    def __init__(self, model_path: str, config: Optional[Dict[str, Any]] = None):
+    def __init__(self, model_path: str, config: Optional[Dict[str, Any]] = None,
+                 embedder: Optional[Callable[[str], np.ndarray]] = None):
         """
         Initialize LLM service
         
         Args:
             model_path: Path to model file
-            config: Optional configuration
+            config: Optional configuration (generation settings plus any
+                llama-cpp option from LLAMA_OPTION_KEYS)
+            embedder: Text embedding callable; enables the semantic response cache
         """
         config = config or {}
         
@@ -238,19 +363,128 @@ class LLMService:
             model_path=model_path,
             max_tokens=config.get('max_tokens', 2048),
             temperature=config.get('temperature', 0.7),
-            context_length=config.get('context_length', 4096)
+            context_length=config.get('context_length', 4096),
+            llama_options={k: config[k] for k in LLAMA_OPTION_KEYS if k in config}
         )
         
+        # Semantic response cache (only with an embedder)
+        self._cache = None
+        self._cache_path = config.get('semantic_cache_path')
+        self._cache_persist_every = config.get('semantic_cache_persist_every', 100)
+        self._cache_inserts = 0
+        
+        if embedder is not None:
+            self._cache = SemanticCache(
+                embedder,
+                tau=config.get('semantic_cache_threshold', 0.87),
+                max_size=config.get('semantic_cache_size', 10_000),
+                ttl=config.get('semantic_cache_ttl', 3600)
+            )
+            if self._cache_path:
+                self._cache.load(self._cache_path)
+        
         logger.info("LLM Service initialized")
     
-    def generate(self, prompt: str, **kwargs) -> str:
-        """Generate text from prompt"""
-        return self.model.generate(prompt, **kwargs)
+    @staticmethod
+    def _cache_key(prompt: str, query: Optional[str], context: Optional[str],
+                   kwargs: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Semantic cache (key text, namespace) for a generation request
+        
+        Long prompts embed by their first tokens only, so a context-first RAG
+        prompt would match any question about the same document. With a
+        query, lookups match on the query alone and the namespace pins the
+        exact context; without one, the namespace pins the whole prompt, so
+        only identical prompts share a response. Different generation
+        parameters never share responses.
+        """
+        if query is None:
+            query, context = prompt, prompt
+        digest = _context_digest((context or '').encode())
+        return query, f"{digest}:{sorted(kwargs.items())!r}"
+    
+    def generate(self, prompt: str, query: Optional[str] = None,
+                 context: Optional[str] = None, **kwargs) -> str:
+        """
+        Generate text from prompt, reusing responses to equivalent requests
+        
+        Args:
+            prompt: Full prompt
+            query: The question or user turn within prompt (semantic cache key)
+            context: The rest of the prompt's variable input (e.g. retrieved
+                context); responses are only shared for identical context
+            **kwargs: Generation parameters
+        
+        Returns:
+            Generated text
+        """
+        if self._cache is None or not self.model.is_loaded():
+            return self.model.generate(prompt, **kwargs)
+        
+        key, namespace = self._cache_key(prompt, query, context, kwargs)
+        
+        cached = self._cache.lookup(key, namespace)
+        if cached is not None:
+            return cached
+        
+        response = self.model.generate(prompt, **kwargs)
+        if response:
+            self._cache.insert(key, response, namespace)
+            self._maybe_persist_cache()
+        
+        return response
+    
+    def stream(self, prompt: str, query: Optional[str] = None,
+               context: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """
+        Stream generated tokens; a cached response is yielded whole (see generate)
+        
+        Only a stream that finishes without error is cached; generation
+        errors propagate to the caller.
+        """
+        if self._cache is None or not self.model.is_loaded():
+            yield from self.model.stream(prompt, **kwargs)
+            return
+        
+        key, namespace = self._cache_key(prompt, query, context, kwargs)
+        
+        cached = self._cache.lookup(key, namespace)
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        for token in self.model.stream(prompt, **kwargs):
+            parts.append(token)
+            yield token
+        
+        response = ''.join(parts).strip()
+        if response:
+            self._cache.insert(key, response, namespace)
+            self._maybe_persist_cache()
+    
+    def _maybe_persist_cache(self):
+        """Save the semantic cache every semantic_cache_persist_every inserts"""
+        if not self._cache_path:
+            return
+        
+        self._cache_inserts += 1
+        if self._cache_inserts % self._cache_persist_every == 0:
+            try:
+                self._cache.save(self._cache_path)
+            except OSError as e:
+                logger.warning(f"Could not persist semantic cache: {e}")
     
     def chat(self, messages: list, **kwargs) -> str:
         """Chat-style generation"""
-        return self.model.chat(messages, **kwargs)
+        return self.generate(self.model._format_chat_prompt(messages), **kwargs)
     
     def is_available(self) -> bool:
         """Check if LLM is available"""
         return self.model.is_loaded()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get semantic cache statistics"""
+        if self._cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self._cache.get_stats()}
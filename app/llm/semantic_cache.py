@@ -0,0 +1,341 @@
+"""
+Semantic Response Cache
+Reuses LLM responses for prompts that embed close to a previous prompt
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Responses are persisted as one orjson array, so any JSON-serializable
+# response (text, lists of retrieved chunks, dicts) round-trips
+RESPONSE_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _npz_path(path: str) -> Path:
+    """Path np.savez writes to: .npz is appended unless already present"""
+    path = Path(path)
+    return path if path.suffix == '.npz' else path.with_name(path.name + '.npz')
+
+
+class SemanticCache:
+    """
+    In-memory semantic cache of (prompt embedding, response) pairs
+    
+    Lookups are an exact cosine scan over a contiguous float32 matrix of
+    normalized embeddings; the least recently used entry is evicted once
+    max_size is reached. Entries are partitioned by a namespace (e.g. the
+    generation parameters) so different settings never share responses.
+    With a ttl, entries older than ttl seconds no longer match.
+    """
+    
+    def __init__(self, embedder: Callable[[str], np.ndarray], tau: float = 0.87,
+                 max_size: int = 10_000, ttl: Optional[float] = None):
+        """
+        Initialize semantic cache
+        
+        Args:
+            embedder: Callable mapping text to a 1-D embedding vector
+            tau: Minimum cosine similarity for a hit
+            max_size: Maximum number of cached responses
+            ttl: Optional entry lifetime in seconds
+        """
+        self.embedder = embedder
+        self.tau = tau
+        self.max_size = max_size
+        self.ttl = ttl
+        
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # (capacity, dim), rows unit-norm
+        self._namespaces = np.empty(0, dtype=np.int32)
+        self._last_used = np.empty(0, dtype=np.int64)
+        self._inserted_at = np.empty(0, dtype=np.float64)
+        self._responses: list = []
+        self._prompts: list = []
+        self._exact: Dict[Tuple[int, str], int] = {}
+        self._namespace_ids: Dict[str, int] = {}
+        self._size = 0
+        self._clock = 0
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def _embed(self, text: str, vector: Optional[np.ndarray] = None) -> np.ndarray:
+        """Embed (unless a vector is given) and L2-normalize text"""
+        if vector is None:
+            vector = self.embedder(text)
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def _namespace_id(self, namespace: str) -> int:
+        return self._namespace_ids.setdefault(namespace, len(self._namespace_ids))
+    
+    def _touch(self, slot: int):
+        self._clock += 1
+        self._last_used[slot] = self._clock
+    
+    def lookup(self, prompt: str, namespace: str = '',
+               vector: Optional[np.ndarray] = None) -> Optional[Any]:
+        """
+        Find a cached response for a semantically equivalent prompt
+        
+        Args:
+            prompt: Incoming prompt
+            namespace: Partition key (e.g. serialized generation parameters)
+            vector: Precomputed prompt embedding (skips the embedder)
+        
+        Returns:
+            Cached response, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            # Unknown namespace: nothing can match (and no ID is allocated)
+            ns = self._namespace_ids.get(namespace)
+            if ns is None or self._size == 0:
+                self.misses += 1
+                return None
+            
+            # Exact repeat: skip the embedding entirely
+            slot = self._exact.get((ns, prompt))
+            if slot is not None and not self._expired(slot, now):
+                self._touch(slot)
+                self.hits += 1
+                return self._responses[slot]
+        
+        query = self._embed(prompt, vector)
+        
+        with self._lock:
+            n = self._size
+            if n == 0 or query.shape[0] != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+            
+            scores = self._vectors[:n] @ query
+            scores[self._namespaces[:n] != ns] = -1.0
+            if self.ttl is not None:
+                scores[self._inserted_at[:n] < now - self.ttl] = -1.0
+            slot = int(np.argmax(scores))
+            
+            if scores[slot] < self.tau:
+                self.misses += 1
+                return None
+            
+            self._touch(slot)
+            self.hits += 1
+            return self._responses[slot]
+    
+    def _expired(self, slot: int, now: float) -> bool:
+        return self.ttl is not None and self._inserted_at[slot] < now - self.ttl
+    
+    def insert(self, prompt: str, response: Any, namespace: str = '',
+               vector: Optional[np.ndarray] = None):
+        """
+        Cache a response
+        
+        Args:
+            prompt: Prompt that produced the response
+            response: Generated response
+            namespace: Partition key (e.g. serialized generation parameters)
+            vector: Precomputed prompt embedding (skips the embedder)
+        """
+        vector = self._embed(prompt, vector)
+        
+        with self._lock:
+            ns = self._namespace_id(namespace)
+            slot = self._exact.get((ns, prompt))
+            if slot is not None:
+                if self._expired(slot, time.monotonic()):
+                    # Refresh an expired entry in place
+                    self._responses[slot] = response
+                    self._vectors[slot] = vector
+                    self._inserted_at[slot] = time.monotonic()
+                    self._touch(slot)
+                return
+            
+            slot = self._allocate_slot(vector.shape[0])
+            if slot < len(self._responses):
+                # Reusing an evicted slot
+                old_key = (int(self._namespaces[slot]), self._prompts[slot])
+                self._exact.pop(old_key, None)
+                self._prompts[slot] = prompt
+                self._responses[slot] = response
+            else:
+                self._prompts.append(prompt)
+                self._responses.append(response)
+            
+            self._vectors[slot] = vector
+            self._namespaces[slot] = ns
+            self._inserted_at[slot] = time.monotonic()
+            self._exact[(ns, prompt)] = slot
+            self._touch(slot)
+    
+    def _allocate_slot(self, dim: int) -> int:
+        """Return a free row index, growing storage or evicting the LRU entry"""
+        if self._vectors is None:
+            self._resize(min(self.max_size, 256), dim)
+        
+        if self._size < self._vectors.shape[0]:
+            self._size += 1
+            return self._size - 1
+        
+        if self._size < self.max_size:
+            self._resize(min(self.max_size, self._size * 2), dim)
+            self._size += 1
+            return self._size - 1
+        
+        return int(np.argmin(self._last_used[:self._size]))
+    
+    def _resize(self, capacity: int, dim: int):
+        """Grow the backing arrays to capacity rows"""
+        vectors = np.zeros((capacity, dim), dtype=np.float32)
+        namespaces = np.zeros(capacity, dtype=np.int32)
+        last_used = np.zeros(capacity, dtype=np.int64)
+        inserted_at = np.zeros(capacity, dtype=np.float64)
+        
+        if self._vectors is not None:
+            vectors[:self._size] = self._vectors[:self._size]
+            namespaces[:self._size] = self._namespaces[:self._size]
+            last_used[:self._size] = self._last_used[:self._size]
+            inserted_at[:self._size] = self._inserted_at[:self._size]
+        
+        self._vectors = vectors
+        self._namespaces = namespaces
+        self._last_used = last_used
+        self._inserted_at = inserted_at
+    
+    def clear(self, predicate: Optional[Callable[[str], bool]] = None) -> int:
+        """
+        Drop cached entries by namespace
+        
+        Args:
+            predicate: Called with each namespace; entries in namespaces it
+                accepts are dropped (all entries when omitted)
+        
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            n = self._size
+            dropped_ids = [
+                ns for name, ns in self._namespace_ids.items()
+                if predicate is None or predicate(name)
+            ]
+            if n == 0 or not dropped_ids:
+                return 0
+            
+            keep = ~np.isin(self._namespaces[:n], dropped_ids)
+            kept = int(keep.sum())
+            if kept == n:
+                return 0
+            
+            # Compact the survivors to the front, preserving their LRU order
+            # (namespace IDs stay allocated, so surviving IDs remain valid)
+            self._vectors[:kept] = self._vectors[:n][keep]
+            self._namespaces[:kept] = self._namespaces[:n][keep]
+            self._last_used[:kept] = self._last_used[:n][keep]
+            self._inserted_at[:kept] = self._inserted_at[:n][keep]
+            slots = np.flatnonzero(keep)
+            self._prompts = [self._prompts[i] for i in slots]
+            self._responses = [self._responses[i] for i in slots]
+            self._exact = {
+                (int(self._namespaces[slot]), prompt): slot
+                for slot, prompt in enumerate(self._prompts)
+            }
+            self._size = kept
+            return n - kept
+    
+    def save(self, path: str):
+        """
+        Persist cache entries to disk
+        
+        Args:
+            path: Target .npz file (the suffix is added if missing)
+        
+        Raises:
+            TypeError: If a response is not JSON-serializable
+        """
+        with self._lock:
+            if self._size == 0:
+                return
+            
+            n = self._size
+            names = sorted(self._namespace_ids, key=self._namespace_ids.get)
+            responses = orjson.dumps(self._responses[:n], option=RESPONSE_JSON_OPTIONS)
+            np.savez(
+                _npz_path(path),
+                vectors=self._vectors[:n],
+                namespaces=np.array(names, dtype=str)[self._namespaces[:n]],
+                last_used=self._last_used[:n],
+                prompts=np.array(self._prompts[:n], dtype=str),
+                responses=np.frombuffer(responses, dtype=np.uint8)
+            )
+    
+    def load(self, path: str) -> int:
+        """
+        Load cache entries saved with save()
+        
+        Args:
+            path: Source .npz file (the suffix is added if missing)
+        
+        Returns:
+            Number of entries loaded
+        """
+        path = _npz_path(path)
+        if not path.exists():
+            return 0
+        
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                vectors = data['vectors']
+                namespaces = data['namespaces'].tolist()
+                prompts = data['prompts'].tolist()
+                responses = orjson.loads(data['responses'].tobytes())
+                order = np.argsort(data['last_used'])
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Could not load semantic cache from {path}: {e}")
+            return 0
+        
+        # Oldest first, keeping the most recent max_size entries; their
+        # lifetime restarts at load time
+        order = order[-self.max_size:]
+        loaded_at = time.monotonic()
+        with self._lock:
+            self._vectors = None
+            self._size = 0
+            self._clock = 0
+            self._prompts, self._responses = [], []
+            self._exact.clear()
+            self._namespace_ids.clear()
+            
+            for i in order:
+                slot = self._allocate_slot(vectors.shape[1])
+                ns = self._namespace_id(namespaces[i])
+                self._vectors[slot] = vectors[i]
+                self._namespaces[slot] = ns
+                self._inserted_at[slot] = loaded_at
+                self._prompts.append(prompts[i])
+                self._responses.append(responses[i])
+                self._exact[(ns, prompts[i])] = slot
+                self._touch(slot)
+        
+        logger.info(f"Loaded {len(order)} semantic cache entries from {path}")
+        return len(order)
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        return {
+            'size': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
@@ -2,12 +2,62 @@
 Authentication Middleware
 API Key validation for secure endpoints
 """
+import hmac
 import logging
 from functools import wraps
-from flask import request, jsonify, current_app
+from typing import Optional
+import orjson
+from flask import request, current_app
 
 logger = logging.getLogger(__name__)
 
+# Static error bodies, serialized once
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_ERR_KEY_REQUIRED = orjson.dumps({
+    'error': 'API key required',
+    'status': 'error',
+    'message': 'Please provide an API key in X-API-Key header'
+})
+_ERR_KEY_INVALID = orjson.dumps({
+    'error': 'Invalid API key',
+    'status': 'error'
+})
+
+# Auth settings resolved once from app config (see init_auth)
+_initialized = False
+_TESTING = False
+_AUTH_ENABLED = True
+_EXPECTED_KEY: Optional[bytes] = None
+
+
+def init_auth(app):
+    """
+    Resolve API key settings from app config
+    
+    Args:
+        app: Flask application
+    """
+    global _initialized, _TESTING, _AUTH_ENABLED, _EXPECTED_KEY
+    
+    expected_key = app.config.get('API_KEY')
+    _TESTING = bool(app.config.get('TESTING'))
+    _AUTH_ENABLED = bool(app.config.get('REQUIRE_API_KEY', True))
+    _EXPECTED_KEY = expected_key.encode() if expected_key else None
+    _initialized = True
+
+
+def _ensure_auth_config():
+    """Fall back to the current app's config if init_auth was not called"""
+    if not _initialized:
+        init_auth(current_app)
+
+
+def _key_matches(api_key: str) -> bool:
+    """Constant-time API key comparison (bytes, so non-ASCII input cannot raise)"""
+    if _EXPECTED_KEY is None:
+        return False
+    return hmac.compare_digest(api_key.encode(), _EXPECTED_KEY)
+
 
 def require_api_key(f):
     """
@@ -20,12 +70,14 @@ def require_api_key(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        _ensure_auth_config()
+        
         # Skip authentication in testing mode
-        if current_app.config.get('TESTING'):
+        if _TESTING:
             return f(*args, **kwargs)
         
         # Skip if API key not required
-        if not current_app.config.get('REQUIRE_API_KEY', True):
+        if not _AUTH_ENABLED:
             return f(*args, **kwargs)
         
         # Check for API key in headers
@@ -33,24 +85,16 @@ def require_api_key(f):
         
         if not api_key:
             logger.warning(f"API key missing for {request.path}")
-            return jsonify({
-                'error': 'API key required',
-                'status': 'error',
-                'message': 'Please provide an API key in X-API-Key header'
-            }), 401
+            return _ERR_KEY_REQUIRED, 401, _JSON_HEADERS
         
         # Remove 'Bearer ' prefix if present
         if api_key.startswith('Bearer '):
             api_key = api_key[7:]
         
         # Validate API key
-        expected_key = current_app.config.get('API_KEY')
-        if api_key != expected_key:
+        if not _key_matches(api_key):
             logger.warning(f"Invalid API key attempt for {request.path}")
-            return jsonify({
-                'error': 'Invalid API key',
-                'status': 'error'
-            }), 403
+            return _ERR_KEY_INVALID, 403, _JSON_HEADERS
         
         return f(*args, **kwargs)
     
@@ -70,12 +114,9 @@ def optional_api_key(f):
             if api_key.startswith('Bearer '):
                 api_key = api_key[7:]
             
-            expected_key = current_app.config.get('API_KEY')
-            if api_key != expected_key:
-                return jsonify({
-                    'error': 'Invalid API key',
-                    'status': 'error'
-                }), 403
+            _ensure_auth_config()
+            if not _key_matches(api_key):
+                return _ERR_KEY_INVALID, 403, _JSON_HEADERS
         
         return f(*args, **kwargs)
     
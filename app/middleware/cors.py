@@ -0,0 +1,34 @@
+"""
+CORS Middleware
+Static wildcard CORS policy for API routes
+"""
+import logging
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+# Fixed policy: any origin, no credentials
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+    'Access-Control-Allow-Headers': 'Authorization,Content-Type,X-API-Key'
+}
+
+
+def init_cors(app):
+    """
+    Attach CORS headers to /api and /api/* responses
+    
+    Flask answers OPTIONS preflights on existing routes itself; the hook
+    adds the headers to those responses too.
+    """
+    
+    @app.after_request
+    def add_cors_headers(response):
+        """Set static CORS headers on API responses"""
+        path = request.path
+        if path == '/api' or path.startswith('/api/'):
+            response.headers.update(CORS_HEADERS)
+        return response
+    
+    logger.info("CORS initialized")
@@ -3,11 +3,35 @@ Error Handler Middleware
 Centralized error handling for the application
 """
 import logging
-from flask import jsonify
+import orjson
 from werkzeug.exceptions import HTTPException
+from app.utils.json_provider import ORJSON_OPTIONS
 
 logger = logging.getLogger(__name__)
 
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Static error bodies, serialized once
+_ERR_NOT_FOUND = orjson.dumps({
+    'error': 'Resource not found',
+    'status': 'error'
+})
+_ERR_INTERNAL = orjson.dumps({
+    'error': 'Internal server error',
+    'status': 'error',
+    'message': 'An unexpected error occurred'
+})
+_ERR_TOO_LARGE = orjson.dumps({
+    'error': 'File too large',
+    'status': 'error',
+    'message': 'The uploaded file exceeds the maximum allowed size'
+})
+_ERR_UNEXPECTED = orjson.dumps({
+    'error': 'Unexpected error',
+    'status': 'error',
+    'message': 'An error occurred'
+})
+
 
 class APIError(Exception):
     """Custom API error class"""
@@ -30,56 +54,50 @@ def register_error_handlers(app):
     @app.errorhandler(APIError)
     def handle_api_error(error):
         """Handle custom API errors"""
-        response = jsonify(error.to_dict())
-        response.status_code = error.status_code
         logger.error(f"API Error: {error.message} (Status: {error.status_code})")
-        return response
+        body = orjson.dumps(error.to_dict(), option=ORJSON_OPTIONS)
+        return body, error.status_code, _JSON_HEADERS
     
     @app.errorhandler(HTTPException)
     def handle_http_exception(error):
         """Handle HTTP exceptions"""
-        response = jsonify({
+        logger.error(f"HTTP Exception: {error.description} (Status: {error.code})")
+        body = orjson.dumps({
             'error': error.description,
             'status': 'error',
             'code': error.code
         })
-        response.status_code = error.code
-        logger.error(f"HTTP Exception: {error.description} (Status: {error.code})")
-        return response
+        return body, error.code, _JSON_HEADERS
     
     @app.errorhandler(404)
     def handle_not_found(error):
         """Handle 404 errors"""
-        return jsonify({
-            'error': 'Resource not found',
-            'status': 'error'
-        }), 404
+        return _ERR_NOT_FOUND, 404, _JSON_HEADERS
     
     @app.errorhandler(500)
     def handle_internal_error(error):
         """Handle 500 errors"""
         logger.exception("Internal server error")
-        return jsonify({
-            'error': 'Internal server error',
-            'status': 'error',
-            'message': 'An unexpected error occurred'
-        }), 500
+        return _ERR_INTERNAL, 500, _JSON_HEADERS
     
     @app.errorhandler(413)
     def handle_file_too_large(error):
         """Handle file size exceeded errors"""
-        return jsonify({
-            'error': 'File too large',
-            'status': 'error',
-            'message': 'The uploaded file exceeds the maximum allowed size'
-        }), 413
+        return _ERR_TOO_LARGE, 413, _JSON_HEADERS
+    
+    # Error details are only exposed in debug mode
+    debug = app.config.get('DEBUG')
     
     @app.errorhandler(Exception)
     def handle_unexpected_error(error):
         """Handle any unexpected errors"""
         logger.exception("Unexpected error")
-        return jsonify({
+        if not debug:
+            return _ERR_UNEXPECTED, 500, _JSON_HEADERS
+        
+        body = orjson.dumps({
             'error': 'Unexpected error',
             'status': 'error',
-            'message': str(error) if app.config.get('DEBUG') else 'An error occurred'
-        }), 500
+            'message': str(error)
+        })
+        return body, 500, _JSON_HEADERS
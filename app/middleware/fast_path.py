@@ -0,0 +1,41 @@
+"""
+Fast-Path Middleware
+Serve probe endpoints at the WSGI layer, before Flask dispatch
+"""
+import logging
+from typing import Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Handler returns (body, content type)
+FastPathHandler = Callable[[], Tuple[bytes, str]]
+
+
+def init_fast_paths(app, routes: Dict[str, FastPathHandler]):
+    """
+    Short-circuit GET requests for the given paths
+    
+    Matching requests skip URL routing, the request context and
+    before/after_request hooks entirely.
+    
+    Args:
+        app: Flask application
+        routes: Mapping of exact path to handler
+    """
+    wrapped = app.wsgi_app
+    
+    def fast_path_app(environ, start_response):
+        handler = routes.get(environ.get('PATH_INFO'))
+        if handler is None or environ.get('REQUEST_METHOD') != 'GET':
+            return wrapped(environ, start_response)
+        
+        body, content_type = handler()
+        start_response('200 OK', [
+            ('Content-Type', content_type),
+            ('Content-Length', str(len(body))),
+            ('Cache-Control', 'no-cache')
+        ])
+        return [body]
+    
+    app.wsgi_app = fast_path_app
+    logger.info(f"Fast paths installed: {', '.join(routes)}")
@@ -3,12 +3,18 @@ Rate Limiting System
 Per-user rate limiting with Redis backend
 """
 import logging
+import math
+import threading
+import time
+import uuid
 from functools import wraps
 from flask import request, jsonify, current_app
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import redis
-from typing import Optional, Callable
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+from typing import Optional, Callable, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -26,28 +32,111 @@ def get_user_id_for_rate_limit():
     return f"ip:{get_remote_address()}"
 
 
+# One bounded connection pool per process, shared by Flask-Limiter and
+# RateLimitManager; callers wait up to `timeout` for a free connection
+_POOL = redis.BlockingConnectionPool(
+    host='redis',
+    port=6379,
+    db=4,
+    decode_responses=True,
+    max_connections=32,
+    timeout=2
+)
+
 # Initialize Flask-Limiter
 limiter = Limiter(
     key_func=get_user_id_for_rate_limit,
     default_limits=["200 per day", "50 per hour"],
     storage_uri="redis://redis:6379/4",
+    storage_options={'connection_pool': _POOL},
     strategy="fixed-window"
 )
 
 
+# check_rate_limit strategies
+STRATEGY_APPROXIMATE = 'approximate'
+STRATEGY_EXACT = 'exact'
+
+# Approximate sliding window from two fixed-window counters:
+# estimate = previous * (1 - elapsed / window) + current.
+# KEYS = current bucket, previous bucket;
+# ARGV = limit, previous-bucket weight, window (s), ms until current bucket ends.
+# Returns {allowed (1/0), estimated requests in window, ms until reset}.
+APPROX_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local weight = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+local curr = tonumber(redis.call('GET', KEYS[1]) or '0')
+
+if prev * weight + curr < limit then
+    curr = redis.call('INCR', KEYS[1])
+    if curr == 1 then
+        redis.call('EXPIRE', KEYS[1], window * 2)
+    end
+    return {1, math.floor(prev * weight + curr), 0}
+end
+
+return {0, math.floor(prev * weight + curr), tonumber(ARGV[4])}
+"""
+
+# Exact sliding window over a sorted set of request timestamps (ms).
+# KEYS[1] = window key; ARGV = now_ms, window_ms, limit, unique member id.
+# Returns {allowed (1/0), requests in window, ms until the oldest ages out}.
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+
+if count < limit then
+    redis.call('ZADD', key, now, now .. ':' .. ARGV[4])
+    redis.call('PEXPIRE', key, window)
+    return {1, count + 1, 0}
+end
+
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+local reset_ms = window
+if oldest[2] then
+    reset_ms = tonumber(oldest[2]) + window - now
+end
+
+return {0, count, reset_ms}
+"""
+
+
+# Keys per SCAN step / UNLINK call in reset_user_limit
+RESET_SCAN_BATCH = 500
+
+
 class RateLimitManager:
     """Advanced rate limit management"""
     
-    def __init__(self, redis_host='redis', redis_port=6379, redis_db=4):
+    def __init__(self, redis_host='redis', redis_port=6379, redis_db=4,
+                 connection_pool: Optional[redis.ConnectionPool] = None):
         """Initialize rate limit manager"""
-        self.redis_client = redis.Redis(
-            host=redis_host,
-            port=redis_port,
-            db=redis_db,
-            decode_responses=True
-        )
+        if connection_pool is None:
+            connection_pool = redis.BlockingConnectionPool(
+                host=redis_host,
+                port=redis_port,
+                db=redis_db,
+                decode_responses=True,
+                max_connections=32,
+                timeout=2
+            )
+        
+        self.redis_client = redis.Redis(connection_pool=connection_pool)
+        
+        # EVALSHA with automatic EVAL fallback on NOSCRIPT
+        self._approx_window = self.redis_client.register_script(APPROX_WINDOW_LUA)
+        self._sliding_window = self.redis_client.register_script(SLIDING_WINDOW_LUA)
     
-    def check_rate_limit(self, user_id: str, limit: int, window: int) -> bool:
+    def check_rate_limit(self, user_id: str, limit: int, window: int,
+                         strategy: str = STRATEGY_APPROXIMATE) -> bool:
         """
         Check if user has exceeded rate limit
         
@@ -55,41 +144,70 @@ class RateLimitManager:
             user_id: User identifier
             limit: Maximum requests allowed
             window: Time window in seconds
+            strategy: 'approximate' (two counters) or 'exact' (one entry per request)
         
         Returns:
             True if within limit, False if exceeded
         """
+        allowed, _ = self.hit(user_id, limit, window, strategy)
+        return allowed
+    
+    def hit(self, user_id: str, limit: int, window: int,
+            strategy: str = STRATEGY_APPROXIMATE) -> Tuple[bool, Optional[dict]]:
+        """
+        Record a request and check it against the limit
+        
+        Args:
+            user_id: User identifier
+            limit: Maximum requests allowed
+            window: Time window in seconds
+            strategy: 'approximate' (two counters) or 'exact' (one entry per request)
+        
+        Returns:
+            Tuple of (allowed, usage); usage is filled in when denied so the
+            caller needs no extra get_usage round-trip
+        """
         key = f"rate_limit:{user_id}:{window}"
         
         try:
-            current = self.redis_client.get(key)
+            now = time.time()
             
-            if current is None:
-                # First request in window
-                self.redis_client.setex(key, window, 1)
-                return True
+            # Check and record in one atomic round-trip
+            if strategy == STRATEGY_EXACT:
+                allowed, count, reset_ms = self._sliding_window(
+                    keys=[key],
+                    args=[int(now * 1000), window * 1000, limit, uuid.uuid4().hex]
+                )
+            else:
+                bucket, elapsed = divmod(now, window)
+                allowed, count, reset_ms = self._approx_window(
+                    keys=[f"{key}:{int(bucket)}", f"{key}:{int(bucket) - 1}"],
+                    args=[limit, 1.0 - elapsed / window, window,
+                          int((window - elapsed) * 1000)]
+                )
             
-            current = int(current)
+            if allowed:
+                return True, None
             
-            if current >= limit:
-                return False
-            
-            # Increment counter
-            self.redis_client.incr(key)
-            return True
+            return False, {
+                'requests': count,
+                'reset_in': max(1, math.ceil(reset_ms / 1000))
+            }
             
         except Exception as e:
             logger.error(f"Rate limit check error: {e}")
             # Fail open - allow request on error
-            return True
+            return True, None
     
-    def get_usage(self, user_id: str, window: int) -> dict:
+    def get_usage(self, user_id: str, window: int,
+                  strategy: str = STRATEGY_APPROXIMATE) -> dict:
         """
         Get current usage for user
         
         Args:
             user_id: User identifier
             window: Time window in seconds
+            strategy: Strategy the limit is enforced with
         
         Returns:
             Usage statistics
@@ -97,12 +215,39 @@ class RateLimitManager:
         key = f"rate_limit:{user_id}:{window}"
         
         try:
-            current = self.redis_client.get(key)
-            ttl = self.redis_client.ttl(key)
+            now = time.time()
+            
+            if strategy != STRATEGY_EXACT:
+                bucket, elapsed = divmod(now, window)
+                curr, prev = self.redis_client.mget(
+                    f"{key}:{int(bucket)}", f"{key}:{int(bucket) - 1}"
+                )
+                estimate = int(prev or 0) * (1.0 - elapsed / window) + int(curr or 0)
+                return {
+                    'requests': int(estimate),
+                    'reset_in': max(1, math.ceil(window - elapsed))
+                }
+            
+            now_ms = int(now * 1000)
+            window_ms = window * 1000
+            window_start = now_ms - window_ms + 1
+            
+            # Both reads in one round-trip
+            with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.zcount(key, window_start, '+inf')
+                pipe.zrangebyscore(
+                    key, window_start, '+inf', start=0, num=1, withscores=True
+                )
+                current, oldest = pipe.execute()
+            
+            # A slot frees up when the oldest request in the window ages out
+            reset_in = window
+            if oldest:
+                reset_in = max(1, math.ceil((oldest[0][1] + window_ms - now_ms) / 1000))
             
             return {
-                'requests': int(current) if current else 0,
-                'reset_in': ttl if ttl > 0 else window
+                'requests': current,
+                'reset_in': reset_in
             }
         except Exception as e:
             logger.error(f"Get usage error: {e}")
@@ -113,19 +258,28 @@ class RateLimitManager:
         pattern = f"rate_limit:{user_id}:*"
         
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                self.redis_client.delete(*keys)
+            # Incremental SCAN instead of a blocking KEYS; UNLINK frees memory
+            # off the main Redis thread
+            batch = []
+            for key in self.redis_client.scan_iter(match=pattern, count=RESET_SCAN_BATCH):
+                batch.append(key)
+                if len(batch) >= RESET_SCAN_BATCH:
+                    self.redis_client.unlink(*batch)
+                    batch.clear()
+            
+            if batch:
+                self.redis_client.unlink(*batch)
             logger.info(f"Reset rate limit for user: {user_id}")
         except Exception as e:
             logger.error(f"Reset limit error: {e}")
 
 
 # Global rate limit manager
-rate_manager = RateLimitManager()
+rate_manager = RateLimitManager(connection_pool=_POOL)
 
 
-def custom_rate_limit(limit: int, per: int, scope: Optional[str] = None):
+def custom_rate_limit(limit: int, per: int, scope: Optional[str] = None,
+                      strategy: str = STRATEGY_APPROXIMATE):
     """
     Custom rate limit decorator
     
@@ -133,6 +287,7 @@ def custom_rate_limit(limit: int, per: int, scope: Optional[str] = None):
         limit: Number of requests allowed
         per: Time period in seconds
         scope: Optional scope for the limit
+        strategy: 'approximate' (default) or 'exact' for strict limits
     
     Usage:
         @custom_rate_limit(limit=10, per=60)
@@ -148,11 +303,9 @@ def custom_rate_limit(limit: int, per: int, scope: Optional[str] = None):
             if scope:
                 user_id = f"{user_id}:{scope}"
             
-            # Check rate limit
-            if not rate_manager.check_rate_limit(user_id, limit, per):
-                # Get usage info
-                usage = rate_manager.get_usage(user_id, per)
-                
+            # Check rate limit; usage comes back with the denial
+            allowed, usage = rate_manager.hit(user_id, limit, per, strategy)
+            if not allowed:
                 return jsonify({
                     'error': 'Rate limit exceeded',
                     'status': 'error',
@@ -169,7 +322,8 @@ def custom_rate_limit(limit: int, per: int, scope: Optional[str] = None):
     return decorator
 
 
-def get_rate_limit_headers(user_id: str, limit: int, window: int) -> dict:
+def get_rate_limit_headers(user_id: str, limit: int, window: int,
+                           strategy: str = STRATEGY_APPROXIMATE) -> dict:
     """
     Get rate limit headers for response
     
@@ -177,11 +331,12 @@ def get_rate_limit_headers(user_id: str, limit: int, window: int) -> dict:
         user_id: User identifier
         limit: Request limit
         window: Time window
+        strategy: Strategy the limit is enforced with
     
     Returns:
         Headers dictionary
     """
-    usage = rate_manager.get_usage(user_id, window)
+    usage = rate_manager.get_usage(user_id, window, strategy)
     
     return {
         'X-RateLimit-Limit': str(limit),
@@ -219,6 +374,27 @@ RATE_LIMIT_TIERS = {
 }
 
 
+def _action_window(action: str) -> int:
+    """Time window in seconds implied by an action name"""
+    if action.endswith('per_day'):
+        return 86400
+    return 3600
+
+
+# (tier, action) -> (limit, window), resolved once at import
+_TIER_ACTION = {
+    (tier, action): (limit, _action_window(action))
+    for tier, limits in RATE_LIMIT_TIERS.items()
+    for action, limit in limits.items()
+}
+
+
+# User tier lookups, cached in-process (tiers change rarely)
+_tier_cache = TTLCache(maxsize=8192, ttl=60)
+_tier_lock = threading.Lock()
+
+
+@cached(_tier_cache, lock=_tier_lock)
 def get_user_tier(user_id: str) -> str:
     """Get user tier (would query from database)"""
     # Mock implementation
@@ -227,6 +403,12 @@ def get_user_tier(user_id: str) -> str:
     return 'free'
 
 
+def invalidate_user_tier(user_id: str):
+    """Drop a cached tier, e.g. after the user upgrades"""
+    with _tier_lock:
+        _tier_cache.pop(hashkey(user_id), None)
+
+
 def check_tier_limit(user_id: str, action: str) -> bool:
     """
     Check if user can perform action based on tier
@@ -239,22 +421,15 @@ def check_tier_limit(user_id: str, action: str) -> bool:
         True if allowed, False otherwise
     """
     tier = get_user_tier(user_id)
-    limits = RATE_LIMIT_TIERS.get(tier, RATE_LIMIT_TIERS['free'])
+    if tier not in RATE_LIMIT_TIERS:
+        tier = 'free'
     
-    limit = limits.get(action, 0)
+    limit, window = _TIER_ACTION.get((tier, action)) or (0, _action_window(action))
     
-    # -1 means unlimited
+    # -1 means unlimited; no Redis round-trip
     if limit == -1:
         return True
     
-    # Extract time window from action name
-    if 'per_hour' in action:
-        window = 3600
-    elif 'per_day' in action:
-        window = 86400
-    else:
-        window = 3600
-    
     return rate_manager.check_rate_limit(
         f"{user_id}:{action}",
         limit,
@@ -2,15 +2,26 @@
 Model Versioning System
 Manage multiple versions of AI models
 """
+import os
+import sys
+import gc
+import atexit
 import logging
 import json
+import threading
+import msgpack
+import numpy as np
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, ClassVar, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Saves requested within this window are coalesced into one write
+SAVE_DEBOUNCE_SECONDS = 0.5
+
 
 @dataclass
 class ModelVersion:
@@ -24,50 +35,126 @@ class ModelVersion:
     is_active: bool = False
     description: str = ""
     tags: List[str] = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ModelVersion':
+        """Build from a decoded registry entry, copying its mutable fields"""
+        tags = data.get('tags')
+        return cls(**{
+            **data,
+            'metrics': dict(data['metrics']),
+            'tags': list(tags) if tags is not None else None
+        })
 
 
 class ModelRegistry:
     """Central registry for model versions"""
     
-    def __init__(self, registry_path: str = 'models/registry.json'):
+    # Decoded registry per file path, tagged with (mtime_ns, size) at decode
+    _PARSE_CACHE: ClassVar[Dict[str, Tuple[Tuple[int, int], Dict[str, List[dict]]]]] = {}
+    
+    def __init__(self, registry_path: str = 'models/registry.msgpack'):
         """
         Initialize model registry
         
         Args:
-            registry_path: Path to registry file
+            registry_path: Path to registry file (msgpack)
         """
         self.registry_path = Path(registry_path)
-        self.models = {}
+        
+        # model_id -> version -> ModelVersion (insertion order = registration order)
+        self.models: Dict[str, Dict[str, ModelVersion]] = {}
+        # model_id -> active version
+        self._active: Dict[str, str] = {}
+        
+        # Guards self.models against the debounced save thread
+        self._lock = threading.RLock()
+        self._save_timer: Optional[threading.Timer] = None
+        
         self._load_registry()
+        atexit.register(self.flush)
     
     def _load_registry(self):
         """Load registry from disk"""
-        if self.registry_path.exists():
+        path = self.registry_path
+        legacy_json = path.with_suffix('.json')
+        
+        if not path.exists() and legacy_json.exists():
+            # One-time migration from the former JSON registry
+            path = legacy_json
+        
+        if path.exists():
             try:
-                with open(self.registry_path, 'r') as f:
-                    data = json.load(f)
-                    for model_id, versions in data.items():
-                        self.models[model_id] = [
-                            ModelVersion(**v) for v in versions
-                        ]
+                data = self._read_registry_file(path)
+                
+                for model_id, versions in data.items():
+                    self.models[model_id] = {}
+                    for v in versions:
+                        self._index_version(ModelVersion.from_dict(v))
                 logger.info(f"Loaded {len(self.models)} models from registry")
             except Exception as e:
                 logger.error(f"Error loading registry: {e}")
                 self.models = {}
+                self._active = {}
         else:
             logger.info("No existing registry found, starting fresh")
     
+    @classmethod
+    def _read_registry_file(cls, path: Path) -> Dict[str, List[dict]]:
+        """Decode a registry file, reusing the last decode if the file is unchanged"""
+        st = path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        
+        cached = cls._PARSE_CACHE.get(str(path))
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        raw = path.read_bytes()
+        if path.suffix == '.json':
+            data = json.loads(raw)
+        else:
+            data = msgpack.unpackb(raw, raw=False)
+        
+        cls._PARSE_CACHE[str(path)] = (stamp, data)
+        return data
+    
+    def _schedule_save(self):
+        """Request a save; writes within SAVE_DEBOUNCE_SECONDS are coalesced"""
+        with self._lock:
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(SAVE_DEBOUNCE_SECONDS, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+    
+    def flush(self):
+        """Write a pending save now"""
+        with self._lock:
+            if self._save_timer is None:
+                return
+            self._save_timer.cancel()
+            self._save_timer = None
+            self._save_registry()
+    
     def _save_registry(self):
-        """Save registry to disk"""
+        """Save registry to disk (msgpack, atomic replace)"""
         try:
             self.registry_path.parent.mkdir(parents=True, exist_ok=True)
             
-            data = {}
-            for model_id, versions in self.models.items():
-                data[model_id] = [asdict(v) for v in versions]
+            with self._lock:
+                data = {}
+                for model_id, versions in self.models.items():
+                    data[model_id] = [asdict(v) for v in versions.values()]
             
-            with open(self.registry_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Write aside and rename so a crash never leaves a torn file
+            tmp_path = self.registry_path.with_suffix('.tmp')
+            tmp_path.write_bytes(msgpack.packb(data, use_bin_type=True))
+            os.replace(tmp_path, self.registry_path)
+            
+            # What was just written is the decoded form of the new file
+            st = self.registry_path.stat()
+            ModelRegistry._PARSE_CACHE[str(self.registry_path)] = (
+                (st.st_mtime_ns, st.st_size), data
+            )
             
             logger.info("Registry saved successfully")
         except Exception as e:
@@ -83,89 +170,111 @@ class ModelRegistry:
         Returns:
             Success status
         """
-        model_id = model_version.model_id
+        if not self._add_version(model_version):
+            return False
         
-        if model_id not in self.models:
-            self.models[model_id] = []
+        self._schedule_save()
+        return True
+    
+    def register_models(self, model_versions: List[ModelVersion]) -> List[bool]:
+        """
+        Register several model versions with a single save
         
-        # Check if version already exists
-        existing = self.get_version(model_id, model_version.version)
-        if existing:
-            logger.warning(f"Version {model_version.version} already exists for {model_id}")
-            return False
+        Args:
+            model_versions: Model versions to register
         
-        self.models[model_id].append(model_version)
-        self._save_registry()
+        Returns:
+            Success status per version
+        """
+        results = [self._add_version(v) for v in model_versions]
+        
+        if any(results):
+            self._schedule_save()
+        return results
+    
+    def _add_version(self, model_version: ModelVersion) -> bool:
+        """Add a version in memory; returns False if it already exists"""
+        model_id = model_version.model_id
+        
+        with self._lock:
+            # Check if version already exists
+            if model_version.version in self.models.get(model_id, {}):
+                logger.warning(f"Version {model_version.version} already exists for {model_id}")
+                return False
+            
+            self._index_version(model_version)
         
         logger.info(f"Registered {model_id} v{model_version.version}")
         return True
     
+    def _index_version(self, model_version: ModelVersion):
+        """Store a version; the first active version registered stays active"""
+        model_id = model_version.model_id
+        self.models.setdefault(model_id, {})[model_version.version] = model_version
+        
+        if model_version.is_active and model_id not in self._active:
+            self._active[model_id] = model_version.version
+    
     def get_version(self, model_id: str, version: str) -> Optional[ModelVersion]:
         """Get specific model version"""
-        if model_id not in self.models:
-            return None
-        
-        for model in self.models[model_id]:
-            if model.version == version:
-                return model
-        
-        return None
+        return self.models.get(model_id, {}).get(version)
     
     def get_active_version(self, model_id: str) -> Optional[ModelVersion]:
         """Get active version for model"""
-        if model_id not in self.models:
+        versions = self.models.get(model_id)
+        if not versions:
             return None
         
-        for model in self.models[model_id]:
-            if model.is_active:
-                return model
+        active = self._active.get(model_id)
+        if active is not None:
+            return versions[active]
         
         # Return latest if no active set
-        if self.models[model_id]:
-            return self.models[model_id][-1]
-        
-        return None
+        return next(reversed(versions.values()))
     
     def set_active_version(self, model_id: str, version: str) -> bool:
         """Set active version for model"""
-        if model_id not in self.models:
-            return False
-        
-        # Deactivate all versions
-        for model in self.models[model_id]:
-            model.is_active = False
-        
-        # Activate specified version
-        target = self.get_version(model_id, version)
-        if target:
+        with self._lock:
+            target = self.get_version(model_id, version)
+            if not target:
+                return False
+            
+            # Deactivate the previous version, keeping is_active in sync
+            previous = self._active.get(model_id)
+            if previous is not None:
+                self.models[model_id][previous].is_active = False
+            
             target.is_active = True
-            self._save_registry()
-            logger.info(f"Set {model_id} v{version} as active")
-            return True
+            self._active[model_id] = version
         
-        return False
+        self._schedule_save()
+        logger.info(f"Set {model_id} v{version} as active")
+        return True
     
     def list_versions(self, model_id: str) -> List[ModelVersion]:
         """List all versions for model"""
-        return self.models.get(model_id, [])
+        return list(self.models.get(model_id, {}).values())
     
     def list_all_models(self) -> Dict[str, List[ModelVersion]]:
         """List all models and versions"""
-        return self.models
+        return {
+            model_id: list(versions.values())
+            for model_id, versions in self.models.items()
+        }
     
     def delete_version(self, model_id: str, version: str) -> bool:
         """Delete model version"""
-        if model_id not in self.models:
-            return False
-        
-        target = self.get_version(model_id, version)
-        if target:
-            self.models[model_id].remove(target)
-            self._save_registry()
-            logger.info(f"Deleted {model_id} v{version}")
-            return True
+        with self._lock:
+            target = self.models.get(model_id, {}).pop(version, None)
+            if not target:
+                return False
+            
+            if self._active.get(model_id) == version:
+                del self._active[model_id]
         
-        return False
+        self._schedule_save()
+        logger.info(f"Deleted {model_id} v{version}")
+        return True
     
     def compare_versions(self, model_id: str, version1: str, 
                         version2: str) -> Dict[str, Any]:
@@ -183,16 +292,26 @@ class ModelRegistry:
             'metrics_diff': {}
         }
         
-        # Compare metrics
-        for metric in set(list(v1.metrics.keys()) + list(v2.metrics.keys())):
-            val1 = v1.metrics.get(metric, 0)
-            val2 = v2.metrics.get(metric, 0)
-            comparison['metrics_diff'][metric] = {
-                'version1': val1,
-                'version2': val2,
-                'diff': val2 - val1,
-                'percent_change': ((val2 - val1) / val1 * 100) if val1 != 0 else 0
+        # Compare metrics as aligned arrays (v1 order, then metrics only in v2)
+        metrics = list(dict.fromkeys([*v1.metrics, *v2.metrics]))
+        n = len(metrics)
+        val1 = np.fromiter((v1.metrics.get(k, 0) for k in metrics), dtype=np.float64, count=n)
+        val2 = np.fromiter((v2.metrics.get(k, 0) for k in metrics), dtype=np.float64, count=n)
+        
+        diff = val2 - val1
+        percent = np.divide(diff * 100, val1, out=np.zeros(n), where=val1 != 0)
+        
+        comparison['metrics_diff'] = {
+            metric: {
+                'version1': v1_val,
+                'version2': v2_val,
+                'diff': d,
+                'percent_change': pct
             }
+            for metric, v1_val, v2_val, d, pct in zip(
+                metrics, val1.tolist(), val2.tolist(), diff.tolist(), percent.tolist()
+            )
+        }
         
         return comparison
 
@@ -208,7 +327,11 @@ class ModelLoader:
             registry: Model registry instance
         """
         self.registry = registry
-        self.loaded_models = {}
+        
+        # Loaded models in LRU order; at most max_loaded stay resident
+        self.loaded_models: OrderedDict = OrderedDict()
+        self.max_loaded = int(os.getenv('MODEL_CACHE_SIZE', '2'))
+        self._lock = threading.Lock()
     
     def load_model(self, model_id: str, version: str = None) -> Any:
         """
@@ -231,19 +354,42 @@ class ModelLoader:
         
         # Check if already loaded
         cache_key = f"{model_id}:{model_version.version}"
-        if cache_key in self.loaded_models:
-            logger.info(f"Using cached model {cache_key}")
-            return self.loaded_models[cache_key]
+        with self._lock:
+            if cache_key in self.loaded_models:
+                self.loaded_models.move_to_end(cache_key)
+                logger.info(f"Using cached model {cache_key}")
+                return self.loaded_models[cache_key]
         
         # Load model based on type
         model = self._load_model_file(model_version)
         
-        # Cache loaded model
-        self.loaded_models[cache_key] = model
+        # Cache loaded model, evicting the least recently used beyond max_loaded
+        # (keys only: no reference to an evicted model may outlive the pop)
+        evicted_keys = []
+        with self._lock:
+            self.loaded_models[cache_key] = model
+            self.loaded_models.move_to_end(cache_key)
+            while len(self.loaded_models) > max(1, self.max_loaded):
+                evicted_keys.append(self.loaded_models.popitem(last=False)[0])
+        
+        for victim_key in evicted_keys:
+            logger.info(f"Evicted model {victim_key}")
+        if evicted_keys:
+            self._release_memory()
         
         logger.info(f"Loaded model {cache_key}")
         return model
     
+    @staticmethod
+    def _release_memory():
+        """Reclaim memory held by evicted or unloaded models"""
+        gc.collect()
+        
+        # Only if torch is already in use; never import it just for this
+        torch = sys.modules.get('torch')
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
     def _load_model_file(self, model_version: ModelVersion) -> Any:
         """Load model from file"""
         # Implementation would depend on model type
@@ -268,8 +414,12 @@ class ModelLoader:
                 None
             )
         
-        if cache_key and cache_key in self.loaded_models:
-            del self.loaded_models[cache_key]
+        with self._lock:
+            removed = self.loaded_models.pop(cache_key, None) if cache_key else None
+        
+        if removed is not None:
+            del removed
+            self._release_memory()
             logger.info(f"Unloaded model {cache_key}")
 
 
@@ -281,45 +431,48 @@ model_loader = ModelLoader(model_registry)
 # Register default models
 def register_default_models():
     """Register default model versions"""
+    created_at = datetime.utcnow().isoformat()
     
-    # AI Text Detector
-    model_registry.register_model(ModelVersion(
-        model_id='ai_text_detector',
-        version='1.0.0',
-        model_type='text_detector',
-        path='models/modernbert.bin',
-        created_at=datetime.utcnow().isoformat(),
-        metrics={'accuracy': 0.92, 'precision': 0.89, 'recall': 0.91},
-        is_active=True,
-        description='ModernBERT-based AI text detector',
-        tags=['text', 'ai-detection', 'production']
-    ))
-    
-    # Phi-3 LLM
-    model_registry.register_model(ModelVersion(
-        model_id='phi3_llm',
-        version='4k-q4',
-        model_type='llm',
-        path='models/phi-3-mini-4k-instruct-Q4_K_M.gguf',
-        created_at=datetime.utcnow().isoformat(),
-        metrics={'perplexity': 12.5, 'generation_speed': 25.3},
-        is_active=True,
-        description='Phi-3 Mini 4K context, Q4 quantization',
-        tags=['llm', 'gguf', 'cpu-optimized']
-    ))
-    
-    # Embeddings Model
-    model_registry.register_model(ModelVersion(
-        model_id='embeddings',
-        version='minilm-l6-v2',
-        model_type='embeddings',
-        path='sentence-transformers/all-MiniLM-L6-v2',
-        created_at=datetime.utcnow().isoformat(),
-        metrics={'embedding_dimension': 384, 'speed_ms': 15.2},
-        is_active=True,
-        description='All-MiniLM-L6-v2 sentence embeddings',
-        tags=['embeddings', 'sentence-transformers']
-    ))
+    model_registry.register_models([
+        # AI Text Detector
+        ModelVersion(
+            model_id='ai_text_detector',
+            version='1.0.0',
+            model_type='text_detector',
+            path='models/modernbert.bin',
+            created_at=created_at,
+            metrics={'accuracy': 0.92, 'precision': 0.89, 'recall': 0.91},
+            is_active=True,
+            description='ModernBERT-based AI text detector',
+            tags=['text', 'ai-detection', 'production']
+        ),
+        
+        # Phi-3 LLM
+        ModelVersion(
+            model_id='phi3_llm',
+            version='4k-q4',
+            model_type='llm',
+            path='models/phi-3-mini-4k-instruct-Q4_K_M.gguf',
+            created_at=created_at,
+            metrics={'perplexity': 12.5, 'generation_speed': 25.3},
+            is_active=True,
+            description='Phi-3 Mini 4K context, Q4 quantization',
+            tags=['llm', 'gguf', 'cpu-optimized']
+        ),
+        
+        # Embeddings Model
+        ModelVersion(
+            model_id='embeddings',
+            version='minilm-l6-v2',
+            model_type='embeddings',
+            path='sentence-transformers/all-MiniLM-L6-v2',
+            created_at=created_at,
+            metrics={'embedding_dimension': 384, 'speed_ms': 15.2},
+            is_active=True,
+            description='All-MiniLM-L6-v2 sentence embeddings',
+            tags=['embeddings', 'sentence-transformers']
+        )
+    ])
 
 
 # Initialize default models
@@ -10,7 +10,7 @@ from prometheus_client import (
     generate_latest, CONTENT_TYPE_LATEST,
     CollectorRegistry
 )
-from flask import Response, request
+from flask import Response, request, current_app
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +29,7 @@ REQUEST_DURATION = Histogram(
     'http_request_duration_seconds',
     'HTTP request duration in seconds',
     ['method', 'endpoint'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
     registry=registry
 )
 
@@ -51,6 +52,7 @@ ANALYSIS_DURATION = Histogram(
     'analysis_duration_seconds',
     'Analysis duration in seconds',
     ['analysis_type'],
+    buckets=(0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
     registry=registry
 )
 
@@ -89,6 +91,7 @@ VECTOR_SEARCH_DURATION = Histogram(
     'vector_search_duration_seconds',
     'Vector search duration',
     ['store_type'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
     registry=registry
 )
 
@@ -125,6 +128,7 @@ MODEL_LOAD_TIME = Histogram(
     'model_load_time_seconds',
     'Model load time',
     ['model_id', 'version'],
+    buckets=(0.1, 1, 5, 10, 30, 60, 120, 300),
     registry=registry
 )
 
@@ -141,48 +145,97 @@ APP_INFO.info({
 })
 
 
+# Bound label children per label tuple; .labels() re-resolves on every call.
+# Keys are (method, endpoint), normalized by _request_labels, so these stay
+# small.
+_IN_PROGRESS_CHILDREN = {}
+_DURATION_CHILDREN = {}
+
+
+def _child(children: dict, metric, key: tuple):
+    """Get the labelled child of metric for key, binding it on first use"""
+    child = children.get(key)
+    if child is None:
+        child = children.setdefault(key, metric.labels(*key))
+    return child
+
+
+# Bound counter children per (counter, label values)
+_COUNTER_CHILDREN = {}
+
+
+def _count(counter, labels: tuple, amount: int = 1):
+    """Increment the labelled child of counter, binding it on first use"""
+    key = (counter, labels)
+    child = _COUNTER_CHILDREN.get(key)
+    if child is None:
+        child = _COUNTER_CHILDREN.setdefault(key, counter.labels(*labels))
+    child.inc(amount)
+
+
+_KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+def _request_labels() -> tuple:
+    """
+    (method, endpoint) labels for the current request
+    
+    Only registered view endpoints and standard methods become label values;
+    anything else is reported as 'other' to bound label cardinality.
+    """
+    method = request.method if request.method in _KNOWN_METHODS else 'other'
+    endpoint = request.endpoint
+    if endpoint not in current_app.view_functions:
+        endpoint = 'other'
+    return method, endpoint
+
+
+def _status_class(status: int) -> str:
+    """Bucket an HTTP status code into '1xx'..'5xx'"""
+    return f"{status // 100}xx"
+
+
+# Set once a track_request-decorated view is seen under PrometheusMiddleware
+_double_tracking_warned = False
+
+
 class MetricsManager:
     """Centralized metrics management"""
     
     @staticmethod
     def track_request():
-        """Decorator to track HTTP requests"""
+        """
+        Decorator to track HTTP requests
+        
+        No-op under PrometheusMiddleware, which already tracks every request.
+        """
         def decorator(f):
             @wraps(f)
             def wrapped(*args, **kwargs):
-                method = request.method
-                endpoint = request.endpoint or 'unknown'
+                if current_app.config.get('PROM_MIDDLEWARE_ACTIVE'):
+                    global _double_tracking_warned
+                    if not _double_tracking_warned:
+                        _double_tracking_warned = True
+                        logger.warning(
+                            f"track_request on {f.__name__} is redundant with "
+                            f"PrometheusMiddleware and is ignored"
+                        )
+                    return f(*args, **kwargs)
                 
-                # Track in-progress
-                REQUEST_IN_PROGRESS.labels(method=method, endpoint=endpoint).inc()
+                key = _request_labels()
+                in_progress = _child(_IN_PROGRESS_CHILDREN, REQUEST_IN_PROGRESS, key)
                 
-                # Track duration
-                start_time = time.time()
+                duration = _child(_DURATION_CHILDREN, REQUEST_DURATION, key)
                 
-                try:
+                # Track in-progress and duration
+                with in_progress.track_inprogress(), duration.time():
                     response = f(*args, **kwargs)
-                    status = getattr(response, 'status_code', 200)
-                    
-                    # Track completion
-                    REQUEST_COUNT.labels(
-                        method=method,
-                        endpoint=endpoint,
-                        status=status
-                    ).inc()
-                    
-                    return response
-                    
-                finally:
-                    duration = time.time() - start_time
-                    REQUEST_DURATION.labels(
-                        method=method,
-                        endpoint=endpoint
-                    ).observe(duration)
-                    
-                    REQUEST_IN_PROGRESS.labels(
-                        method=method,
-                        endpoint=endpoint
-                    ).dec()
+                
+                # Track completion
+                status = _status_class(getattr(response, 'status_code', 200))
+                _count(REQUEST_COUNT, (*key, status))
+                
+                return response
             
             return wrapped
         return decorator
@@ -193,28 +246,19 @@ class MetricsManager:
         def decorator(f):
             @wraps(f)
             def wrapped(*args, **kwargs):
-                start_time = time.time()
+                status = 'error'
                 
                 try:
-                    result = f(*args, **kwargs)
+                    with ANALYSIS_DURATION.labels(analysis_type=analysis_type).time():
+                        result = f(*args, **kwargs)
                     status = 'success'
                     return result
                     
-                except Exception as e:
-                    status = 'error'
-                    raise
-                    
                 finally:
-                    duration = time.time() - start_time
-                    
                     ANALYSIS_COUNT.labels(
                         analysis_type=analysis_type,
                         status=status
                     ).inc()
-                    
-                    ANALYSIS_DURATION.labels(
-                        analysis_type=analysis_type
-                    ).observe(duration)
             
             return wrapped
         return decorator
@@ -234,10 +278,7 @@ class MetricsManager:
     @staticmethod
     def track_cache_access(cache_type: str, hit: bool):
         """Track cache hit/miss"""
-        if hit:
-            CACHE_HITS.labels(cache_type=cache_type).inc()
-        else:
-            CACHE_MISSES.labels(cache_type=cache_type).inc()
+        _count(CACHE_HITS if hit else CACHE_MISSES, (cache_type,))
     
     @staticmethod
     def track_vector_search(store_type: str, duration: float, result_count: int):
@@ -266,6 +307,11 @@ class MetricsManager:
         MODEL_LOAD_TIME.labels(model_id=model_id, version=version).observe(duration)
 
 
+def render_metrics():
+    """Render metrics exposition as (body, content type)"""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
 def metrics_endpoint():
     """Endpoint to expose Prometheus metrics"""
     return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
@@ -285,6 +331,9 @@ class PrometheusMiddleware:
         app.before_request(self.before_request)
         app.after_request(self.after_request)
         
+        # Turns MetricsManager.track_request into a no-op (no double counting)
+        app.config['PROM_MIDDLEWARE_ACTIVE'] = True
+        
         # Add metrics endpoint
         app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
         
@@ -292,34 +341,22 @@ class PrometheusMiddleware:
     
     def before_request(self):
         """Track request start"""
-        request._prom_start_time = time.time()
+        request._prom_start_ns = time.monotonic_ns()
         
-        method = request.method
-        endpoint = request.endpoint or 'unknown'
-        REQUEST_IN_PROGRESS.labels(method=method, endpoint=endpoint).inc()
+        # Label tuple is reused in after_request
+        key = _request_labels()
+        request._prom_labels = key
+        _child(_IN_PROGRESS_CHILDREN, REQUEST_IN_PROGRESS, key).inc()
     
     def after_request(self, response):
         """Track request completion"""
-        if hasattr(request, '_prom_start_time'):
-            duration = time.time() - request._prom_start_time
-            method = request.method
-            endpoint = request.endpoint or 'unknown'
-            status = response.status_code
-            
-            REQUEST_COUNT.labels(
-                method=method,
-                endpoint=endpoint,
-                status=status
-            ).inc()
-            
-            REQUEST_DURATION.labels(
-                method=method,
-                endpoint=endpoint
-            ).observe(duration)
+        key = getattr(request, '_prom_labels', None)
+        if key is not None:
+            duration = (time.monotonic_ns() - request._prom_start_ns) * 1e-9
             
-            REQUEST_IN_PROGRESS.labels(
-                method=method,
-                endpoint=endpoint
-            ).dec()
+            status = _status_class(response.status_code)
+            _count(REQUEST_COUNT, (*key, status))
+            _child(_DURATION_CHILDREN, REQUEST_DURATION, key).observe(duration)
+            _child(_IN_PROGRESS_CHILDREN, REQUEST_IN_PROGRESS, key).dec()
         
-        return response
\ No newline at end of file
+        return response
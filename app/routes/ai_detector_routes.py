@@ -1,12 +1,39 @@
 """AI Content Detection Routes"""
 import logging
-from flask import Blueprint, request
+import orjson
+from typing import Any, Dict, List, Optional
+from flask import Blueprint, request, current_app
 from app.middleware.auth_middleware import require_api_key
 from app.utils.response_formatter import success_response, error_response
 
 logger = logging.getLogger(__name__)
 bp = Blueprint('ai_detect', __name__)
 
+# Maximum texts per batch request (one forward pass)
+MAX_BATCH = 64
+
+
+# Returned while no detector is registered in app.extensions
+_ERR_NO_DETECTOR = 'AI text detector not available'
+
+
+def _detect_batch(texts: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Classify texts with a single detector call
+    
+    Args:
+        texts: Texts to classify
+    
+    Returns:
+        One result dict per text with 'is_human', 'confidence' and
+        'ai_model', or None when no detector is registered
+    """
+    detector = current_app.extensions.get('ai_text_detector')
+    if detector is None:
+        return None
+    
+    return detector.detect_batch(texts)
+
 
 @bp.route('/text', methods=['POST'])
 @require_api_key
@@ -19,13 +46,12 @@ def detect_ai_text():
         if not text:
             return error_response('text required', status_code=400)
         
-        # TODO: Integrate with ai_text_detector service
-        return success_response(data={
-            'is_human': True,
-            'confidence': 0.85,
-            'ai_model': None
-        })
+        results = _detect_batch([text])
+        if results is None:
+            return error_response(_ERR_NO_DETECTOR, status_code=503)
         
+        return success_response(data=results[0])
+    
     except Exception as e:
         return error_response(str(e), status_code=500)
 
@@ -35,16 +61,38 @@ def detect_ai_text():
 def detect_ai_text_batch():
     """Batch AI text detection"""
     try:
-        data = request.get_json()
+        # Batch bodies can be large: parse the raw bytes once, without caching them
+        try:
+            data = orjson.loads(request.get_data(cache=False))
+        except orjson.JSONDecodeError:
+            return error_response('Invalid JSON body', status_code=400)
+        
+        if not isinstance(data, dict):
+            return error_response('JSON object required', status_code=400)
+        
         texts = data.get('texts', [])
         
-        # TODO: Integrate with ai_text_detector batch processing
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return error_response('texts must be a list of strings', status_code=400)
+        
+        if len(texts) > MAX_BATCH:
+            return error_response(
+                f'At most {MAX_BATCH} texts per batch',
+                status_code=400
+            )
+        
+        results = _detect_batch(texts) if texts else []
+        if results is None:
+            return error_response(_ERR_NO_DETECTOR, status_code=503)
+        
+        ai_count = sum(1 for r in results if not r['is_human'])
+        
         return success_response(data={
-            'results': [],
+            'results': results,
             'total_texts': len(texts),
-            'ai_count': 0,
-            'human_count': 0
+            'ai_count': ai_count,
+            'human_count': len(results) - ai_count
         })
-        
+    
     except Exception as e:
         return error_response(str(e), status_code=500)
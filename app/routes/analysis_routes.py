@@ -3,17 +3,40 @@ Analysis Routes
 Main document analysis endpoints
 """
 import logging
-from flask import Blueprint, request
+from pathlib import Path
+from typing import List, Optional
+from flask import Blueprint, request, current_app
 from app.middleware.auth_middleware import require_api_key
+from app.utils.json_provider import load_request_json
 from app.utils.response_formatter import success_response, error_response, analysis_response
 from app.utils.decorators import validate_file_upload, timing_decorator
-from app.utils.file_utils import save_uploaded_file
+from app.utils.file_utils import save_uploaded_file, get_file_hash
+from app.utils.cache import cache
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('analysis', __name__)
 
 
+def _resolve_upload(filepath: str) -> Optional[Path]:
+    """
+    Resolve a client-supplied path to an existing file in UPLOAD_FOLDER
+    
+    Returns:
+        The resolved path, or None if it is missing or outside the folder
+    """
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER']).resolve()
+    path = Path(filepath).resolve()
+    if not path.is_relative_to(upload_folder) or not path.is_file():
+        return None
+    return path
+
+
+def _analysis_cache_key(filepath: Path, analysis_types: List[str]) -> str:
+    """Content-addressed cache key: document hash plus requested analyses"""
+    return f"analysis:{get_file_hash(str(filepath), 'xxh3_128')}:{','.join(sorted(set(analysis_types)))}"
+
+
 @bp.route('/upload', methods=['POST'])
 @require_api_key
 @validate_file_upload()
@@ -57,24 +80,44 @@ def analyze_document():
     }
     """
     try:
-        data = request.get_json()
+        data = load_request_json()
         filepath = data.get('filepath')
         analysis_types = data.get('analysis_types', [])
         
-        if not filepath:
+        if not filepath or not isinstance(filepath, str):
             return error_response('filepath required', status_code=400)
         
+        valid_types = isinstance(analysis_types, list) and all(
+            isinstance(t, str) for t in analysis_types
+        )
+        if not valid_types:
+            return error_response('analysis_types must be a list of strings', status_code=400)
+        
+        # Only uploaded documents; anything else looks like a missing file
+        filepath = _resolve_upload(filepath)
+        if filepath is None:
+            return error_response('filepath not found', status_code=404)
+        
+        # Identical document + analyses: reuse the stored result
+        ttl = current_app.config.get('ANALYSIS_CACHE_TTL', 3600)
+        cache_key = _analysis_cache_key(filepath, analysis_types)
+        cached_result = cache.get(cache_key, refresh_ttl=ttl)
+        if cached_result is not None:
+            return analysis_response(**cached_result)
+        
         # TODO: Integrate with agent_service for actual analysis
         # For now, return mock response
+        result = {
+            'document_structure': [],
+            'text_similarity_results': [],
+            'ai_text_detection': [],
+            'observations_llm': "Analysis completed successfully",
+            'insights': "Document analyzed",
+            'memory_id': "mem_mock123"
+        }
+        cache.set(cache_key, result, ttl)
         
-        return analysis_response(
-            document_structure=[],
-            text_similarity_results=[],
-            ai_text_detection=[],
-            observations_llm="Analysis completed successfully",
-            insights="Document analyzed",
-            memory_id="mem_mock123"
-        )
+        return analysis_response(**result)
         
     except Exception as e:
         logger.error(f"Analysis error: {e}")
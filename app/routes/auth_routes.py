@@ -3,9 +3,10 @@ Authentication Routes
 JWT-based authentication endpoints
 """
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from app.auth.jwt_manager import JWTManager, UserManager, require_jwt_token
 from app.utils.decorators import validate_json
+from app.utils.response_formatter import json_response
 
 logger = logging.getLogger(__name__)
 
@@ -36,10 +37,10 @@ def login():
         user = UserManager.authenticate(username, password)
         
         if not user:
-            return jsonify({
+            return json_response({
                 'error': 'Invalid credentials',
                 'status': 'error'
-            }), 401
+            }, 401)
         
         # Generate tokens
         tokens = JWTManager.generate_tokens(
@@ -52,19 +53,19 @@ def login():
         
         logger.info(f"User logged in: {username}")
         
-        return jsonify({
+        return json_response({
             'status': 'success',
             'message': 'Login successful',
             **tokens,
             'user': user
-        }), 200
+        }, 200)
         
     except Exception as e:
         logger.error(f"Login error: {e}")
-        return jsonify({
+        return json_response({
             'error': 'Login failed',
             'status': 'error'
-        }), 500
+        }, 500)
 
 
 @bp.route('/refresh', methods=['POST'])
@@ -89,22 +90,22 @@ def refresh():
         new_tokens = JWTManager.refresh_access_token(refresh_token)
         
         if not new_tokens:
-            return jsonify({
+            return json_response({
                 'error': 'Invalid refresh token',
                 'status': 'error'
-            }), 401
+            }, 401)
         
-        return jsonify({
+        return json_response({
             'status': 'success',
             **new_tokens
-        }), 200
+        }, 200)
         
     except Exception as e:
         logger.error(f"Token refresh error: {e}")
-        return jsonify({
+        return json_response({
             'error': 'Token refresh failed',
             'status': 'error'
-        }), 500
+        }, 500)
 
 
 @bp.route('/register', methods=['POST'])
@@ -130,24 +131,30 @@ def register():
             email=data['email']
         )
         
+        if user is None:
+            return json_response({
+                'error': 'Username already exists',
+                'status': 'error'
+            }, 409)
+        
         # Generate tokens
         tokens = JWTManager.generate_tokens(user_id=user['user_id'])
         
         logger.info(f"New user registered: {user['username']}")
         
-        return jsonify({
+        return json_response({
             'status': 'success',
             'message': 'Registration successful',
             'user': user,
             **tokens
-        }), 201
+        }, 201)
         
     except Exception as e:
         logger.error(f"Registration error: {e}")
-        return jsonify({
+        return json_response({
             'error': 'Registration failed',
             'status': 'error'
-        }), 500
+        }, 500)
 
 
 @bp.route('/me', methods=['GET'])
@@ -159,33 +166,45 @@ def get_current_user():
     GET /api/auth/me
     Headers: Authorization: Bearer <token>
     """
-    user_id = request.user_id
-    user = UserManager.get_user(user_id)
+    # Loaded alongside token verification
+    user = request.user
     
     if not user:
-        return jsonify({
+        return json_response({
             'error': 'User not found',
             'status': 'error'
-        }), 404
+        }, 404)
     
-    return jsonify({
+    return json_response({
         'status': 'success',
         'user': user
-    }), 200
+    }, 200)
 
 
 @bp.route('/logout', methods=['POST'])
 @require_jwt_token
 def logout():
     """
-    Logout (token invalidation would be implemented with Redis)
+    Logout: revoke the access token (and refresh token, if given)
     
     POST /api/auth/logout
+    Headers: Authorization: Bearer <token>
+    Body (optional): {
+        "refresh_token": "token"
+    }
     """
-    # In production, add token to blacklist in Redis
+    JWTManager.revoke_token(request.user_data)
+    
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get('refresh_token') if isinstance(data, dict) else None
+    if refresh_token:
+        refresh_payload = JWTManager.verify_token(refresh_token, token_type='refresh')
+        if refresh_payload and refresh_payload.get('user_id') == request.user_id:
+            JWTManager.revoke_token(refresh_payload)
+    
     logger.info(f"User logged out: {request.user_id}")
     
-    return jsonify({
+    return json_response({
         'status': 'success',
         'message': 'Logged out successfully'
-    }), 200
\ No newline at end of file
+    }, 200)
\ No newline at end of file
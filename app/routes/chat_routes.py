@@ -1,7 +1,8 @@
 """Chat Routes - Post-Analysis Q&A"""
 import logging
-from flask import Blueprint, request
+from flask import Blueprint
 from app.middleware.auth_middleware import require_api_key
+from app.utils.json_provider import load_request_json
 from app.utils.response_formatter import success_response, error_response
 
 logger = logging.getLogger(__name__)
@@ -21,7 +22,7 @@ def send_message():
     }
     """
     try:
-        data = request.get_json()
+        data = load_request_json()
         memory_id = data.get('memory_id')
         question = data.get('question')
         
@@ -2,6 +2,7 @@
 import logging
 from flask import Blueprint, request
 from app.middleware.auth_middleware import require_api_key
+from app.utils.json_provider import load_request_json
 from app.utils.response_formatter import success_response, error_response
 
 logger = logging.getLogger(__name__)
@@ -43,7 +44,7 @@ def analyze_image():
 def batch_analyze():
     """Batch analyze multiple images"""
     try:
-        data = request.get_json()
+        data = load_request_json()
         image_paths = data.get('image_paths', [])
         
         return success_response(data={'processed': len(image_paths), 'results': []})
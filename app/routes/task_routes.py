@@ -3,8 +3,9 @@ Task Management Routes
 Celery task status and control
 """
 import logging
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from app.auth.jwt_manager import require_jwt_token
+from app.utils.response_formatter import json_response
 from celery_worker import get_task_status, cancel_task
 
 logger = logging.getLogger(__name__)
@@ -23,18 +24,18 @@ def get_task(task_id):
     try:
         status = get_task_status(task_id)
         
-        return jsonify({
+        return json_response({
             'status': 'success',
             'task_id': task_id,
             **status
-        }), 200
+        }, 200)
         
     except Exception as e:
         logger.error(f"Error getting task status: {e}")
-        return jsonify({
+        return json_response({
             'error': 'Failed to get task status',
             'status': 'error'
-        }), 500
+        }, 500)
 
 
 @bp.route('/<task_id>/cancel', methods=['POST'])
@@ -50,18 +51,18 @@ def cancel_task_route(task_id):
         
         logger.info(f"Task cancelled: {task_id}")
         
-        return jsonify({
+        return json_response({
             'status': 'success',
             'message': 'Task cancelled',
             **result
-        }), 200
+        }, 200)
         
     except Exception as e:
         logger.error(f"Error cancelling task: {e}")
-        return jsonify({
+        return json_response({
             'error': 'Failed to cancel task',
             'status': 'error'
-        }), 500
+        }, 500)
 
 
 @bp.route('/list', methods=['GET'])
@@ -75,15 +76,15 @@ def list_tasks():
     try:
         # In production, would query from database
         # For now, return mock data
-        return jsonify({
+        return json_response({
             'status': 'success',
             'tasks': [],
             'total': 0
-        }), 200
+        }, 200)
         
     except Exception as e:
         logger.error(f"Error listing tasks: {e}")
-        return jsonify({
+        return json_response({
             'error': 'Failed to list tasks',
             'status': 'error'
-        }), 500
\ No newline at end of file
+        }, 500)
\ No newline at end of file
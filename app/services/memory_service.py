@@ -2,14 +2,171 @@
 Memory Service using mem0
 Manages persistent memory for document analysis and chat
 """
+import heapq
 import logging
+import math
+import re
+import threading
+import time
 import uuid
-import json
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from typing import Callable, Dict, Any, Iterator, List, Optional
+import msgpack
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
 
 logger = logging.getLogger(__name__)
 
+_TOKEN_RE = re.compile(r'\w+')
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Semantic (HNSW) search takes over from BM25 at this many memories
+ANN_MIN_MEMORIES = 100
+HNSW_M = 32
+
+# Compact the hot columns once this share of rows are tombstones
+COMPACT_TOMBSTONE_RATIO = 0.25
+
+# Record fields mirrored in the hot columns
+_HOT_FIELDS = frozenset(('document_id', 'created_at', 'metadata', 'chat_history'))
+
+
+@dataclass(slots=True)
+class ChatInteraction:
+    """One question/answer exchange about a memory"""
+    timestamp: float
+    question: str
+    answer: str
+    context: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class MemoryRecord:
+    """Stored analysis memory"""
+    memory_id: str
+    document_id: str
+    created_at: float
+    analysis_results: Dict[str, Any]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    chat_history: List[ChatInteraction] = field(default_factory=list)
+    updated_at: Optional[float] = None
+
+
+_RECORD_FIELDS = frozenset(f.name for f in fields(MemoryRecord))
+
+
+@lru_cache(maxsize=4096)
+def _iso_second(second: int) -> str:
+    """UTC ISO 8601 string for a whole second (memoized)"""
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+
+
+def isoformat_ts(ts: float) -> str:
+    """
+    Format a Unix timestamp like datetime.utcnow().isoformat()
+    
+    Args:
+        ts: Seconds since the epoch
+    
+    Returns:
+        Naive UTC ISO 8601 string with microseconds
+    """
+    second = int(ts)
+    micros = int((ts - second) * 1_000_000)
+    if micros:
+        return f"{_iso_second(second)}.{micros:06d}"
+    return _iso_second(second)
+
+
+def dump_memory(record: MemoryRecord) -> bytes:
+    """Serialize a memory record to a msgpack frame (positional fields)"""
+    return msgpack.packb((
+        record.memory_id,
+        record.document_id,
+        record.created_at,
+        record.analysis_results,
+        record.metadata,
+        [(i.timestamp, i.question, i.answer, i.context) for i in record.chat_history],
+        record.updated_at
+    ), use_bin_type=True)
+
+
+def load_memory(frame: bytes) -> MemoryRecord:
+    """Deserialize a msgpack frame written by dump_memory"""
+    memory_id, document_id, created_at, analysis_results, metadata, history, updated_at = (
+        msgpack.unpackb(frame, raw=False)
+    )
+    return MemoryRecord(
+        memory_id=memory_id,
+        document_id=document_id,
+        created_at=created_at,
+        analysis_results=analysis_results,
+        metadata=metadata,
+        chat_history=[ChatInteraction(*interaction) for interaction in history],
+        updated_at=updated_at
+    )
+
+
+def _flatten_text(value: Any) -> Iterator[str]:
+    """Yield every string value nested in dicts/lists"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten_text(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten_text(item)
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercased word tokens"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _format_document(doc: Dict[str, Any]) -> str:
+    """Page count line"""
+    return f"Document: {doc.get('page_count', 0)} pages"
+
+
+def _format_similarity(sim: Dict[str, Any]) -> str:
+    """Similarity match count line"""
+    return f"Similarity matches: {sim.get('total_matches', 0)}"
+
+
+def _format_ai_detection(ai: Dict[str, Any]) -> str:
+    """AI detection verdict line"""
+    return (
+        f"AI Detection: {ai.get('overall_classification', 'Unknown')} "
+        f"({ai.get('average_confidence', 0):.1f}% confidence)"
+    )
+
+
+def _format_insights(insights: Dict[str, Any]) -> Optional[str]:
+    """Insight text line, if insights were generated"""
+    if 'insights' in insights:
+        return f"Key Insights: {insights['insights']}"
+    return None
+
+
+# Chat context lines: (analysis section, formatter), in output order
+_CONTEXT_FORMATTERS = (
+    ('document_analysis', _format_document),
+    ('similarity', _format_similarity),
+    ('ai_detection', _format_ai_detection),
+    ('insights', _format_insights),
+)
+
 
 class MemoryService:
     """
@@ -17,7 +174,8 @@ class MemoryService:
     Stores and retrieves analysis memories for context-aware chat
     """
     
-    def __init__(self, api_url: str = None, api_key: str = None, enabled: bool = True):
+    def __init__(self, api_url: str = None, api_key: str = None, enabled: bool = True,
+                 embedder: Optional[Callable[[str], np.ndarray]] = None):
         """
         Initialize memory service
         
@@ -25,13 +183,46 @@ class MemoryService:
             api_url: mem0 API URL
             api_key: mem0 API key
             enabled: Whether memory is enabled
+            embedder: Text embedding callable; with faiss installed, enables
+                approximate nearest neighbor search over memories
         """
         self.api_url = api_url
         self.api_key = api_key
         self.enabled = enabled
         
         # In-memory storage for MVP (replace with actual mem0 integration)
-        self._memory_store = {}
+        self._memory_store: Dict[str, MemoryRecord] = {}
+        
+        # Hot listing/search fields as parallel columns (one row per memory);
+        # deleted rows are tombstoned and dropped on compaction
+        self._ids: List[str] = []
+        self._doc_ids: List[str] = []
+        self._created_at = array('d')
+        self._metadata: List[Dict[str, Any]] = []
+        self._chat_counts = array('i')
+        self._tombstones = bytearray()
+        self._dead_rows = 0
+        self._id_to_row: Dict[str, int] = {}
+        self._rows_lock = threading.Lock()
+        
+        # Inverted index over document analysis text:
+        # token -> {memory_id: term frequency}, plus per-memory token counts
+        # and distinct terms (for removal)
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, tuple] = {}
+        self._total_length = 0
+        self._index_lock = threading.RLock()
+        
+        # HNSW index over document analysis embeddings (cosine via inner
+        # product of unit vectors). Labels are assigned in insertion order;
+        # superseded or deleted labels stay in the graph as stale entries
+        # until the next rebuild.
+        self.embedder = embedder if faiss is not None else None
+        self._ann = None
+        self._ann_labels: List[Optional[str]] = []
+        self._ann_label_of: Dict[str, int] = {}
+        self._ann_stale = 0
         
         logger.info(f"Memory Service initialized (enabled: {enabled})")
     
@@ -53,26 +244,27 @@ class MemoryService:
             memory_id = f"mem_{uuid.uuid4().hex[:12]}"
             
             # Structure memory data
-            memory_data = {
-                'memory_id': memory_id,
-                'document_id': document_id,
-                'created_at': datetime.utcnow().isoformat(),
-                'analysis_results': analysis_results,
-                'metadata': metadata or {},
-                'chat_history': []
-            }
+            memory_data = MemoryRecord(
+                memory_id=memory_id,
+                document_id=document_id,
+                created_at=time.time(),
+                analysis_results=analysis_results,
+                metadata=metadata or {}
+            )
             
             # Store memory
             self._memory_store[memory_id] = memory_data
+            self._append_row(memory_data)
+            self._index_memory(memory_id, analysis_results)
             
             logger.info(f"Memory created: {memory_id} for document {document_id}")
             return memory_id
-            
+        
         except Exception as e:
             logger.error(f"Error creating memory: {e}")
             return ""
     
-    def get_memory(self, memory_id: str) -> Optional[Dict[str, Any]]:
+    def get_memory(self, memory_id: str) -> Optional[MemoryRecord]:
         """
         Retrieve memory by ID
         
@@ -80,7 +272,7 @@ class MemoryService:
             memory_id: Memory identifier
         
         Returns:
-            Memory data or None if not found
+            Memory record or None if not found
         """
         if not self.enabled:
             return None
@@ -99,7 +291,8 @@ class MemoryService:
         
         Args:
             memory_id: Memory identifier
-            updates: Updates to apply
+            updates: Field updates; keys that are not MemoryRecord fields
+                are merged into its metadata
         
         Returns:
             Success status
@@ -113,12 +306,21 @@ class MemoryService:
                 return False
             
             # Update memory
-            self._memory_store[memory_id].update(updates)
-            self._memory_store[memory_id]['updated_at'] = datetime.utcnow().isoformat()
+            memory = self._memory_store[memory_id]
+            for key, value in updates.items():
+                if key in _RECORD_FIELDS:
+                    setattr(memory, key, value)
+                else:
+                    memory.metadata[key] = value
+            if 'analysis_results' in updates:
+                self._index_memory(memory_id, updates['analysis_results'])
+            if not _HOT_FIELDS.isdisjoint(updates):
+                self._write_row(memory)
+            memory.updated_at = time.time()
             
             logger.info(f"Memory updated: {memory_id}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error updating memory: {e}")
             return False
@@ -146,24 +348,28 @@ class MemoryService:
                 return False
             
             # Create interaction record
-            interaction = {
-                'timestamp': datetime.utcnow().isoformat(),
-                'question': question,
-                'answer': answer,
-                'context': context or []
-            }
-            
-            # Add to chat history
-            memory['chat_history'].append(interaction)
+            interaction = ChatInteraction(
+                timestamp=time.time(),
+                question=question,
+                answer=answer,
+                context=context or []
+            )
             
-            # Update memory
-            return self.update_memory(memory_id, {'chat_history': memory['chat_history']})
+            # Append in place; only the chat count column and timestamp change
+            memory.chat_history.append(interaction)
+            memory.updated_at = interaction.timestamp
+            with self._rows_lock:
+                row = self._id_to_row.get(memory_id)
+                if row is not None:
+                    self._chat_counts[row] += 1
             
+            return True
+        
         except Exception as e:
             logger.error(f"Error adding chat interaction: {e}")
             return False
     
-    def get_chat_history(self, memory_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_chat_history(self, memory_id: str, limit: int = 10) -> List[ChatInteraction]:
         """
         Get chat history for a memory
         
@@ -178,7 +384,7 @@ class MemoryService:
         if not memory:
             return []
         
-        chat_history = memory.get('chat_history', [])
+        chat_history = memory.chat_history
         return chat_history[-limit:] if limit else chat_history
     
     def search_memories(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
@@ -195,31 +401,212 @@ class MemoryService:
         if not self.enabled:
             return []
         
-        # Simple keyword search (replace with semantic search in production)
-        query_lower = query.lower()
-        matching_memories = []
+        if self._ann is not None and len(self._ann_label_of) >= ANN_MIN_MEMORIES:
+            return self._search_ann(query, limit)
         
-        for memory_id, memory in self._memory_store.items():
-            # Search in document content
-            analysis = memory.get('analysis_results', {})
-            doc_analysis = analysis.get('document_analysis', {})
-            
-            # Convert to string for searching
-            memory_text = json.dumps(doc_analysis).lower()
+        query_tokens = set(_tokenize(query))
+        if not query_tokens:
+            return []
+        
+        # BM25 over the inverted index; only memories sharing a term are scored
+        with self._index_lock:
+            n_docs = len(self._doc_lengths)
+            if n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs
             
-            if query_lower in memory_text:
+            scores: Dict[str, float] = {}
+            for token in query_tokens:
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for memory_id, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[memory_id] / avg_length)
+                    scores[memory_id] = scores.get(memory_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        
+        matching_memories = []
+        with self._rows_lock:
+            for memory_id, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+                row = self._id_to_row.get(memory_id)
+                if row is None:
+                    continue
                 matching_memories.append({
                     'memory_id': memory_id,
-                    'document_id': memory.get('document_id'),
-                    'created_at': memory.get('created_at'),
-                    'metadata': memory.get('metadata', {})
+                    'document_id': self._doc_ids[row],
+                    'created_at': isoformat_ts(self._created_at[row]),
+                    'metadata': self._metadata[row],
+                    'score': score
                 })
-            
-            if len(matching_memories) >= limit:
-                break
         
         return matching_memories
     
+    def _search_ann(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Approximate nearest neighbor search over memory embeddings"""
+        query_vector = self._embed_text(query)
+        if query_vector is None:
+            return []
+        
+        with self._index_lock:
+            # Over-fetch by the stale count so dead labels never crowd out hits
+            k = min(limit + self._ann_stale, self._ann.ntotal)
+            scores, labels = self._ann.search(query_vector[None, :], k)
+            hits = [
+                (memory_id, float(score))
+                for score, label in zip(scores[0], labels[0])
+                if label >= 0 and (memory_id := self._ann_labels[label]) is not None
+            ][:limit]
+        
+        matching_memories = []
+        with self._rows_lock:
+            for memory_id, score in hits:
+                row = self._id_to_row.get(memory_id)
+                if row is None:
+                    continue
+                matching_memories.append({
+                    'memory_id': memory_id,
+                    'document_id': self._doc_ids[row],
+                    'created_at': isoformat_ts(self._created_at[row]),
+                    'metadata': self._metadata[row],
+                    'score': score
+                })
+        
+        return matching_memories
+    
+    def _embed_text(self, text: str) -> Optional[np.ndarray]:
+        """Embed and L2-normalize text as a float32 vector"""
+        try:
+            vector = np.asarray(self.embedder(text), dtype=np.float32).ravel()
+        except Exception as e:
+            logger.error(f"Error embedding memory text: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def _embed_memory(self, memory_id: str, doc_analysis: Any):
+        """Add (or replace) a memory's embedding in the HNSW index"""
+        text = " ".join(_flatten_text(doc_analysis))
+        vector = self._embed_text(text) if text else None
+        
+        with self._index_lock:
+            self._unembed_memory(memory_id)
+            if vector is None:
+                return
+            
+            if self._ann is None:
+                self._ann = faiss.IndexHNSWFlat(vector.shape[0], HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            
+            self._ann_label_of[memory_id] = len(self._ann_labels)
+            self._ann_labels.append(memory_id)
+            self._ann.add(vector[None, :])
+    
+    def _unembed_memory(self, memory_id: str):
+        """Mark a memory's HNSW entry stale, rebuilding once most are stale"""
+        with self._index_lock:
+            label = self._ann_label_of.pop(memory_id, None)
+            if label is None:
+                return
+            self._ann_labels[label] = None
+            self._ann_stale += 1
+            
+            if self._ann_stale > len(self._ann_label_of):
+                self._rebuild_ann()
+    
+    def _rebuild_ann(self):
+        """Rebuild the HNSW graph from its live vectors (caller holds _index_lock)"""
+        live = [label for label, memory_id in enumerate(self._ann_labels) if memory_id is not None]
+        ann = faiss.IndexHNSWFlat(self._ann.d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        if live:
+            vectors = self._ann.reconstruct_n(0, self._ann.ntotal)[live]
+            ann.add(np.ascontiguousarray(vectors))
+        
+        self._ann = ann
+        self._ann_labels = [self._ann_labels[label] for label in live]
+        self._ann_label_of = {memory_id: label for label, memory_id in enumerate(self._ann_labels)}
+        self._ann_stale = 0
+    
+    def _append_row(self, memory: MemoryRecord):
+        """Add a memory's hot fields as a new column row"""
+        with self._rows_lock:
+            self._id_to_row[memory.memory_id] = len(self._ids)
+            self._ids.append(memory.memory_id)
+            self._doc_ids.append(memory.document_id)
+            self._created_at.append(memory.created_at)
+            self._metadata.append(memory.metadata)
+            self._chat_counts.append(len(memory.chat_history))
+            self._tombstones.append(0)
+    
+    def _write_row(self, memory: MemoryRecord):
+        """Refresh a memory's hot column row from its record"""
+        with self._rows_lock:
+            row = self._id_to_row.get(memory.memory_id)
+            if row is None:
+                return
+            self._doc_ids[row] = memory.document_id
+            self._created_at[row] = memory.created_at
+            self._metadata[row] = memory.metadata
+            self._chat_counts[row] = len(memory.chat_history)
+    
+    def _drop_row(self, memory_id: str):
+        """Tombstone a memory's row, compacting when too many are dead"""
+        with self._rows_lock:
+            row = self._id_to_row.pop(memory_id, None)
+            if row is None:
+                return
+            self._tombstones[row] = 1
+            self._dead_rows += 1
+            self._metadata[row] = None
+            
+            if self._dead_rows > len(self._ids) * COMPACT_TOMBSTONE_RATIO:
+                self._compact_rows()
+    
+    def _compact_rows(self):
+        """Drop tombstoned rows from every column (caller holds _rows_lock)"""
+        live = [row for row, dead in enumerate(self._tombstones) if not dead]
+        
+        self._ids = [self._ids[row] for row in live]
+        self._doc_ids = [self._doc_ids[row] for row in live]
+        self._created_at = array('d', (self._created_at[row] for row in live))
+        self._metadata = [self._metadata[row] for row in live]
+        self._chat_counts = array('i', (self._chat_counts[row] for row in live))
+        self._tombstones = bytearray(len(live))
+        self._dead_rows = 0
+        self._id_to_row = {memory_id: row for row, memory_id in enumerate(self._ids)}
+    
+    def _index_memory(self, memory_id: str, analysis_results: Dict[str, Any]):
+        """(Re)index the document analysis text of a memory"""
+        doc_analysis = (analysis_results or {}).get('document_analysis', {})
+        counts = Counter(
+            token for text in _flatten_text(doc_analysis) for token in _tokenize(text)
+        )
+        
+        if self.embedder is not None:
+            self._embed_memory(memory_id, doc_analysis)
+        
+        with self._index_lock:
+            self._unindex_memory(memory_id)
+            for token, tf in counts.items():
+                self._postings.setdefault(token, {})[memory_id] = tf
+            length = sum(counts.values())
+            self._doc_lengths[memory_id] = length
+            self._doc_terms[memory_id] = tuple(counts)
+            self._total_length += length
+    
+    def _unindex_memory(self, memory_id: str):
+        """Remove a memory from the inverted index"""
+        with self._index_lock:
+            length = self._doc_lengths.pop(memory_id, None)
+            if length is None:
+                return
+            self._total_length -= length
+            
+            for token in self._doc_terms.pop(memory_id):
+                postings = self._postings[token]
+                del postings[memory_id]
+                if not postings:
+                    del self._postings[token]
+    
     def delete_memory(self, memory_id: str) -> bool:
         """
         Delete a memory
@@ -236,12 +623,15 @@ class MemoryService:
         try:
             if memory_id in self._memory_store:
                 del self._memory_store[memory_id]
+                self._drop_row(memory_id)
+                self._unindex_memory(memory_id)
+                self._unembed_memory(memory_id)
                 logger.info(f"Memory deleted: {memory_id}")
                 return True
             
             logger.warning(f"Memory not found for deletion: {memory_id}")
             return False
-            
+        
         except Exception as e:
             logger.error(f"Error deleting memory: {e}")
             return False
@@ -260,34 +650,15 @@ class MemoryService:
         if not memory:
             return ""
         
-        # Extract key information
-        analysis = memory.get('analysis_results', {})
+        # Extract key information, one line per analysis section present
+        analysis = memory.analysis_results or {}
         
         context_parts = []
-        
-        # Document info
-        if 'document_analysis' in analysis:
-            doc = analysis['document_analysis']
-            context_parts.append(f"Document: {doc.get('page_count', 0)} pages")
-        
-        # Similarity findings
-        if 'similarity' in analysis:
-            sim = analysis['similarity']
-            context_parts.append(f"Similarity matches: {sim.get('total_matches', 0)}")
-        
-        # AI detection findings
-        if 'ai_detection' in analysis:
-            ai = analysis['ai_detection']
-            context_parts.append(
-                f"AI Detection: {ai.get('overall_classification', 'Unknown')} "
-                f"({ai.get('average_confidence', 0):.1f}% confidence)"
-            )
-        
-        # Insights
-        if 'insights' in analysis:
-            insights = analysis['insights']
-            if 'insights' in insights:
-                context_parts.append(f"Key Insights: {insights['insights']}")
+        for section, formatter in _CONTEXT_FORMATTERS:
+            if section in analysis:
+                line = formatter(analysis[section])
+                if line:
+                    context_parts.append(line)
         
         return "\n".join(context_parts)
     
@@ -305,13 +676,20 @@ class MemoryService:
             return []
         
         memories = []
-        for memory_id, memory in list(self._memory_store.items())[:limit]:
-            memories.append({
-                'memory_id': memory_id,
-                'document_id': memory.get('document_id'),
-                'created_at': memory.get('created_at'),
-                'chat_count': len(memory.get('chat_history', [])),
-                'metadata': memory.get('metadata', {})
-            })
+        with self._rows_lock:
+            for memory_id, document_id, created_at, chat_count, metadata, dead in zip(
+                    self._ids, self._doc_ids, self._created_at,
+                    self._chat_counts, self._metadata, self._tombstones):
+                if dead:
+                    continue
+                if len(memories) == limit:
+                    break
+                memories.append({
+                    'memory_id': memory_id,
+                    'document_id': document_id,
+                    'created_at': isoformat_ts(created_at),
+                    'chat_count': chat_count,
+                    'metadata': metadata
+                })
         
         return memories
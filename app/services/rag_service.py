@@ -2,13 +2,79 @@
 RAG Service (Retrieval-Augmented Generation)
 Handles document indexing, retrieval, and context generation
 """
+import os
+import heapq
 import logging
-from typing import List, Dict, Any, Optional
-from app.utils.cache import cached
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import List, Dict, Any, Iterator, Optional
+import numpy as np
+from app.llm.semantic_cache import SemanticCache
 from app.utils.text_utils import chunk_text, clean_text
 
+try:
+    from xxhash import xxh3_64_intdigest as _text_digest
+except ImportError:
+    _text_digest = hash
+
 logger = logging.getLogger(__name__)
 
+# Reciprocal rank fusion constant: fused score = sum of 1 / (RRF_K + rank)
+RRF_K = 60
+
+# Retrieved chunks whose 64-bit SimHashes differ in at most this many bits
+# are treated as duplicates
+SIMHASH_MAX_DISTANCE = 3
+
+_SIMHASH_SHIFTS = np.arange(64, dtype=np.uint64)
+_MASK64 = (1 << 64) - 1
+
+_score = itemgetter('score')
+
+# Semantic retrieval cache: near-duplicate queries reuse prior results
+RETRIEVAL_CACHE_THRESHOLD = float(os.getenv('RAG_CACHE_THRESHOLD', '0.9'))
+RETRIEVAL_CACHE_TTL = int(os.getenv('RAG_CACHE_TTL', '300'))
+RETRIEVAL_CACHE_SIZE = int(os.getenv('RAG_CACHE_SIZE', '1000'))
+
+
+def _simhash(text: str) -> int:
+    """
+    64-bit SimHash of the casefolded word tokens of text
+    
+    Each bit is set when most token hashes have it set, so texts that share
+    most of their tokens land a few bits apart regardless of whitespace,
+    case or a differing leading citation.
+    """
+    tokens = text.casefold().split()
+    if not tokens:
+        return 0
+    
+    hashes = np.fromiter(
+        (_text_digest(token.encode()) & _MASK64 for token in tokens),
+        dtype=np.uint64,
+        count=len(tokens)
+    )
+    ones = ((hashes[:, None] >> _SIMHASH_SHIFTS) & np.uint64(1)).sum(axis=0)
+    bits = (ones * 2 > len(tokens)).astype(np.uint64)
+    return int((bits << _SIMHASH_SHIFTS).sum())
+
+
+def _best_first(results: List[Dict], top_k: int) -> Iterator[Dict]:
+    """
+    Yield results by descending score, partially sorting when possible
+    
+    The best 2 * top_k come from a bounded heap; the full sort only runs if
+    deduplication consumes all of them without filling top_k.
+    """
+    head_size = top_k * 2
+    if len(results) <= head_size:
+        yield from sorted(results, key=_score, reverse=True)
+        return
+    
+    # nlargest(n) equals sorted(reverse=True)[:n], so the tail continues it
+    yield from heapq.nlargest(head_size, results, key=_score)
+    yield from sorted(results, key=_score, reverse=True)[head_size:]
+
 
 class RAGService:
     """
@@ -28,6 +94,18 @@ class RAGService:
         self.faiss = faiss_service
         self.txtai = txtai_service
         self.llm = llm_service
+        
+        # The only retrieval cache: exact repeats hit it too (cosine 1.0).
+        # Keyed by the FAISS query embedding, so it needs the embeddings model
+        self._query_cache = None
+        if getattr(faiss_service, 'embeddings_model', None) is not None:
+            self._query_cache = SemanticCache(
+                faiss_service.embed_query,
+                tau=RETRIEVAL_CACHE_THRESHOLD,
+                max_size=RETRIEVAL_CACHE_SIZE,
+                ttl=RETRIEVAL_CACHE_TTL
+            )
+        
         logger.info("RAG Service initialized")
     
     def index_document(self, document_id: str, text_chunks: List[str], 
@@ -52,6 +130,13 @@ class RAGService:
             if self.txtai:
                 self.txtai.index_documents(document_id, text_chunks, metadata)
             
+            # Cached retrievals filtered to this document, or unfiltered, may
+            # now be stale
+            if self._query_cache is not None:
+                self._query_cache.clear(
+                    lambda namespace: namespace.split(':', 1)[1] in ('', document_id)
+                )
+            
             logger.info(f"Document {document_id} indexed successfully")
             return True
             
@@ -76,7 +161,6 @@ class RAGService:
         chunks = chunk_text(cleaned_text, chunk_size, overlap)
         return chunks
     
-    @cached(expiration=3600, key_prefix="rag_retrieve")
     def retrieve_context(self, query: str, top_k: int = 5, 
                         document_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -90,21 +174,26 @@ class RAGService:
         Returns:
             List of relevant chunks with scores
         """
-        results = []
-        
         try:
-            # Retrieve from FAISS (vector similarity)
-            if self.faiss:
-                faiss_results = self.faiss.search(query, top_k, document_id)
-                results.extend(faiss_results)
+            # Near-duplicate of a recent query: reuse its results. The query
+            # embedding is shared with the FAISS search on a miss.
+            query_vector = None
+            namespace = f"{top_k}:{document_id or ''}"
+            if self._query_cache is not None:
+                query_vector = self.faiss.embed_query(query)
+                cached_results = self._query_cache.lookup(query, namespace, query_vector)
+                if cached_results is not None:
+                    return cached_results
             
-            # Retrieve from txtai (semantic search)
-            if self.txtai:
-                txtai_results = self.txtai.search(query, top_k, document_id)
-                results.extend(txtai_results)
+            # Retrieve from FAISS (vector similarity) and txtai (semantic
+            # search) concurrently, then fuse by rank
+            ranked_lists = self._search_sources(query, top_k, document_id, query_vector)
+            results = self._fuse_results(ranked_lists)
             
-            # Deduplicate and re-rank results
+            # Deduplicate and keep the best top_k
             results = self._deduplicate_results(results, top_k)
+            if self._query_cache is not None and results:
+                self._query_cache.insert(query, results, namespace, query_vector)
             
             logger.info(f"Retrieved {len(results)} context chunks for query")
             return results
@@ -136,7 +225,9 @@ class RAGService:
             prompt = self._build_rag_prompt(query, context_text)
             
             # Generate response
-            answer = self.llm.generate(prompt, max_tokens=max_tokens)
+            answer = self.llm.generate(
+                prompt, query=query, context=context_text, max_tokens=max_tokens
+            )
             
             return answer
             
@@ -188,6 +279,58 @@ Question: {query}
 Answer:"""
         return prompt
     
+    def _search_sources(self, query: str, top_k: int, document_id: Optional[str],
+                        query_vector=None) -> List[List[Dict[str, Any]]]:
+        """
+        Query every configured retriever, concurrently when there are several
+        
+        Args:
+            query: Search query
+            top_k: Results per retriever
+            document_id: Optional filter by document ID
+            query_vector: Precomputed FAISS query embedding
+        
+        Returns:
+            One best-first result list per retriever
+        """
+        searches = []
+        if self.faiss:
+            searches.append((self.faiss.search, (query, top_k, document_id, query_vector)))
+        if self.txtai:
+            searches.append((self.txtai.search, (query, top_k, document_id)))
+        
+        if len(searches) < 2:
+            return [search(*args) for search, args in searches]
+        
+        with ThreadPoolExecutor(max_workers=len(searches)) as pool:
+            futures = [pool.submit(search, *args) for search, args in searches]
+            return [future.result() for future in futures]
+    
+    def _fuse_results(self, ranked_lists: List[List[Dict]]) -> List[Dict]:
+        """
+        Merge retriever outputs with reciprocal rank fusion
+        
+        Retrievers score on incompatible scales (FAISS returns L2 distances,
+        txtai similarities), so only ranks are combined. A chunk returned by
+        several retrievers accumulates one term per list.
+        
+        Args:
+            ranked_lists: Best-first result lists, one per retriever
+        
+        Returns:
+            One result per distinct text, with 'score' set to the fused score
+        """
+        fused: Dict[str, Dict] = {}
+        scores: Dict[str, float] = {}
+        
+        for ranked in ranked_lists:
+            for rank, result in enumerate(ranked, 1):
+                text = result.get('text', '')
+                scores[text] = scores.get(text, 0.0) + 1.0 / (RRF_K + rank)
+                fused.setdefault(text, result)
+        
+        return [dict(result, score=scores[text]) for text, result in fused.items()]
+    
     def _deduplicate_results(self, results: List[Dict], top_k: int) -> List[Dict]:
         """
         Deduplicate and re-rank results from multiple sources
@@ -199,16 +342,16 @@ Answer:"""
         Returns:
             Deduplicated and ranked results
         """
-        # Simple deduplication by text similarity
-        seen_texts = set()
+        # Near-duplicate collapse: skip a candidate whose SimHash is within
+        # SIMHASH_MAX_DISTANCE bits of an accepted one (at most top_k compares)
+        accepted = []
         unique_results = []
         
-        for result in sorted(results, key=lambda x: x.get('score', 0), reverse=True):
-            text = result.get('text', '')
-            text_key = text[:100]  # Use first 100 chars as key
+        for result in _best_first(results, top_k):
+            fingerprint = _simhash(result.get('text', ''))
             
-            if text_key not in seen_texts:
-                seen_texts.add(text_key)
+            if all((fingerprint ^ other).bit_count() > SIMHASH_MAX_DISTANCE for other in accepted):
+                accepted.append(fingerprint)
                 unique_results.append(result)
             
             if len(unique_results) >= top_k:
@@ -216,6 +359,12 @@ Answer:"""
         
         return unique_results
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get semantic retrieval cache statistics"""
+        if self._query_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self._query_cache.get_stats()}
+    
     def get_document_summary(self, document_id: str, max_length: int = 500) -> str:
         """
         Generate summary of a document using RAG
@@ -3,20 +3,38 @@ Server-Sent Events (SSE) Support
 Streaming responses for chat
 """
 import logging
-import json
+import threading
 import time
+import orjson
 from flask import Response, stream_with_context
-from typing import Generator, Dict, Any
-from queue import Queue, Empty
+from typing import Generator, Dict, Any, Iterator, List, Union
+from queue import Queue, Empty, Full
+from app.utils.json_provider import ORJSON_OPTIONS
 
 logger = logging.getLogger(__name__)
 
+# Seconds an idle event stream waits before sending a keep-alive
+KEEPALIVE_INTERVAL = 15
+
+# Per-session event backlog; a full queue sheds its oldest events
+EVENT_QUEUE_SIZE = 1024
+
+# Seconds between shared Celery status polls; each poll reads every watched
+# task from the result backend once, matching the old per-stream 1 s cadence
+PROGRESS_POLL_INTERVAL = 1.0
+
+# Task states after which progress streams end
+_TERMINAL_STATES = frozenset(('SUCCESS', 'FAILURE'))
+
+# Pre-serialized keep-alive frame
+_KEEPALIVE_FRAME = b'data: {"type":"keepalive"}\n\n'
+
 
 class SSEManager:
     """Manage Server-Sent Events streaming"""
     
     @staticmethod
-    def create_sse_response(data: Dict[str, Any]) -> str:
+    def create_sse_response(data: Dict[str, Any]) -> bytes:
         """
         Format data as SSE message
         
@@ -26,7 +44,7 @@ class SSEManager:
         Returns:
             Formatted SSE message
         """
-        return f"data: {json.dumps(data)}\n\n"
+        return b"data: %b\n\n" % orjson.dumps(data, option=ORJSON_OPTIONS)
     
     @staticmethod
     def stream_generator(generator_func) -> Generator:
@@ -34,14 +52,18 @@ class SSEManager:
         Wrap generator function for SSE streaming
         
         Args:
-            generator_func: Generator function that yields data
+            generator_func: Generator function that yields data dicts or
+                ready-made SSE frames (bytes)
         
         Yields:
             SSE-formatted messages
         """
         try:
             for data in generator_func():
-                yield SSEManager.create_sse_response(data)
+                if isinstance(data, bytes):
+                    yield data
+                else:
+                    yield SSEManager.create_sse_response(data)
         except Exception as e:
             logger.error(f"Stream error: {e}")
             yield SSEManager.create_sse_response({
@@ -81,7 +103,7 @@ class ChatStreamManager:
     def stream_chat_response(self, question: str, context: str,
                             memory_id: str = None) -> Generator:
         """
-        Stream chat response word by word
+        Stream chat response token by token as it is generated
         
         Args:
             question: User question
@@ -89,7 +111,8 @@ class ChatStreamManager:
             memory_id: Memory ID for context
         
         Yields:
-            Response chunks
+            Response chunks, ending with an end event, or an error event if
+            generation fails
         """
         # Send start event
         yield {
@@ -98,24 +121,31 @@ class ChatStreamManager:
             'memory_id': memory_id
         }
         
-        # Generate response (mock implementation)
-        response_text = self._generate_response(question, context)
-        
-        # Stream word by word
-        words = response_text.split()
-        for i, word in enumerate(words):
+        # Forward tokens as the model produces them
+        parts = []
+        try:
+            for i, token in enumerate(self._stream_response(question, context)):
+                parts.append(token)
+                yield {
+                    'type': 'token',
+                    'content': token,
+                    'index': i
+                }
+        except Exception as e:
+            # Generation failed mid-stream: the partial text is not an answer
+            logger.error(f"Chat stream error: {e}")
             yield {
-                'type': 'token',
-                'content': word + ' ',
-                'index': i
+                'type': 'error',
+                'message': 'Response generation failed',
+                'partial_response': ''.join(parts).strip()
             }
-            time.sleep(0.05)  # Simulate streaming delay
+            return
         
         # Send end event
         yield {
             'type': 'end',
             'message': 'Response complete',
-            'full_response': response_text
+            'full_response': ''.join(parts).strip()
         }
     
     def stream_analysis_progress(self, task_id: str) -> Generator:
@@ -126,49 +156,55 @@ class ChatStreamManager:
             task_id: Task identifier
         
         Yields:
-            Progress updates
+            Progress updates when the task's status changes, keep-alive
+            frames while it does not
         """
-        from celery_worker import get_task_status
-        
-        while True:
-            status = get_task_status(task_id)
-            
-            yield {
-                'type': 'progress',
-                'task_id': task_id,
-                'state': status['state'],
-                'progress': status.get('progress', 0),
-                'status': status.get('status', ''),
-                'current_step': status.get('current_step', '')
-            }
-            
-            # Check if complete
-            if status['state'] in ['SUCCESS', 'FAILURE']:
-                break
-            
-            time.sleep(1)  # Poll every second
+        queue = progress_watcher.subscribe(task_id)
+        try:
+            while True:
+                try:
+                    event = queue.get(timeout=KEEPALIVE_INTERVAL)
+                except Empty:
+                    yield _KEEPALIVE_FRAME
+                    continue
+                
+                yield event
+                
+                # Check if complete
+                if event['type'] == 'error' or event['state'] in _TERMINAL_STATES:
+                    break
+        finally:
+            progress_watcher.unsubscribe(task_id, queue)
     
-    def _generate_response(self, question: str, context: str) -> str:
-        """Generate response (would use actual LLM)"""
+    def _stream_response(self, question: str, context: str) -> Iterator[str]:
+        """Stream response tokens from the LLM (mock text without an LLM)"""
         if self.llm_service:
             # Use actual LLM service
             prompt = f"Context: {context}\n\nQuestion: {question}\n\nAnswer:"
-            return self.llm_service.generate(prompt)
+            return self.llm_service.stream(prompt, query=question, context=context)
         else:
-            # Mock response
-            return f"Based on the context provided, here's an answer to your question: {question}. This is a mock response that would be replaced with actual LLM generation in production."
+            # Mock response, word by word
+            response = f"Based on the context provided, here's an answer to your question: {question}. This is a mock response that would be replaced with actual LLM generation in production."
+            return (word + ' ' for word in response.split())
 
 
 class EventQueue:
     """Thread-safe event queue for SSE"""
     
-    def __init__(self):
-        """Initialize event queue"""
+    def __init__(self, maxsize: int = EVENT_QUEUE_SIZE):
+        """
+        Initialize event queue
+        
+        Args:
+            maxsize: Maximum queued events per session
+        """
         self.queues = {}
+        self.maxsize = maxsize
+        self.overflow_count = 0
     
     def create_queue(self, session_id: str) -> Queue:
         """Create queue for session"""
-        queue = Queue()
+        queue = Queue(maxsize=self.maxsize)
         self.queues[session_id] = queue
         return queue
     
@@ -181,32 +217,75 @@ class EventQueue:
         if session_id in self.queues:
             del self.queues[session_id]
     
-    def send_event(self, session_id: str, event: Dict[str, Any]):
-        """Send event to session queue"""
+    def send_event(self, session_id: str, event: Dict[str, Any]) -> bool:
+        """
+        Send event to session queue without blocking the producer
+        
+        When a slow client has let the queue fill up, the oldest queued event
+        is discarded to make room, so end/error events still get through.
+        
+        Args:
+            session_id: Session identifier
+            event: Event to send
+        
+        Returns:
+            True if the event was queued
+        """
         queue = self.get_queue(session_id)
-        if queue:
-            queue.put(event)
+        if not queue:
+            return False
+        
+        while True:
+            try:
+                queue.put_nowait(event)
+                return True
+            except Full:
+                try:
+                    dropped = queue.get_nowait()
+                except Empty:
+                    continue
+                self.overflow_count += 1
+                logger.debug(
+                    f"Event queue full for session {session_id}; "
+                    f"dropped {dropped.get('type')} event"
+                )
     
-    def stream_events(self, session_id: str, timeout: int = 30) -> Generator:
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        return {
+            'sessions': len(self.queues),
+            'queued_events': sum(queue.qsize() for queue in list(self.queues.values())),
+            'overflow_count': self.overflow_count
+        }
+    
+    def stream_events(self, session_id: str, timeout: int = 30,
+                      keepalive_interval: float = KEEPALIVE_INTERVAL
+                      ) -> Iterator[Union[Dict[str, Any], bytes]]:
         """
         Stream events from queue
         
+        Blocks until an event arrives, the keep-alive interval passes or the
+        timeout is reached; under eventlet workers the wait parks a green
+        thread rather than polling.
+        
         Args:
             session_id: Session identifier
             timeout: Timeout in seconds
+            keepalive_interval: Idle seconds between keep-alive events
         
         Yields:
-            Events from queue
+            Events from queue; keep-alives as a pre-serialized SSE frame
         """
         queue = self.get_queue(session_id)
         if not queue:
             return
         
-        start_time = time.time()
+        deadline = time.monotonic() + timeout
         
         while True:
             # Check timeout
-            if time.time() - start_time > timeout:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 yield {
                     'type': 'timeout',
                     'message': 'Connection timeout'
@@ -214,25 +293,139 @@ class EventQueue:
                 break
             
             try:
-                # Get event with short timeout to check for disconnection
-                event = queue.get(timeout=1)
+                event = queue.get(timeout=min(keepalive_interval, remaining))
                 yield event
                 
                 # Check for end event
                 if event.get('type') == 'end':
                     break
-                    
+            
             except Empty:
-                # Send keep-alive
-                yield {
-                    'type': 'keepalive',
-                    'timestamp': time.time()
-                }
+                # Send keep-alive unless the wait ran into the deadline
+                if time.monotonic() < deadline:
+                    yield _KEEPALIVE_FRAME
+
+
+class ProgressWatcher:
+    """
+    Shared Celery task status poller
+    
+    One background thread polls each watched task once per interval, however
+    many streams follow it, and publishes an event to every subscriber queue
+    when the status changes. The thread exits when nothing is watched.
+    """
+    
+    def __init__(self, poll_interval: float = PROGRESS_POLL_INTERVAL):
+        """
+        Initialize progress watcher
+        
+        Args:
+            poll_interval: Seconds between status polls
+        """
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[str, List[Queue]] = {}
+        self._last_events: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def subscribe(self, task_id: str) -> Queue:
+        """
+        Follow a task's progress
+        
+        Args:
+            task_id: Task identifier
+        
+        Returns:
+            Queue receiving progress events, starting with the latest known one
+        """
+        queue = Queue()
+        with self._lock:
+            self._subscribers.setdefault(task_id, []).append(queue)
+            last_event = self._last_events.get(task_id)
+            if last_event is not None:
+                queue.put(last_event)
+            
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='sse-progress-watcher', daemon=True
+                )
+                self._thread.start()
+        return queue
+    
+    def unsubscribe(self, task_id: str, queue: Queue):
+        """Stop delivering a task's progress to queue"""
+        with self._lock:
+            queues = self._subscribers.get(task_id)
+            if queues and queue in queues:
+                queues.remove(queue)
+            if not queues:
+                self._subscribers.pop(task_id, None)
+                self._last_events.pop(task_id, None)
+    
+    def _run(self):
+        """
+        Poll watched tasks until none are left
+        
+        If polling itself fails, every current subscriber gets an error event
+        and the thread slot is freed, so the next subscriber starts a new
+        poller instead of waiting on a dead one.
+        """
+        try:
+            self._poll()
+        except Exception as e:
+            logger.error(f"Progress watcher stopped: {e}")
+            with self._lock:
+                for task_id, queues in self._subscribers.items():
+                    event = {'type': 'error', 'task_id': task_id, 'error': str(e)}
+                    for queue in queues:
+                        queue.put(event)
+        finally:
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+    
+    def _poll(self):
+        """Poll loop; returns once no task is watched"""
+        from celery_worker import get_task_status
+        
+        while True:
+            with self._lock:
+                task_ids = list(self._subscribers)
+                if not task_ids:
+                    self._thread = None
+                    return
+            
+            for task_id in task_ids:
+                try:
+                    status = get_task_status(task_id)
+                    event = {
+                        'type': 'progress',
+                        'task_id': task_id,
+                        'state': status['state'],
+                        'progress': status.get('progress', 0),
+                        'status': status.get('status', ''),
+                        'current_step': status.get('current_step', '')
+                    }
+                except Exception as e:
+                    logger.error(f"Progress poll error for task {task_id}: {e}")
+                    event = {'type': 'error', 'task_id': task_id, 'error': str(e)}
+                
+                with self._lock:
+                    if task_id not in self._subscribers or self._last_events.get(task_id) == event:
+                        continue
+                    self._last_events[task_id] = event
+                    for queue in self._subscribers[task_id]:
+                        queue.put(event)
+            
+            time.sleep(self.poll_interval)
 
 
 # Global event queue instance
 event_queue = EventQueue()
 
+# Global progress watcher instance
+progress_watcher = ProgressWatcher()
+
 
 def stream_chat(question: str, context: str, memory_id: str = None,
                 llm_service=None) -> Response:
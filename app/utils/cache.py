@@ -10,6 +10,12 @@ from typing import Any, Optional, Callable
 import redis
 from flask import current_app
 
+try:
+    from xxhash import xxh3_64_hexdigest as _key_digest
+except ImportError:
+    def _key_digest(data: bytes) -> str:
+        return hashlib.md5(data).hexdigest()
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,13 +50,25 @@ class RedisCache:
         """Get Redis client"""
         return self._client if self._enabled else None
     
-    def get(self, key: str) -> Optional[Any]:
-        """Get value from cache"""
+    def get(self, key: str, refresh_ttl: Optional[int] = None) -> Optional[Any]:
+        """
+        Get value from cache
+        
+        Args:
+            key: Cache key
+            refresh_ttl: If set, reset the key's expiration on access (sliding TTL)
+        
+        Returns:
+            Cached value or None
+        """
         if not self._enabled:
             return None
         
         try:
-            value = self._client.get(key)
+            if refresh_ttl:
+                value = self._client.getex(key, ex=refresh_ttl)
+            else:
+                value = self._client.get(key)
             if value:
                 return json.loads(value)
         except (redis.RedisError, json.JSONDecodeError) as e:
@@ -114,11 +132,11 @@ cache = RedisCache()
 
 
 def generate_cache_key(*args, **kwargs) -> str:
-    """Generate a unique cache key from arguments"""
-    key_parts = [str(arg) for arg in args]
-    key_parts.extend(f"{k}:{v}" for k, v in sorted(kwargs.items()))
-    key_string = "|".join(key_parts)
-    return hashlib.md5(key_string.encode()).hexdigest()
+    """Generate a unique cache key from arguments (repr keeps 1 and '1' apart)"""
+    key_string = repr(args)
+    if kwargs:
+        key_string += "|".join([f"{k}={v!r}" for k, v in sorted(kwargs.items())])
+    return _key_digest(key_string.encode())
 
 
 def cached(expiration: Optional[int] = None, key_prefix: str = ""):
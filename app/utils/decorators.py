@@ -5,21 +5,29 @@ Common decorators for routes and functions
 import time
 import logging
 from functools import wraps
+import orjson
 from flask import request, jsonify
 
 logger = logging.getLogger(__name__)
 
+# Static validation error bodies, serialized once
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_ERR_NOT_JSON = orjson.dumps({
+    'error': 'Content-Type must be application/json',
+    'status': 'error'
+})
+
 
 def timing_decorator(f):
     """Decorator to measure function execution time"""
     @wraps(f)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         result = f(*args, **kwargs)
-        end_time = time.time()
-        execution_time = end_time - start_time
         
-        logger.info(f"{f.__name__} executed in {execution_time:.4f} seconds")
+        if logger.isEnabledFor(logging.INFO):
+            execution_time = (time.perf_counter_ns() - start_ns) * 1e-9
+            logger.info(f"{f.__name__} executed in {execution_time:.4f} seconds")
         
         return result
     
@@ -36,25 +44,24 @@ def validate_json(required_fields=None):
             data = request.get_json()
             ...
     """
+    fields = tuple(required_fields or ())
+    
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
             if not request.is_json:
-                return jsonify({
-                    'error': 'Content-Type must be application/json',
-                    'status': 'error'
-                }), 400
+                return _ERR_NOT_JSON, 400, _JSON_HEADERS
             
-            data = request.get_json()
-            
-            if required_fields:
-                missing_fields = [field for field in required_fields if field not in data]
+            if fields:
+                data = request.get_json()
+                missing_fields = [field for field in fields if field not in data]
                 if missing_fields:
-                    return jsonify({
+                    body = orjson.dumps({
                         'error': 'Missing required fields',
                         'missing_fields': missing_fields,
                         'status': 'error'
-                    }), 400
+                    })
+                    return body, 400, _JSON_HEADERS
             
             return f(*args, **kwargs)
         
@@ -2,7 +2,10 @@
 File Utilities
 Helper functions for file operations
 """
+import io
 import os
+import shutil
+import time
 import uuid
 import hashlib
 import logging
@@ -11,8 +14,16 @@ from typing import Tuple, Optional
 from werkzeug.utils import secure_filename
 from flask import current_app
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 logger = logging.getLogger(__name__)
 
+# Copy buffer for uploads that cannot be copied in-kernel
+_COPY_BUFFER_SIZE = 1024 * 1024
+
 
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed"""
@@ -58,15 +69,67 @@ def save_uploaded_file(file, upload_folder: Optional[Path] = None) -> Tuple[str,
     filepath = folder / unique_filename
     
     # Save file
-    file.save(str(filepath))
+    _write_upload(file.stream, filepath)
     logger.info(f"File saved: {filepath}")
     
     return str(filepath), original_filename
 
 
+def _write_upload(stream, filepath: Path):
+    """
+    Write an upload stream to filepath with as few copies as possible
+    
+    Werkzeug hands uploads over as a SpooledTemporaryFile: small ones are
+    still held in an in-memory buffer and are written in one call, large ones
+    have rolled over to a temporary file and are copied in-kernel with
+    sendfile, without passing through Python buffers.
+    """
+    # Unrolled SpooledTemporaryFile: use its buffer directly, since calling
+    # fileno() on it would force a rollover to disk
+    if not getattr(stream, '_rolled', True):
+        stream = getattr(stream, '_file', stream)
+    
+    with open(filepath, 'wb') as out:
+        if isinstance(stream, io.BytesIO):
+            out.write(stream.getbuffer()[stream.tell():])
+            return
+        
+        try:
+            in_fd = stream.fileno()
+            offset = stream.tell()
+            remaining = os.fstat(in_fd).st_size - offset
+            while remaining > 0:
+                sent = os.sendfile(out.fileno(), in_fd, offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+            return
+        except (AttributeError, io.UnsupportedOperation, OSError):
+            # No real file descriptor (or no sendfile): buffered copy
+            out.seek(0)
+            out.truncate()
+        
+        shutil.copyfileobj(stream, out, _COPY_BUFFER_SIZE)
+
+
 def get_file_hash(filepath: str, algorithm: str = 'sha256') -> str:
-    """Calculate file hash"""
-    hash_func = hashlib.new(algorithm)
+    """
+    Calculate file hash
+    
+    Args:
+        filepath: File to hash
+        algorithm: hashlib algorithm name, or 'xxh3_128' for a fast
+            non-cryptographic digest (cache keys, dedup); falls back to
+            sha256 when xxhash is not installed
+    
+    Returns:
+        Hex digest
+    """
+    if algorithm == 'xxh3_128':
+        hash_func = xxhash.xxh3_128() if xxhash is not None else hashlib.sha256()
+    else:
+        hash_func = hashlib.new(algorithm)
     
     with open(filepath, 'rb') as f:
         for chunk in iter(lambda: f.read(8192), b''):
@@ -115,8 +178,6 @@ def cleanup_old_files(directory: Path, max_age_hours: int = 24):
         directory: Directory to clean
         max_age_hours: Maximum file age in hours
     """
-    import time
-    
     if not directory.exists():
         return
     
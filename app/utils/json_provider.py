@@ -0,0 +1,71 @@
+"""
+orjson-backed JSON provider for Flask
+Used by jsonify, request.get_json and app.json
+"""
+from typing import Any
+import orjson
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import BadRequest
+
+# Non-string keys and NumPy values appear in analysis results
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class OrJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes with orjson
+    
+    Honors sort_keys (app.json.sort_keys, on by default as in Flask) and
+    indent; orjson only indents by two spaces, so any indent maps to that.
+    """
+    
+    def _options(self, sort_keys: bool, indent: Any) -> int:
+        """orjson option flags for the given dumps-style arguments"""
+        option = ORJSON_OPTIONS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize obj to a JSON string"""
+        option = self._options(
+            kwargs.get('sort_keys', self.sort_keys),
+            kwargs.get('indent')
+        )
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize JSON from str or bytes"""
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """Build a JSON response from bytes, skipping the str round-trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        # Pretty-print like DefaultJSONProvider: when compact is off, or
+        # unset in debug mode
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(
+            obj,
+            default=self.default,
+            option=self._options(self.sort_keys, indent) | orjson.OPT_APPEND_NEWLINE
+        )
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def load_request_json() -> Any:
+    """
+    Parse the request body straight from bytes with orjson
+    
+    Unlike request.get_json(), the raw body is not kept on the request, so
+    large payloads are held only once (as the parsed object).
+    
+    Returns:
+        Parsed JSON value
+    """
+    try:
+        return orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError as e:
+        raise BadRequest('Invalid JSON body') from e
@@ -3,8 +3,25 @@ Response Formatter
 Standardized API response formatting
 """
 from typing import Any, Dict, Optional
-from flask import jsonify
 from datetime import datetime
+from flask import current_app
+
+
+def json_response(payload: Any, status_code: int = 200) -> tuple:
+    """
+    Serialize payload straight to a JSON response through the app's provider
+    
+    The orjson provider serializes to bytes directly and keeps Flask's
+    default= fallback (Decimal, dataclasses, __html__) and trailing newline.
+    
+    Args:
+        payload: JSON-serializable data (NumPy arrays included)
+        status_code: HTTP status code
+    
+    Returns:
+        Tuple of (response, status_code)
+    """
+    return current_app.json.response(payload), status_code
 
 
 def success_response(data: Any = None, message: Optional[str] = None, 
@@ -35,7 +52,7 @@ def success_response(data: Any = None, message: Optional[str] = None,
     # Add any additional fields
     response.update(kwargs)
     
-    return jsonify(response), status_code
+    return json_response(response, status_code)
 
 
 def error_response(error: str, message: Optional[str] = None, 
@@ -64,7 +81,7 @@ def error_response(error: str, message: Optional[str] = None,
     # Add any additional fields
     response.update(kwargs)
     
-    return jsonify(response), status_code
+    return json_response(response, status_code)
 
 
 def paginated_response(items: list, total: int, page: int = 1, 
@@ -101,7 +118,7 @@ def paginated_response(items: list, total: int, page: int = 1,
     # Add any additional fields
     response.update(kwargs)
     
-    return jsonify(response), 200
+    return json_response(response, 200)
 
 
 def analysis_response(document_structure: list, 
@@ -137,7 +154,7 @@ def analysis_response(document_structure: list,
     # Add any additional fields
     response.update(kwargs)
     
-    return jsonify(response), 200
+    return json_response(response, 200)
 
 
 def validation_error_response(errors: Dict[str, Any]) -> tuple:
@@ -10,6 +10,9 @@ import pickle
 
 logger = logging.getLogger(__name__)
 
+# Chunks per embedding model forward pass
+EMBED_BATCH_SIZE = 64
+
 
 class FAISSService:
     """
@@ -71,6 +74,28 @@ class FAISSService:
             logger.error(f"Error initializing FAISS: {e}")
             self.index = None
     
+    def embed_texts(self, texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Embed text chunks in batches
+        
+        Args:
+            texts: Text chunks
+        
+        Returns:
+            C-contiguous float32 array of shape (len(texts), dimension),
+            or None if not initialized
+        """
+        if not self.embeddings_model:
+            return None
+        
+        embeddings = self.embeddings_model.encode(
+            texts,
+            batch_size=EMBED_BATCH_SIZE,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
     def add_documents(self, document_id: str, texts: List[str], 
                      metadata: Optional[Dict] = None) -> bool:
         """
@@ -90,8 +115,7 @@ class FAISSService:
         
         try:
             # Generate embeddings
-            embeddings = self.embeddings_model.encode(texts, show_progress_bar=False)
-            embeddings = np.array(embeddings).astype('float32')
+            embeddings = self.embed_texts(texts)
             
             # Train index if using IVF and not trained
             if self.use_ivf and not self.index.is_trained:
@@ -124,8 +148,25 @@ class FAISSService:
             logger.error(f"Error adding documents to FAISS: {e}")
             return False
     
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """
+        Embed a search query
+        
+        Args:
+            query: Search query
+        
+        Returns:
+            float32 array of shape (1, dimension), or None if not initialized
+        """
+        if not self.embeddings_model:
+            return None
+        
+        query_embedding = self.embeddings_model.encode([query], show_progress_bar=False)
+        return np.asarray(query_embedding, dtype=np.float32)
+    
     def search(self, query: str, top_k: int = 5, 
-              document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+              document_id: Optional[str] = None,
+              query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
         """
         Search for similar texts
         
@@ -133,6 +174,7 @@ class FAISSService:
             query: Search query
             top_k: Number of results to return
             document_id: Optional filter by document ID
+            query_embedding: Precomputed embed_query() result for query
         
         Returns:
             List of results with scores and metadata
@@ -147,8 +189,8 @@ class FAISSService:
         
         try:
             # Generate query embedding
-            query_embedding = self.embeddings_model.encode([query], show_progress_bar=False)
-            query_embedding = np.array(query_embedding).astype('float32')
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
             # Search
             distances, indices = self.index.search(query_embedding, top_k * 2)  # Get more for filtering
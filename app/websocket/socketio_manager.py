@@ -2,6 +2,7 @@
 WebSocket Support with Socket.IO
 Real-time updates for analysis progress
 """
+import os
 import logging
 from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
 from flask import request
@@ -12,7 +13,7 @@ logger = logging.getLogger(__name__)
 # Initialize Socket.IO
 socketio = SocketIO(
     cors_allowed_origins="*",
-    async_mode='threading',
+    async_mode=os.getenv('SOCKETIO_ASYNC_MODE', 'threading'),
     logger=True,
     engineio_logger=True
 )
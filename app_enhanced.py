@@ -14,15 +14,24 @@ Includes all high-priority improvements:
 """
 import os
 import logging
-from flask import Flask, send_from_directory
-from flask_cors import CORS
+import importlib
+import orjson
+from flask import Flask, Response, jsonify, send_from_directory
 
 # Import configurations
 from config import config
 
+# Import authentication
+from app.auth.jwt_manager import init_jwt_manager, init_user_store
+from app.utils.cache import cache
+from app.utils.json_provider import OrJSONProvider
+
 # Import middleware
+from app.middleware.auth_middleware import init_auth
+from app.middleware.cors import init_cors
+from app.middleware.fast_path import init_fast_paths
 from app.middleware.rate_limiter import limiter
-from app.monitoring.prometheus_metrics import PrometheusMiddleware
+from app.monitoring.prometheus_metrics import PrometheusMiddleware, render_metrics
 
 # Import WebSocket
 from app.websocket.socketio_manager import WebSocketManager, socketio
@@ -32,6 +41,17 @@ from app.docs.swagger_config import swagger_blueprint, api_spec_blueprint
 
 logger = logging.getLogger(__name__)
 
+# Route blueprints: (module path, attribute, url prefix), imported lazily
+_BLUEPRINTS = (
+    ('app.routes.auth_routes', 'bp', '/api/auth'),
+    ('app.routes.analysis_routes', 'bp', '/api/analysis'),
+    ('app.routes.image_routes', 'bp', '/api/images'),
+    ('app.routes.similarity_routes', 'bp', '/api/similarity'),
+    ('app.routes.ai_detector_routes', 'bp', '/api/ai-detect'),
+    ('app.routes.chat_routes', 'bp', '/api/chat'),
+    ('app.routes.task_routes', 'bp', '/api/tasks'),
+)
+
 
 def create_app(config_name='default'):
     """
@@ -47,19 +67,18 @@ def create_app(config_name='default'):
     
     # Load configuration
     app.config.from_object(config[config_name])
+    app.json = OrJSONProvider(app)
     config[config_name].init_app()
     
-    # Enable CORS
-    CORS(app, resources={
-        r"/api/*": {"origins": "*"},
-        r"/socket.io/*": {"origins": "*"}
-    })
+    # Enable CORS (Socket.IO handles its own origins)
+    init_cors(app)
     
     # Initialize extensions
     initialize_extensions(app)
     
-    # Register blueprints
+    # Register blueprints and root endpoints
     register_blueprints(app)
+    register_root_routes(app)
     
     # Setup middleware
     setup_middleware(app)
@@ -70,6 +89,12 @@ def create_app(config_name='default'):
     # Setup documentation
     setup_documentation(app)
     
+    # Probe endpoints served before Flask dispatch
+    init_fast_paths(app, {
+        '/health': lambda: (_HEALTH_BYTES, 'application/json'),
+        '/metrics': render_metrics
+    })
+    
     logger.info(f"Application created in {app.config['FLASK_ENV']} mode")
     
     return app
@@ -78,6 +103,17 @@ def create_app(config_name='default'):
 def initialize_extensions(app):
     """Initialize Flask extensions"""
     
+    # Redis cache
+    cache.init_app(app)
+    
+    # API key and JWT Authentication
+    init_auth(app)
+    init_jwt_manager(app)
+    init_user_store(
+        cache.client,
+        seed_defaults=not app.config.get('SKIP_DEFAULT_USERS')
+    )
+    
     # Rate Limiter
     limiter.init_app(app)
     logger.info("Rate limiter initialized")
@@ -94,39 +130,34 @@ def initialize_extensions(app):
 def register_blueprints(app):
     """Register all blueprints"""
     
-    # Import routes
-    from app.routes import (
-        auth_routes,
-        analysis_routes,
-        image_routes,
-        similarity_routes,
-        ai_detector_routes,
-        chat_routes,
-        task_routes
-    )
-    
-    # Authentication routes
-    app.register_blueprint(auth_routes.bp, url_prefix='/api/auth')
+    for module_path, attr, url_prefix in _BLUEPRINTS:
+        bp = getattr(importlib.import_module(module_path), attr)
+        app.register_blueprint(bp, url_prefix=url_prefix)
     
-    # Analysis routes
-    app.register_blueprint(analysis_routes.bp, url_prefix='/api/analysis')
-    
-    # Image routes
-    app.register_blueprint(image_routes.bp, url_prefix='/api/images')
-    
-    # Similarity routes
-    app.register_blueprint(similarity_routes.bp, url_prefix='/api/similarity')
-    
-    # AI Detection routes
-    app.register_blueprint(ai_detector_routes.bp, url_prefix='/api/ai-detect')
+    logger.info("Blueprints registered")
+
+
+def register_root_routes(app):
+    """Register frontend, health and API info endpoints"""
     
-    # Chat routes
-    app.register_blueprint(chat_routes.bp, url_prefix='/api/chat')
+    @app.route('/')
+    def index():
+        """Serve frontend"""
+        return send_from_directory('app/static', 'index.html')
     
-    # Task management routes
-    app.register_blueprint(task_routes.bp, url_prefix='/api/tasks')
+    @app.route('/health')
+    def health_check():
+        """Health check endpoint"""
+        return Response(
+            _HEALTH_BYTES,
+            mimetype='application/json',
+            headers={'Cache-Control': 'no-cache'}
+        )
     
-    logger.info("Blueprints registered")
+    @app.route('/api')
+    def api_info():
+        """API information"""
+        return Response(_API_INFO_BYTES, mimetype='application/json')
 
 
 def setup_middleware(app):
@@ -151,7 +182,6 @@ def register_error_handlers(app):
     
     @app.errorhandler(404)
     def not_found(error):
-        from flask import jsonify
         return jsonify({
             'error': 'Resource not found',
             'status': 'error'
@@ -159,7 +189,6 @@ def register_error_handlers(app):
     
     @app.errorhandler(500)
     def internal_error(error):
-        from flask import jsonify
         logger.exception("Internal server error")
         return jsonify({
             'error': 'Internal server error',
@@ -168,7 +197,6 @@ def register_error_handlers(app):
     
     @app.errorhandler(429)
     def rate_limit_exceeded(error):
-        from flask import jsonify
         return jsonify({
             'error': 'Rate limit exceeded',
             'status': 'error',
@@ -186,63 +214,48 @@ def setup_documentation(app):
     logger.info("API documentation configured at /api/docs")
 
 
-# Root endpoints
-@app.route('/')
-def index():
-    """Serve frontend"""
-    return send_from_directory('app/static', 'index.html')
-
-
-@app.route('/health')
-def health_check():
-    """Health check endpoint"""
-    from flask import jsonify
-    return jsonify({
-        'status': 'healthy',
-        'service': 'Intelligent Analysis System',
-        'version': '2.0.0',
-        'features': {
-            'celery': True,
-            'jwt': True,
-            'websocket': True,
-            'rate_limiting': True,
-            'prometheus': True,
-            'swagger': True
-        }
-    }), 200
-
+# Static info payloads, serialized once at import
+_HEALTH_BYTES = orjson.dumps({
+    'status': 'healthy',
+    'service': 'Intelligent Analysis System',
+    'version': '2.0.0',
+    'features': {
+        'celery': True,
+        'jwt': True,
+        'websocket': True,
+        'rate_limiting': True,
+        'prometheus': True,
+        'swagger': True
+    }
+})
 
-@app.route('/api')
-def api_info():
-    """API information"""
-    from flask import jsonify
-    return jsonify({
-        'service': 'Intelligent Analysis System API',
-        'version': '2.0.0',
-        'documentation': '/api/docs',
-        'health': '/health',
-        'metrics': '/metrics',
-        'endpoints': {
-            'auth': '/api/auth/*',
-            'analysis': '/api/analysis/*',
-            'tasks': '/api/tasks/*',
-            'chat': '/api/chat/*',
-            'images': '/api/images/*',
-            'similarity': '/api/similarity/*',
-            'ai_detect': '/api/ai-detect/*'
-        },
-        'websocket': '/socket.io/',
-        'features': [
-            'JWT Authentication',
-            'Celery Task Queue',
-            'Real-time WebSocket',
-            'Rate Limiting per User',
-            'RAGAS Evaluation',
-            'SSE Streaming',
-            'Model Versioning',
-            'Prometheus Metrics'
-        ]
-    }), 200
+_API_INFO_BYTES = orjson.dumps({
+    'service': 'Intelligent Analysis System API',
+    'version': '2.0.0',
+    'documentation': '/api/docs',
+    'health': '/health',
+    'metrics': '/metrics',
+    'endpoints': {
+        'auth': '/api/auth/*',
+        'analysis': '/api/analysis/*',
+        'tasks': '/api/tasks/*',
+        'chat': '/api/chat/*',
+        'images': '/api/images/*',
+        'similarity': '/api/similarity/*',
+        'ai_detect': '/api/ai-detect/*'
+    },
+    'websocket': '/socket.io/',
+    'features': [
+        'JWT Authentication',
+        'Celery Task Queue',
+        'Real-time WebSocket',
+        'Rate Limiting per User',
+        'RAGAS Evaluation',
+        'SSE Streaming',
+        'Model Versioning',
+        'Prometheus Metrics'
+    ]
+})
 
 
 # Create app instance
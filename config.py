@@ -100,6 +100,11 @@ class Config:
     API_KEY = os.getenv('API_KEY', 'SECURE_AND_COMPLEX_API_KEY_100M_MVP')
     REQUIRE_API_KEY = os.getenv('REQUIRE_API_KEY', 'true').lower() == 'true'
     
+    # --- JWT ---
+    JWT_CACHE_TTL = int(os.getenv('JWT_CACHE_TTL', 10))  # seconds
+    JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', 10000))
+    SKIP_DEFAULT_USERS = os.getenv('SKIP_DEFAULT_USERS', 'false').lower() == 'true'
+    
     # --- Processing Configuration ---
     MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', 10))
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', 300))  # 5 minutes
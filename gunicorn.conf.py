@@ -0,0 +1,35 @@
+"""
+Gunicorn Configuration
+Eventlet worker for Flask-SocketIO (single worker, green-thread concurrency)
+"""
+import os
+
+# Socket.IO must match the worker's async model
+os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'eventlet')
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Flask-SocketIO's long-polling transport needs every request of a session
+# to reach the same process, and gunicorn cannot route sticky sessions, so
+# one eventlet worker serves both REST and Socket.IO; concurrency comes from
+# green threads.
+#
+# Trade-off: CPU-bound work (Numba kernels, FAISS search, embedding, RAGAS
+# scoring) runs on that worker's single hub and blocks other requests while
+# it runs; only Argon2 is pushed to the eventlet thread pool. This replaces
+# the previous 4 sync workers, which handled no WebSocket traffic at all.
+# For CPU-heavy REST load, run a second REST-only service (e.g. gunicorn
+# with `-k gthread -w 4 wsgi:app`) behind the proxy and route /socket.io/ to
+# this one; emits already fan out across processes through the Redis
+# message queue. GUNICORN_WORKERS > 1 is only safe with the websocket
+# transport alone (clients connecting with transports=['websocket']).
+worker_class = 'eventlet'
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 2000))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+keepalive = 30
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
@@ -0,0 +1,142 @@
+"""
+Memory service search tests
+BM25 keyword search and the switchover to HNSW semantic search
+"""
+import zlib
+
+import numpy as np
+import pytest
+
+from app.services import memory_service
+from app.services.memory_service import MemoryService
+
+# Synonyms share an axis so semantic search can match without a shared word
+TOPIC_AXES = {
+    'car': 0, 'automobile': 0, 'engine': 0,
+    'apple': 1, 'fruit': 1, 'orchard': 1,
+    'river': 2, 'stream': 2, 'water': 2,
+}
+DIMENSION = 16
+
+
+def topic_embedder(text: str) -> np.ndarray:
+    """Topic words weigh heavily; other words add a small hashed component"""
+    vector = np.zeros(DIMENSION, dtype=np.float32)
+    for token in text.lower().split():
+        if token in TOPIC_AXES:
+            vector[TOPIC_AXES[token]] += 10.0
+        else:
+            vector[3 + zlib.crc32(token.encode()) % (DIMENSION - 3)] += 1.0
+    return vector
+
+
+def analysis(text: str) -> dict:
+    return {'document_analysis': {'summary': text, 'sections': [{'text': text}]}}
+
+
+def ids(results) -> list:
+    return [r['memory_id'] for r in results]
+
+
+def test_bm25_ranks_by_term_relevance():
+    service = MemoryService()
+    engine = service.create_memory('doc1', analysis('engine engine engine repair guide'))
+    mixed = service.create_memory('doc2', analysis('engine notes and apple orchard notes'))
+    service.create_memory('doc3', analysis('river water quality report'))
+    
+    results = service.search_memories('engine repair')
+    
+    assert ids(results) == [engine, mixed]
+    assert results[0]['score'] > results[1]['score'] > 0
+    assert results[0]['document_id'] == 'doc1'
+
+
+def test_bm25_prefers_rare_terms():
+    service = MemoryService()
+    common = [service.create_memory(f'doc{i}', analysis('quarterly report')) for i in range(4)]
+    rare = service.create_memory('rare', analysis('audit findings'))
+    
+    results = service.search_memories('report audit')
+    
+    assert ids(results)[0] == rare
+    assert set(ids(results)[1:]) == set(common)
+
+
+def test_bm25_limit_and_no_match():
+    service = MemoryService()
+    for i in range(5):
+        service.create_memory(f'doc{i}', analysis(f'shared term {i}'))
+    
+    assert len(service.search_memories('shared', limit=3)) == 3
+    assert service.search_memories('absent') == []
+    assert service.search_memories('   ') == []
+
+
+def test_bm25_follows_updates_and_deletes():
+    service = MemoryService()
+    first = service.create_memory('doc1', analysis('apple orchard'))
+    second = service.create_memory('doc2', analysis('river stream'))
+    
+    service.update_memory(first, {'analysis_results': analysis('car engine')})
+    assert service.search_memories('apple') == []
+    assert ids(service.search_memories('engine')) == [first]
+    
+    service.delete_memory(second)
+    assert service.search_memories('river') == []
+    assert service._postings.keys() == {'car', 'engine'}
+
+
+@pytest.fixture
+def semantic_service(monkeypatch):
+    pytest.importorskip('faiss')
+    monkeypatch.setattr(memory_service, 'ANN_MIN_MEMORIES', 4)
+    return MemoryService(embedder=topic_embedder)
+
+
+def test_switches_to_semantic_search_at_threshold(semantic_service):
+    service = semantic_service
+    car = service.create_memory('doc1', analysis('car maintenance schedule'))
+    service.create_memory('doc2', analysis('apple harvest'))
+    service.create_memory('doc3', analysis('river levels'))
+    
+    # Below the threshold: BM25, which needs a shared word
+    assert service.search_memories('automobile') == []
+    
+    service.create_memory('doc4', analysis('meeting minutes'))
+    
+    results = service.search_memories('automobile', limit=2)
+    assert ids(results)[0] == car
+    assert results[0]['score'] == pytest.approx(1.0, abs=0.05)
+    assert len(results) == 2
+
+
+def test_falls_back_to_bm25_below_threshold(semantic_service):
+    service = semantic_service
+    memories = [
+        service.create_memory(f'doc{i}', analysis(text))
+        for i, text in enumerate(['car manual', 'apple pie', 'river trip', 'misc notes'])
+    ]
+    assert ids(service.search_memories('fruit', limit=1)) == [memories[1]]
+    
+    service.delete_memory(memories[3])
+    
+    assert service.search_memories('fruit') == []
+    assert ids(service.search_memories('apple')) == [memories[1]]
+
+
+def test_semantic_search_skips_stale_entries(semantic_service):
+    service = semantic_service
+    memories = [
+        service.create_memory(f'doc{i}', analysis(text))
+        for i, text in enumerate(['car manual', 'apple pie', 'river trip', 'misc notes', 'old notes'])
+    ]
+    
+    # Re-embedding leaves the old vector in the graph as a stale label
+    service.update_memory(memories[0], {'analysis_results': analysis('orchard fruit')})
+    service.delete_memory(memories[2])
+    
+    results = service.search_memories('apple', limit=10)
+    assert len(results) == len(set(ids(results))) == 4
+    assert memories[2] not in ids(results)
+    assert set(ids(results[:2])) == {memories[0], memories[1]}
+    assert ids(service.search_memories('engine', limit=1)) != [memories[0]]
@@ -0,0 +1,178 @@
+"""
+RAG retrieval tests
+Reciprocal rank fusion, SimHash deduplication and the retrieval cache
+"""
+import numpy as np
+import pytest
+
+from app.services.rag_service import RAGService, RRF_K, SIMHASH_MAX_DISTANCE, _simhash
+
+# Chunk-sized texts (chunks are ~500 words); SimHash is only stable to a
+# small edit once a text has enough tokens
+PASSAGE = ' '.join(
+    f"Section {i} reports revenue of {i * 37 % 101} million in region {i * 7 % 13}."
+    for i in range(60)
+)
+OTHER = ' '.join(
+    f"Step {i} installs package {i * 11 % 97} on server {i * 5 % 17} before startup."
+    for i in range(60)
+)
+
+
+def chunk(text: str, score: float = 0.0, **extra) -> dict:
+    return {'text': text, 'score': score, **extra}
+
+
+class FakeFAISS:
+    """FAISS service stand-in returning fixed best-first results"""
+    
+    embeddings_model = object()
+    
+    def __init__(self, results):
+        self.results = results
+        self.searches = 0
+        self.indexed = []
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        vector = np.zeros(8, dtype=np.float32)
+        vector[len(query) % 8] = 1.0
+        return vector
+    
+    def search(self, query, top_k, document_id=None, query_vector=None):
+        self.searches += 1
+        return [dict(r) for r in self.results[:top_k]]
+    
+    def add_documents(self, document_id, texts, metadata=None):
+        self.indexed.append(document_id)
+        return True
+
+
+class FakeTxtai:
+    """txtai service stand-in returning fixed best-first results"""
+    
+    def __init__(self, results):
+        self.results = results
+        self.searches = 0
+    
+    def search(self, query, top_k, document_id=None):
+        self.searches += 1
+        return [dict(r) for r in self.results[:top_k]]
+    
+    def index_documents(self, document_id, texts, metadata=None):
+        return True
+
+
+def test_simhash_near_duplicates():
+    variant = "  " + PASSAGE.upper().replace(" ", "   ") + "  "
+    cited = "[1] " + PASSAGE
+    
+    assert _simhash(PASSAGE) == _simhash(variant)
+    assert (_simhash(PASSAGE) ^ _simhash(cited)).bit_count() <= SIMHASH_MAX_DISTANCE
+    assert (_simhash(PASSAGE) ^ _simhash(OTHER)).bit_count() > SIMHASH_MAX_DISTANCE
+    assert _simhash("") == 0
+
+
+def test_rrf_rewards_agreement_across_retrievers():
+    service = RAGService()
+    faiss_list = [chunk('alpha', 0.1), chunk('beta', 0.2), chunk('gamma', 0.3)]
+    txtai_list = [chunk('delta', 0.9), chunk('beta', 0.8)]
+    
+    fused = {r['text']: r['score'] for r in service._fuse_results([faiss_list, txtai_list])}
+    
+    assert fused['beta'] == pytest.approx(2 / (RRF_K + 2))
+    assert fused['alpha'] == fused['delta'] == pytest.approx(1 / (RRF_K + 1))
+    assert fused['gamma'] == pytest.approx(1 / (RRF_K + 3))
+    assert max(fused, key=fused.get) == 'beta'
+
+
+def test_rrf_ignores_raw_scores_and_keeps_first_metadata():
+    service = RAGService()
+    faiss_list = [chunk('alpha', 1000.0, source='faiss')]
+    txtai_list = [chunk('beta', 0.99), chunk('alpha', 0.01, source='txtai')]
+    
+    fused = {r['text']: r for r in service._fuse_results([faiss_list, txtai_list])}
+    
+    assert fused['alpha']['source'] == 'faiss'
+    assert fused['alpha']['score'] == pytest.approx(1 / (RRF_K + 1) + 1 / (RRF_K + 2))
+    assert faiss_list[0]['score'] == 1000.0
+
+
+def test_dedup_collapses_near_duplicates_keeping_best():
+    service = RAGService()
+    results = [
+        chunk(PASSAGE.lower(), 0.5, id='copy'),
+        chunk(PASSAGE, 0.9, id='best'),
+        chunk("[2] " + PASSAGE, 0.7, id='cited'),
+        chunk(OTHER, 0.6, id='other'),
+    ]
+    
+    unique = service._deduplicate_results(results, top_k=5)
+    
+    assert [r['id'] for r in unique] == ['best', 'other']
+
+
+def test_dedup_fills_top_k_past_the_heap_head():
+    service = RAGService()
+    # Six copies of one passage outrank the distinct chunks, so filling
+    # top_k=2 needs results beyond the best 2 * top_k
+    results = [chunk(PASSAGE, 1.0 - i * 0.01) for i in range(6)]
+    results += [chunk(PASSAGE.lower(), 0.1), chunk(OTHER, 0.05)]
+    
+    unique = service._deduplicate_results(results, top_k=2)
+    
+    assert [r['text'] for r in unique] == [PASSAGE, OTHER]
+
+
+def test_retrieve_context_fuses_dedups_and_caches():
+    faiss = FakeFAISS([chunk(PASSAGE, 0.1), chunk('beta chunk text', 0.2), chunk('gamma', 0.3)])
+    txtai = FakeTxtai([chunk('beta chunk text', 0.9), chunk(PASSAGE.upper(), 0.8)])
+    service = RAGService(faiss_service=faiss, txtai_service=txtai)
+    
+    results = service.retrieve_context('revenue growth', top_k=2)
+    
+    assert [r['text'] for r in results] == ['beta chunk text', PASSAGE]
+    assert (faiss.searches, txtai.searches) == (1, 1)
+    
+    # Repeat query: served from the semantic cache
+    assert service.retrieve_context('revenue growth', top_k=2) == results
+    assert (faiss.searches, txtai.searches) == (1, 1)
+    
+    # Different top_k or document filter: separate cache namespaces
+    service.retrieve_context('revenue growth', top_k=3)
+    service.retrieve_context('revenue growth', top_k=2, document_id='doc1')
+    assert faiss.searches == 3
+
+
+def test_index_document_invalidates_cached_retrievals():
+    faiss = FakeFAISS([chunk('alpha'), chunk('beta')])
+    service = RAGService(faiss_service=faiss)
+    
+    service.retrieve_context('query', top_k=2, document_id='doc1')
+    service.retrieve_context('query', top_k=2, document_id='doc2')
+    service.retrieve_context('query', top_k=2)
+    assert faiss.searches == 3
+    
+    assert service.index_document('doc1', ['new text'])
+    
+    # doc1 and unfiltered retrievals are recomputed; doc2 is still cached
+    service.retrieve_context('query', top_k=2, document_id='doc1')
+    service.retrieve_context('query', top_k=2)
+    service.retrieve_context('query', top_k=2, document_id='doc2')
+    assert faiss.searches == 5
+
+
+def test_retrieve_context_without_retrievers():
+    service = RAGService()
+    assert service.retrieve_context('anything') == []
+
+
+def test_retriever_failure_returns_empty(monkeypatch):
+    faiss = FakeFAISS([chunk('alpha')])
+    
+    def broken(*args, **kwargs):
+        raise RuntimeError('index unavailable')
+    
+    monkeypatch.setattr(faiss, 'search', broken)
+    service = RAGService(faiss_service=faiss)
+    
+    assert service.retrieve_context('query') == []
@@ -0,0 +1,126 @@
+"""
+Rate limiting tests
+RateLimitManager Lua limiters and resets against an in-memory Redis
+"""
+import fakeredis
+import pytest
+import redis
+
+from app.middleware import rate_limiter
+from app.middleware.rate_limiter import (
+    RateLimitManager, STRATEGY_APPROXIMATE, STRATEGY_EXACT
+)
+
+
+class FakeClock:
+    """Stand-in for the time module used by rate_limiter"""
+    
+    def __init__(self, now: float):
+        self.now = now
+    
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Start exactly on a 60 s bucket boundary
+    fake = FakeClock(1_700_000_040.0)
+    monkeypatch.setattr(rate_limiter, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def manager():
+    pool = redis.ConnectionPool(
+        connection_class=fakeredis.FakeRedisConnection,
+        server=fakeredis.FakeServer(),
+        decode_responses=True
+    )
+    return RateLimitManager(connection_pool=pool)
+
+
+def test_exact_window_allows_up_to_limit(manager, clock):
+    for _ in range(3):
+        assert manager.hit('alice', 3, 60, STRATEGY_EXACT) == (True, None)
+    
+    allowed, usage = manager.hit('alice', 3, 60, STRATEGY_EXACT)
+    assert not allowed
+    assert usage == {'requests': 3, 'reset_in': 60}
+
+
+def test_exact_window_slides(manager, clock):
+    assert manager.check_rate_limit('alice', 2, 60, STRATEGY_EXACT)
+    clock.now += 30
+    assert manager.check_rate_limit('alice', 2, 60, STRATEGY_EXACT)
+    assert not manager.check_rate_limit('alice', 2, 60, STRATEGY_EXACT)
+    
+    # The first request ages out; the second is still in the window
+    clock.now += 31
+    assert manager.get_usage('alice', 60, STRATEGY_EXACT)['requests'] == 1
+    assert manager.check_rate_limit('alice', 2, 60, STRATEGY_EXACT)
+    assert not manager.check_rate_limit('alice', 2, 60, STRATEGY_EXACT)
+
+
+def test_exact_denials_are_not_recorded(manager, clock):
+    for _ in range(5):
+        manager.hit('alice', 2, 60, STRATEGY_EXACT)
+    
+    assert manager.get_usage('alice', 60, STRATEGY_EXACT)['requests'] == 2
+
+
+def test_approximate_window_allows_up_to_limit(manager, clock):
+    for _ in range(5):
+        assert manager.check_rate_limit('bob', 5, 60, STRATEGY_APPROXIMATE)
+    
+    allowed, usage = manager.hit('bob', 5, 60, STRATEGY_APPROXIMATE)
+    assert not allowed
+    assert usage == {'requests': 5, 'reset_in': 60}
+
+
+def test_approximate_window_weights_previous_bucket(manager, clock):
+    for _ in range(10):
+        assert manager.check_rate_limit('bob', 10, 60)
+    assert not manager.check_rate_limit('bob', 10, 60)
+    
+    # Halfway through the next bucket the previous one counts for half
+    clock.now += 90
+    assert manager.get_usage('bob', 60) == {'requests': 5, 'reset_in': 30}
+    for _ in range(5):
+        assert manager.check_rate_limit('bob', 10, 60)
+    
+    allowed, usage = manager.hit('bob', 10, 60)
+    assert not allowed
+    assert usage == {'requests': 10, 'reset_in': 30}
+
+
+def test_limits_are_per_user_and_window(manager, clock):
+    assert manager.check_rate_limit('alice', 1, 60)
+    assert not manager.check_rate_limit('alice', 1, 60)
+    assert manager.check_rate_limit('bob', 1, 60)
+    assert manager.check_rate_limit('alice', 1, 3600)
+
+
+def test_reset_user_limit(manager, clock, monkeypatch):
+    # Small scan batches so the reset spans several UNLINK calls
+    monkeypatch.setattr(rate_limiter, 'RESET_SCAN_BATCH', 2)
+    for window in (10, 60, 3600):
+        manager.hit('alice', 1, window, STRATEGY_EXACT)
+        manager.hit('alice', 1, window, STRATEGY_APPROXIMATE)
+    manager.hit('alice2', 1, 60, STRATEGY_EXACT)
+    manager.hit('bob', 1, 60, STRATEGY_EXACT)
+    
+    manager.reset_user_limit('alice')
+    
+    assert sorted(manager.redis_client.keys('*')) == [
+        'rate_limit:alice2:60', 'rate_limit:bob:60'
+    ]
+    assert manager.check_rate_limit('alice', 1, 60, STRATEGY_EXACT)
+
+
+def test_redis_errors_fail_open(manager, clock, monkeypatch):
+    def broken(*args, **kwargs):
+        raise redis.ConnectionError('down')
+    
+    monkeypatch.setattr(manager, '_sliding_window', broken)
+    assert manager.hit('alice', 0, 60, STRATEGY_EXACT) == (True, None)
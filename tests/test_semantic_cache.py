@@ -0,0 +1,158 @@
+"""
+Semantic cache tests
+Similarity matching, LRU eviction, expiry, invalidation and persistence
+"""
+import numpy as np
+import pytest
+
+from app.llm import semantic_cache
+from app.llm.semantic_cache import SemanticCache
+
+# Fixed embeddings: 'hello' and 'hello!' are near-duplicates, the rest are orthogonal
+VECTORS = {
+    'hello': [1.0, 0.0, 0.0, 0.0],
+    'hello!': [0.95, 0.05, 0.0, 0.0],
+    'weather': [0.0, 1.0, 0.0, 0.0],
+    'stocks': [0.0, 0.0, 1.0, 0.0],
+    'sports': [0.0, 0.0, 0.0, 1.0],
+}
+
+
+class CountingEmbedder:
+    """Embedder over VECTORS that counts its calls"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def __call__(self, text: str) -> np.ndarray:
+        self.calls += 1
+        return np.array(VECTORS[text], dtype=np.float32)
+
+
+@pytest.fixture
+def embedder():
+    return CountingEmbedder()
+
+
+def test_semantic_hit_and_miss(embedder):
+    cache = SemanticCache(embedder, tau=0.9)
+    cache.insert('hello', 'Hi there')
+    
+    assert cache.lookup('hello!') == 'Hi there'
+    assert cache.lookup('weather') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_exact_repeat_skips_embedding(embedder):
+    cache = SemanticCache(embedder)
+    cache.insert('hello', 'Hi there')
+    calls = embedder.calls
+    
+    assert cache.lookup('hello') == 'Hi there'
+    assert embedder.calls == calls
+
+
+def test_namespaces_never_share_responses(embedder):
+    cache = SemanticCache(embedder, tau=0.9)
+    cache.insert('hello', 'Hi there', namespace='t=0.7')
+    
+    assert cache.lookup('hello', namespace='t=0.2') is None
+    assert cache.lookup('hello!', namespace='t=0.2') is None
+    assert cache.lookup('hello!', namespace='t=0.7') == 'Hi there'
+
+
+def test_lru_eviction(embedder):
+    cache = SemanticCache(embedder, max_size=3)
+    cache.insert('hello', 'a')
+    cache.insert('weather', 'b')
+    cache.insert('stocks', 'c')
+    
+    # Touch the oldest entry so 'weather' becomes least recently used
+    assert cache.lookup('hello') == 'a'
+    cache.insert('sports', 'd')
+    
+    assert len(cache) == 3
+    assert cache.lookup('weather') is None
+    assert [cache.lookup(p) for p in ('hello', 'stocks', 'sports')] == ['a', 'c', 'd']
+
+
+def test_ttl_expiry(embedder, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, 'monotonic', lambda: now[0])
+    cache = SemanticCache(embedder, tau=0.9, ttl=60)
+    cache.insert('hello', 'Hi there')
+    
+    now[0] += 30
+    assert cache.lookup('hello!') == 'Hi there'
+    
+    now[0] += 31
+    assert cache.lookup('hello') is None
+    assert cache.lookup('hello!') is None
+    
+    # Re-inserting an expired prompt refreshes it in place
+    cache.insert('hello', 'Hello again')
+    assert cache.lookup('hello') == 'Hello again'
+    assert len(cache) == 1
+
+
+def test_clear_by_namespace(embedder):
+    cache = SemanticCache(embedder)
+    cache.insert('hello', 'a', namespace='5:doc1')
+    cache.insert('weather', 'b', namespace='5:doc2')
+    cache.insert('stocks', 'c', namespace='5:')
+    
+    dropped = cache.clear(lambda namespace: namespace.split(':', 1)[1] in ('', 'doc1'))
+    
+    assert dropped == 2
+    assert len(cache) == 1
+    assert cache.lookup('weather', namespace='5:doc2') == 'b'
+    assert cache.lookup('hello', namespace='5:doc1') is None
+    
+    # Freed slots are reused
+    cache.insert('hello', 'a2', namespace='5:doc1')
+    assert cache.lookup('hello', namespace='5:doc1') == 'a2'
+    assert cache.clear() == 2
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize('filename', ['cache.npz', 'cache'])
+def test_save_and_load_round_trip(embedder, tmp_path, filename):
+    cache = SemanticCache(embedder, tau=0.9)
+    cache.insert('hello', 'Hi there', namespace='chat')
+    cache.insert('weather', [{'text': 'Sunny', 'score': np.float32(0.5)}], namespace='rag')
+    cache.insert('stocks', {'answer': 42})
+    
+    path = tmp_path / filename
+    cache.save(str(path))
+    assert (tmp_path / 'cache.npz').exists()
+    
+    loaded = SemanticCache(embedder, tau=0.9)
+    assert loaded.load(str(path)) == 3
+    assert loaded.lookup('hello!', namespace='chat') == 'Hi there'
+    assert loaded.lookup('weather', namespace='rag') == [{'text': 'Sunny', 'score': 0.5}]
+    assert loaded.lookup('stocks') == {'answer': 42}
+
+
+def test_load_keeps_most_recent_entries(embedder, tmp_path):
+    cache = SemanticCache(embedder)
+    for prompt in ('hello', 'weather', 'stocks'):
+        cache.insert(prompt, prompt.upper())
+    cache.lookup('hello')
+    
+    path = tmp_path / 'cache.npz'
+    cache.save(str(path))
+    
+    loaded = SemanticCache(embedder, max_size=2)
+    assert loaded.load(str(path)) == 2
+    assert loaded.lookup('weather') is None
+    assert loaded.lookup('hello') == 'HELLO'
+    assert loaded.lookup('stocks') == 'STOCKS'
+
+
+def test_load_missing_or_corrupt_file(embedder, tmp_path):
+    cache = SemanticCache(embedder)
+    assert cache.load(str(tmp_path / 'missing.npz')) == 0
+    
+    corrupt = tmp_path / 'corrupt.npz'
+    corrupt.write_bytes(b'not a zip file')
+    assert cache.load(str(corrupt)) == 0
@@ -0,0 +1,7 @@
+"""
+WSGI Entry Point
+Production entry for gunicorn (see gunicorn.conf.py)
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app_enhanced import app, socketio  # noqa: F401